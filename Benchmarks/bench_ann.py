@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from Benchmarks.synthetic_catalog import write_assets
+from Utils.ann import IVFIndex, ann_texts
+from Utils.ranking import ranked_page, top_k
+from Utils.utils import load_catalog
+
+
+def overlap(found, expected):
+    return len(np.intersect1d(found, expected)) / max(1, len(expected))
+
+
+def timed(call, queries):
+    started = time.perf_counter()
+    results = [call(position) for position in queries]
+    return results, len(queries) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recall@K and queries per second of the IVF index behind '
+                                                 '/recommend?engine=ann, against exact search and the similarity '
+                                                 'assets')
+    parser.add_argument('--assets-dir', help='catalog to index; a synthetic one of --products is written otherwise')
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--lists', type=int, help='clusters, sqrt of the product count by default')
+    parser.add_argument('--inserted', type=int, default=1000, help='products appended through incremental insert')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        assets_dir = args.assets_dir
+        if assets_dir is None:
+            assets_dir = os.path.join(directory, 'assets')
+            write_assets(assets_dir, args.products)
+        catalog = load_catalog(assets_dir)
+
+    texts = ann_texts(catalog.products)
+    started = time.perf_counter()
+    index = IVFIndex.build(texts, n_lists=args.lists)
+    build_seconds = time.perf_counter() - started
+
+    # The last products are left out of the build and appended the way a catalog reload inserts them
+    kept = len(texts) - min(args.inserted, len(texts) - 1)
+    base = IVFIndex.build(texts[:kept], n_lists=args.lists)
+    started = time.perf_counter()
+    extended = base.updated(texts)
+    insert_seconds = time.perf_counter() - started
+
+    rng = np.random.default_rng(0)
+    queries = rng.choice(len(texts), min(args.queries, len(texts)), replace=False)
+    k = args.k
+
+    # Ground truth: every vector scored, and the precomputed similarity rows the exact engine serves
+    vectors = index.vectors[index.slots]
+    exact, exact_qps = timed(lambda position: top_k(vectors @ vectors[position], 0, k), queries)
+    extended_vectors = extended.vectors[extended.slots]
+    extended_exact = [top_k(extended_vectors @ extended_vectors[position], 0, k) for position in queries]
+    matrix, matrix_qps = timed(lambda position: ranked_page(catalog.similarity, position, 0, k), queries)
+
+    report = {'products': len(texts), 'lists': len(index.centroids), 'dimensions': vectors.shape[1], 'k': k,
+              'build_seconds': round(build_seconds, 3), 'inserted': len(texts) - kept,
+              'insert_seconds': round(insert_seconds, 3), 'exact_vectors_qps': round(exact_qps, 1),
+              'exact_matrix_qps': round(matrix_qps, 1),
+              'vectors_vs_matrix_overlap': round(float(np.mean([overlap(a, b) for a, b in zip(exact, matrix)])), 4),
+              'results': []}
+    print(f"{report['products']} products, {report['lists']} lists, {report['dimensions']} dimensions: "
+          f"build {build_seconds:.2f} s, {report['inserted']} inserted in {insert_seconds:.3f} s")
+    print(f"exact over vectors {exact_qps:9.1f} q/s, similarity assets {matrix_qps:9.1f} q/s, "
+          f"vectors vs assets overlap@{k} {report['vectors_vs_matrix_overlap']:.3f}")
+
+    for nprobe in args.nprobe:
+        found, qps = timed(lambda position: index.ranked_page(position, 0, k, nprobe), queries)
+        inserted = [extended.ranked_page(position, 0, k, nprobe) for position in queries]
+        result = {
+            'nprobe': nprobe,
+            'qps': round(qps, 1),
+            'recall': round(float(np.mean([overlap(a, b) for a, b in zip(found, exact)])), 4),
+            'recall_after_insert': round(float(np.mean([overlap(a, b) for a, b in zip(inserted, extended_exact)])), 4),
+            'matrix_overlap': round(float(np.mean([overlap(a, b) for a, b in zip(found, matrix)])), 4),
+        }
+        report['results'].append(result)
+        print(f"nprobe {nprobe:>4}  {qps:9.1f} q/s  recall@{k} {result['recall']:.3f}  "
+              f"after insert {result['recall_after_insert']:.3f}  overlap with assets {result['matrix_overlap']:.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
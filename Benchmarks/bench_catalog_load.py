@@ -0,0 +1,107 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from Benchmarks.synthetic_catalog import write_assets
+from Utils.mmap_assets import catalog_path, write_catalog
+
+# (mode, assets layout, SHOPWISE_CATALOG_LAZY_LOADING)
+MODES = (('pickle', 'pickle', '1'), ('columnar', 'columnar', '0'), ('lazy', 'columnar', '1'))
+
+
+def memory():
+    # Resident and private (anonymous) memory of this process in MiB; forked workers share the rest
+    fields = {}
+    with open('/proc/self/status') as status:
+        for line in status:
+            name, _, value = line.partition(':')
+            if name in ('VmRSS', 'RssAnon'):
+                fields[name] = int(value.split()[0]) / 1024
+    return fields.get('VmRSS', 0.0), fields.get('RssAnon', 0.0)
+
+
+def measure_child(assets_dir, stage, pages):
+    # Runs in a fresh interpreter so every mode starts from the same imports and an empty heap
+    from Utils.serializer import product_block
+    from Utils.utils import load_catalog, load_products
+
+    rss, anon = memory()
+    started = time.perf_counter()
+    if stage == 'products':
+        products = load_products(assets_dir)[0]
+    else:
+        products = load_catalog(assets_dir).products
+    seconds = time.perf_counter() - started
+    loaded_rss, loaded_anon = memory()
+
+    # One page of every product field for random rows, the way the listing endpoints serialize them
+    rng = np.random.default_rng(0)
+    timings = []
+    for _ in range(pages):
+        positions = rng.choice(len(products), 10, replace=False)
+        started = time.perf_counter()
+        product_block(products, positions).records()
+        timings.append(time.perf_counter() - started)
+    milliseconds = np.array(timings) * 1000
+
+    return {'seconds': round(seconds, 3), 'rss_mib': round(loaded_rss - rss, 1),
+            'private_mib': round(loaded_anon - anon, 1),
+            'page_p50_ms': round(float(np.percentile(milliseconds, 50)), 4),
+            'page_p99_ms': round(float(np.percentile(milliseconds, 99)), 4)}
+
+
+def run_child(assets_dir, stage, lazy, pages, ann=False):
+    environment = dict(os.environ, SHOPWISE_CATALOG_LAZY_LOADING=lazy, SHOPWISE_ASSETS_DIR=assets_dir,
+                       SHOPWISE_ANN_ENABLED='1' if ann else '0')
+    output = subprocess.run([sys.executable, '-m', 'Benchmarks.bench_catalog_load', '--child', stage,
+                             '--assets-dir', assets_dir, '--pages', str(pages)],
+                            env=environment, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold load time, memory and page serialization of the pickled, '
+                                                 'eagerly decoded columnar and lazily loaded columnar catalog')
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--stage', choices=('products', 'catalog'), nargs='+', default=['products', 'catalog'],
+                        help='products: load_products only; catalog: load_catalog with every index built')
+    parser.add_argument('--ann', action='store_true', help='build the ANN index in load_catalog as well')
+    parser.add_argument('--output')
+    parser.add_argument('--assets-dir', help=argparse.SUPPRESS)
+    parser.add_argument('--child', choices=('products', 'catalog'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_child(args.assets_dir, args.child, args.pages)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        layouts = {'pickle': os.path.join(directory, 'pickle'), 'columnar': os.path.join(directory, 'columnar')}
+        write_assets(layouts['pickle'], args.products)
+        products = write_assets(layouts['columnar'], args.products)
+        write_catalog(products, catalog_path(layouts['columnar']))
+        os.remove(os.path.join(layouts['columnar'], 'products_dictionary.pkl'))
+
+        report = {'products': args.products, 'ann': args.ann, 'results': []}
+        for stage in args.stage:
+            for mode, layout, lazy in MODES:
+                result = {'stage': stage, 'mode': mode, **run_child(layouts[layout], stage, lazy, args.pages, args.ann)}
+                report['results'].append(result)
+                print(f"{stage:<9} {mode:<9} {result['seconds']:7.3f} s  rss +{result['rss_mib']:7.1f} MiB  "
+                      f"private +{result['private_mib']:7.1f} MiB  page p50 {result['page_p50_ms']:.3f} ms  "
+                      f"p99 {result['page_p99_ms']:.3f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
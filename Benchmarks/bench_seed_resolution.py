@@ -0,0 +1,67 @@
+import argparse
+import os
+import pickle
+import time
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from Config.config import ASSETS_DIR
+from Utils.catalog import CatalogSnapshot
+from Utils.search_index import ProductSearchIndex, is_literal
+
+
+def resolve_with_scan(products, query):
+    # The full str.contains pass the recommenders ran for every seed before the lookup tables
+    matching_products = products[products['product_name'].str.contains(query, case=False)]
+    return matching_products.index[0] if not matching_products.empty else None
+
+
+def resolve_id_with_mask(products, product_id):
+    # The product_id equality mask compare_prices built for every request
+    positions = np.flatnonzero(products['product_id'].values == products['product_id'].iloc[0].dtype.type(product_id))
+    return positions[0] if len(positions) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed product resolution: substring scan vs hash lookups')
+    parser.add_argument('--assets-dir', default=ASSETS_DIR)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    products = pd.DataFrame(pickle.load(open(os.path.join(args.assets_dir, 'products_dictionary.pkl'), 'rb')))
+    catalog = CatalogSnapshot(products, search_index=ProductSearchIndex(products))
+
+    started = time.perf_counter()
+    catalog.product_id_positions, catalog.name_positions
+    print(f'{len(products)} products, lookup tables built in {(time.perf_counter() - started) * 1000:.1f} ms')
+
+    rng = np.random.default_rng(0)
+    names = [name for name in products['product_name'].tolist() if isinstance(name, str) and is_literal(name)]
+    exact_names = [names[i] for i in rng.choice(len(names), size=min(args.queries, len(names)), replace=False)]
+    product_ids = [str(product_id) for product_id in
+                   rng.choice(products['product_id'].to_numpy(), size=args.queries, replace=True)]
+    substrings = [name.split()[0] for name in exact_names if name.split()]
+
+    cases = (
+        ('exact name', exact_names, (('str.contains scan', lambda q: resolve_with_scan(products, q)),
+                                     ('trigram index', lambda q: catalog.match_positions('product_name', q)[0]),
+                                     ('hash lookup', catalog.resolve_position))),
+        ('product id', product_ids, (('equality mask', lambda q: resolve_id_with_mask(products, q)),
+                                     ('hash lookup', catalog.exact_position))),
+        ('substring', substrings, (('str.contains scan', lambda q: resolve_with_scan(products, q)),
+                                   ('resolve fallback', catalog.resolve_position))),
+    )
+
+    for case, queries, methods in cases:
+        timings = {}
+        for name, resolve in methods:
+            seconds = min(timeit.repeat(lambda: [resolve(query) for query in queries], number=1, repeat=args.repeat))
+            timings[name] = seconds / len(queries)
+        print(f'{case:>10}: ' + ', '.join(f'{name} {seconds * 1e6:.1f} us' for name, seconds in timings.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import os
+import pickle
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from Config.config import ASSETS_DIR
+from Utils.serializer import serialize_products
+
+
+def serialize_with_iloc(products, positions):
+    # The per-field iloc lookups the controllers used before Utils.serializer
+    result = []
+    for i in positions:
+        result.append({
+            'product_id': int(products.iloc[i].product_id),
+            'product_name': products.iloc[i].product_name,
+            'product_link': products.iloc[i].product_link,
+            'product_image': products.iloc[i].product_image,
+            'product_price': products.iloc[i].product_price,
+            'product_category': products.iloc[i].product_category,
+            'product_ratings': products.iloc[i].product_ratings,
+            'product_rating_count': products.iloc[i].rating_count,
+            'product_description': products.iloc[i].description,
+            'product_fetch_date': products.iloc[i].date,
+            'product_store': products.iloc[i].product_store,
+            'product_weighted_rating': products.iloc[i].rating_weighted
+        })
+    return result
+
+
+def serialize_with_iterrows(products, positions):
+    result = []
+    for index, product in products.iloc[positions].iterrows():
+        result.append({
+            'product_id': product.product_id,
+            'product_name': product.product_name,
+            'product_link': product.product_link,
+            'product_image': product.product_image,
+            'product_price': product.product_price,
+            'product_category': product.product_category,
+            'product_ratings': product.product_ratings,
+            'product_rating_count': product.rating_count,
+            'product_description': product.description,
+            'product_fetch_date': product.date,
+            'product_store': product.product_store,
+            'product_weighted_rating': product.rating_weighted
+        })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare per-row payload building against Utils.serializer')
+    parser.add_argument('--assets-dir', default=ASSETS_DIR)
+    parser.add_argument('--page-sizes', type=int, nargs='+', default=[15, 100])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    products = pd.DataFrame(pickle.load(open(os.path.join(args.assets_dir, 'products_dictionary.pkl'), 'rb')))
+    rng = np.random.default_rng(0)
+
+    for page_size in args.page_sizes:
+        positions = rng.choice(len(products), size=page_size, replace=False)
+        timings = {}
+        for name, serialize in (('iloc', serialize_with_iloc), ('iterrows', serialize_with_iterrows),
+                                ('columnar', serialize_products)):
+            timings[name] = min(timeit.repeat(lambda: serialize(products, positions), number=1, repeat=args.repeat))
+
+        print(f'{page_size} items: ' + ', '.join(f'{name} {seconds * 1000:.2f} ms' for name, seconds in timings.items())
+              + f" | speedup vs iloc {timings['iloc'] / timings['columnar']:.0f}x,"
+                f" vs iterrows {timings['iterrows'] / timings['columnar']:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+import numpy as np
+
+from Benchmarks.run_benchmarks import PERCENTILES, query_pool
+from Benchmarks.synthetic_catalog import write_assets
+from Utils.utils import load_products
+
+ENDPOINTS = ('recommend', 'collaborative', 'hybrid', 'batch')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def make_request(endpoint, pool, rng):
+    # (method, path, body) of one recommendation request for a randomly picked product
+    def pick(key):
+        values = pool[key]
+        return values[rng.integers(len(values))]
+
+    if endpoint == 'batch':
+        body = json.dumps({'product_ids': [int(pick('ids')) for _ in range(5)], 'mode': 'hybrid'})
+        return 'POST', '/recommend/batch', body
+    path = {'recommend': '/recommend', 'collaborative': '/collaborative_recommendations',
+            'hybrid': '/hybrid_recommendations'}[endpoint]
+    query = urlencode({'product_name': pick('names')})
+    return 'GET', f'{path}?{query}', None
+
+
+def run_client(port, pool, endpoints, warmup, duration, seed):
+    # One client process sending requests back to back; latencies of the measured window only
+    rng = np.random.default_rng(seed)
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    measured_from = started + warmup
+    deadline = measured_from + duration
+    while True:
+        method, path, body = make_request(endpoints[rng.integers(len(endpoints))], pool, rng)
+        sent = time.perf_counter()
+        if sent >= deadline:
+            break
+        try:
+            connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            failed = response.status >= 400
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            failed = True
+        if sent >= measured_from:
+            latencies.append(time.perf_counter() - sent)
+            errors += failed
+    connection.close()
+    return latencies, errors
+
+
+def memory_mib(pid):
+    # Proportional set size of the master and its workers: shared pages are split between the processes
+    # that map them, so the sum shows how much of the preloaded catalog the workers really share
+    try:
+        children = open(f'/proc/{pid}/task/{pid}/children').read().split()
+        total = 0
+        for process in [pid] + [int(child) for child in children]:
+            for line in open(f'/proc/{process}/smaps_rollup'):
+                if line.startswith('Pss:'):
+                    total += int(line.split()[1])
+        return round(total / 1024, 1)
+    except OSError:
+        return None
+
+
+def start_server(assets_dir, workers, threads, port, database, preload=True):
+    env = dict(os.environ, SHOPWISE_ASSETS_DIR=assets_dir, SHOPWISE_RATINGS_DATABASE_URI=f'sqlite:///{database}',
+               SHOPWISE_RESPONSE_CACHE_ENABLED='0', SHOPWISE_WEB_THREADS=str(threads),
+               SHOPWISE_PRELOAD='1' if preload else '0')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--workers', str(workers),
+                               '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'wsgi:app'],
+                              env=env, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 600
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'gunicorn exited with {server.returncode}')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/')
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError('gunicorn did not answer within 600 seconds')
+
+
+def stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def load_test(assets_dir, workers, threads, clients, endpoints, warmup, duration, pool, directory, preload=True):
+    port = free_port()
+    server = start_server(assets_dir, workers, threads, port, os.path.join(directory, f'ratings_{workers}.db'),
+                          preload)
+    try:
+        arguments = [(port, pool, endpoints, warmup, duration, seed) for seed in range(clients)]
+        with multiprocessing.Pool(clients) as processes:
+            outcomes = processes.starmap(run_client, arguments)
+        memory = memory_mib(server.pid)
+    finally:
+        stop_server(server)
+
+    latencies = np.concatenate([np.array(latency) for latency, _ in outcomes]) * 1000
+    result = {'workers': workers, 'threads': threads, 'preload': preload, 'clients': clients,
+              'requests': len(latencies),
+              'errors': int(sum(errors for _, errors in outcomes)),
+              'requests_per_second': round(len(latencies) / duration, 1), 'pss_mib': memory}
+    values = np.percentile(latencies, PERCENTILES) if len(latencies) else [np.nan] * len(PERCENTILES)
+    for percentile, value in zip(PERCENTILES, values):
+        result[f'p{percentile}_ms'] = round(float(value), 3)
+    return result
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description='Throughput of the recommendation endpoints under gunicorn as the '
+                                                 'number of worker processes grows')
+    parser.add_argument('--assets-dir', help='catalog to serve; a synthetic one of --products is written otherwise')
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, max(1, cores // 2), cores}))
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--clients', type=int, help='concurrent client processes, twice the workers by default')
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument('--warmup', type=float, default=3.0)
+    parser.add_argument('--duration', type=float, default=15.0)
+    parser.add_argument('--preload', choices=('on', 'off'), nargs='+', default=['on'],
+                        help='off: every worker imports main itself instead of forking from a preloaded master')
+    parser.add_argument('--output', default='load_test_results.json')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        assets_dir = args.assets_dir
+        if assets_dir is None:
+            assets_dir = os.path.join(directory, 'assets')
+            write_assets(assets_dir, args.products)
+        pool = query_pool(load_products(assets_dir)[0])
+
+        results = []
+        for preload in args.preload:
+            # Speedup over the first worker count of the same preload mode
+            first = len(results)
+            for workers in args.workers:
+                result = load_test(assets_dir, workers, args.threads, args.clients or 2 * workers, args.endpoints,
+                                   args.warmup, args.duration, pool, directory, preload == 'on')
+                single = results[first]['requests_per_second'] if len(results) > first else \
+                    result['requests_per_second']
+                result['speedup'] = round(result['requests_per_second'] / single, 2) if single else None
+                results.append(result)
+                print(f"preload {preload:<3} {workers:>3} workers {result['clients']:>3} clients  "
+                      f"{result['requests_per_second']:9.1f} req/s ({result['speedup']}x)  "
+                      f"p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+                      f"p99 {result['p99_ms']:8.2f} ms  errors {result['errors']}  pss {result['pss_mib']} MiB")
+
+    report = {'cores': cores, 'endpoints': args.endpoints, 'duration': args.duration, 'results': results}
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f'\nResults written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
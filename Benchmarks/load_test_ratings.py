@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def run_phase(mode, threads, ratings_per_thread):
+    import main
+    from main import Rating, app, db, enable_sqlite_wal, rating_queue
+    from sqlalchemy import event, func, select, text
+
+    if mode == 'direct':
+        # The per-request add + commit that /submit_rating did before batching, with SQLite's default journal
+        with app.app_context():
+            event.remove(db.engine, 'connect', enable_sqlite_wal)
+            db.engine.dispose()
+            db.session.execute(text('PRAGMA journal_mode=DELETE'))
+            db.session.commit()
+
+        @app.route('/_load_test/submit_rating_direct', methods=['POST'])
+        def submit_rating_direct():
+            data = main.request.json
+            with app.app_context():
+                db.session.add(Rating(user_id=data['user_id'], product_id=data['product_id'],
+                                      user_rating=data['user_rating'], review=data.get('review')))
+                db.session.commit()
+            return main.jsonify({'message': 'Rating submitted successfully'}), 201
+
+        url = '/_load_test/submit_rating_direct'
+    else:
+        url = '/submit_rating'
+
+    client = app.test_client()
+    errors = []
+
+    def submit(thread_index):
+        for i in range(ratings_per_thread):
+            response = client.post(url, json={'user_id': f'load-{thread_index}', 'product_id': str(i % 500 + 1),
+                                              'user_rating': i % 5 + 1, 'review': 'load test'})
+            if response.status_code not in (201, 202):
+                errors.append(response.status_code)
+
+    workers = [threading.Thread(target=submit, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    accepted = time.perf_counter() - started
+
+    rating_queue.flush()
+    durable = time.perf_counter() - started
+
+    with app.app_context():
+        stored = db.session.execute(select(func.count()).select_from(Rating)).scalar()
+
+    total = threads * ratings_per_thread
+    return {'mode': mode, 'threads': threads, 'ratings': total, 'stored': stored, 'errors': len(errors),
+            'accepted_per_second': round(total / accepted, 1), 'written_per_second': round(total / durable, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sustained /submit_rating throughput before and after batching')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--ratings-per-thread', type=int, default=250)
+    parser.add_argument('--phase', choices=['direct', 'batched'])
+    args = parser.parse_args()
+
+    if args.phase:
+        print(json.dumps(run_phase(args.phase, args.threads, args.ratings_per_thread)))
+        return
+
+    # Each phase runs in its own process against a fresh database file
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for phase in ('direct', 'batched'):
+            env = dict(os.environ, SHOPWISE_RATINGS_DATABASE_URI=f'sqlite:///{os.path.join(directory, phase)}.db')
+            output = subprocess.run([sys.executable, '-m', 'Benchmarks.load_test_ratings', '--phase', phase,
+                                     '--threads', str(args.threads),
+                                     '--ratings-per-thread', str(args.ratings_per_thread)],
+                                    env=env, check=True, capture_output=True, text=True).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    for result in results:
+        print(f"{result['mode']:>8}: {result['accepted_per_second']:>9} accepted/s, "
+              f"{result['written_per_second']:>9} written/s ({result['stored']} rows, {result['errors']} errors)")
+
+
+if __name__ == '__main__':
+    main()
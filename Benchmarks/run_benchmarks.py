@@ -0,0 +1,242 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from Benchmarks.synthetic_catalog import write_assets
+
+PERCENTILES = (50, 95, 99)
+MEMORY_SAMPLES = 5
+
+
+def measure(name, call, iterations, warmup=5):
+    # Latency percentiles over iterations calls, then the peak traced allocation of a few more
+    rng = np.random.default_rng(0)
+    for _ in range(warmup):
+        call(rng)
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        call(rng)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for _ in range(MEMORY_SAMPLES):
+        call(rng)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    milliseconds = np.array(timings) * 1000
+    result = {'name': name, 'iterations': iterations, 'mean_ms': round(float(milliseconds.mean()), 4),
+              'peak_kib': round(peak / 1024, 1)}
+    for percentile, value in zip(PERCENTILES, np.percentile(milliseconds, PERCENTILES)):
+        result[f'p{percentile}_ms'] = round(float(value), 4)
+    return result
+
+
+def query_pool(products, seed=0, size=256):
+    # Exact names, single-word substrings, ids and categories sampled once so every run sees the same queries
+    rng = np.random.default_rng(seed)
+    positions = rng.choice(len(products), size=min(size, len(products)), replace=False)
+    names = products['product_name'].to_numpy(dtype=object)[positions].tolist()
+    return {
+        'names': names,
+        'words': [name.split()[1] for name in names],
+        'ids': products['product_id'].to_numpy()[positions].tolist(),
+        'categories': [category.split(', ')[0] for category in
+                       products['product_category'].to_numpy(dtype=object)[positions].tolist()],
+    }
+
+
+def controller_cases(catalog):
+    from Controllers.GetProductsController import (batch_recommend_products, collaborative_recommend_products,
+                                                   comparedProducts, compare_prices, get_all_products,
+                                                   get_search_products, get_top_rated_products,
+                                                   hybrid_recommendations, recommend_products)
+
+    pool = query_pool(catalog.products)
+    pages = max(1, len(catalog) // 10)
+
+    def pick(rng, key):
+        values = pool[key]
+        return values[rng.integers(len(values))]
+
+    return [
+        ('recommend_products[exact]', lambda rng: recommend_products(
+            catalog, catalog.similarity, pick(rng, 'names'), page=int(rng.integers(1, 4)))),
+        ('recommend_products[substring]', lambda rng: recommend_products(
+            catalog, catalog.similarity, pick(rng, 'words'))),
+        ('collaborative_recommend_products', lambda rng: collaborative_recommend_products(
+            catalog, catalog.collaborative_similarity, pick(rng, 'names'))),
+        ('hybrid_recommendations', lambda rng: hybrid_recommendations(
+            catalog, catalog.similarity, catalog.collaborative_similarity, pick(rng, 'names'))),
+        ('batch_recommend_products', lambda rng: batch_recommend_products(
+            catalog, catalog.similarity, catalog.collaborative_similarity,
+            product_ids=[pick(rng, 'ids') for _ in range(5)], mode='hybrid')),
+        ('get_top_rated_products', lambda rng: get_top_rated_products(
+            catalog, page=int(rng.integers(1, 4)), category=pick(rng, 'categories'))),
+        ('get_search_products', lambda rng: get_search_products(
+            catalog, min_price=1000.0, max_price=50000.0, category=pick(rng, 'categories'),
+            product_name=pick(rng, 'words'))),
+        ('comparedProducts', lambda rng: comparedProducts(catalog, pick(rng, 'words'))),
+        ('compare_prices', lambda rng: compare_prices(
+            catalog, str(pick(rng, 'ids')), [str(pick(rng, 'ids')) for _ in range(5)])),
+        ('get_all_products', lambda rng: get_all_products(catalog, int(rng.integers(1, pages + 1)))),
+    ]
+
+
+def route_cases(client, catalog):
+    pool = query_pool(catalog.products)
+
+    def pick(rng, key):
+        values = pool[key]
+        return values[rng.integers(len(values))]
+
+    return [
+        ('GET /recommend', lambda rng: client.get('/recommend', query_string={'product_name': pick(rng, 'names')})),
+        ('GET /collaborative_recommendations', lambda rng: client.get(
+            '/collaborative_recommendations', query_string={'product_name': pick(rng, 'names')})),
+        ('GET /hybrid_recommendations', lambda rng: client.get(
+            '/hybrid_recommendations', query_string={'product_name': pick(rng, 'names')})),
+        ('POST /recommend/batch', lambda rng: client.post(
+            '/recommend/batch', json={'product_ids': [pick(rng, 'ids') for _ in range(5)], 'mode': 'hybrid'})),
+        ('GET /top_rated_products', lambda rng: client.get(
+            '/top_rated_products', query_string={'category': pick(rng, 'categories')})),
+        ('GET /search_products', lambda rng: client.get(
+            '/search_products', query_string={'product_name': pick(rng, 'words'), 'max_price': 50000})),
+        ('GET /get_compared_products', lambda rng: client.get(
+            '/get_compared_products', query_string={'user_search': pick(rng, 'words')})),
+        ('GET /compare_prices', lambda rng: client.get(
+            '/compare_prices', query_string={'product_id': pick(rng, 'ids'),
+                                             'compare_product_ids[]': [pick(rng, 'ids') for _ in range(5)]})),
+        ('GET /get_all_products', lambda rng: client.get('/get_all_products', query_string={'page': 2})),
+        ('GET /all_tags', lambda rng: client.get('/all_tags')),
+    ]
+
+
+def run_controllers(assets_dir, iterations):
+    from Utils.utils import load_catalog
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    catalog = load_catalog(assets_dir)
+    load = {'load_seconds': round(time.perf_counter() - started, 3),
+            'load_peak_mib': round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 1)}
+    tracemalloc.stop()
+
+    return load, [dict(measure(name, call, iterations), kind='controller')
+                  for name, call in controller_cases(catalog)]
+
+
+def run_routes(iterations):
+    # Runs in its own process: main loads the catalog from SHOPWISE_ASSETS_DIR when imported
+    import main
+
+    # Every request is computed; the response cache would otherwise answer the repeated queries
+    main.response_cache = None
+    client = main.app.test_client()
+    cases = route_cases(client, main.catalog)
+    for name, call in cases:
+        response = call(np.random.default_rng(0))
+        if response.status_code >= 400:
+            raise RuntimeError(f'{name} answered {response.status_code}: {response.get_data(as_text=True)[:200]}')
+    return [dict(measure(name, call, iterations), kind='route') for name, call in cases]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, threshold=1.2):
+    baseline = {(entry['size'], entry['kind'], entry['name']): entry
+                for entry in json.load(open(baseline_path))['results']}
+    print(f'\nCompared with {baseline_path} (p50 / p95 ratio, >{threshold:.1f}x flagged):')
+    for entry in results:
+        previous = baseline.get((entry['size'], entry['kind'], entry['name']))
+        if previous is None:
+            continue
+        ratios = [entry[key] / previous[key] if previous[key] else float('inf') for key in ('p50_ms', 'p95_ms')]
+        flag = '  REGRESSION' if max(ratios) > threshold else ''
+        print(f"{entry['size']:>9} {entry['name']:<40} {ratios[0]:6.2f}x {ratios[1]:6.2f}x{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time controller functions and routes on synthetic catalogs')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--neighbors', type=int, default=50)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--mmap', action='store_true', help='write the catalog in the memory-mapped layout')
+    parser.add_argument('--no-routes', action='store_true')
+    parser.add_argument('--data-dir', help='keep generated assets here instead of a temporary directory')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    parser.add_argument('--routes-only', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.routes_only:
+        print(json.dumps(run_routes(args.iterations)))
+        return
+
+    results = []
+    loads = []
+    with tempfile.TemporaryDirectory() as directory:
+        data_dir = args.data_dir or directory
+        for size in args.sizes:
+            assets_dir = os.path.join(data_dir, f'catalog_{size}')
+            started = time.perf_counter()
+            if not os.path.isdir(assets_dir):
+                write_assets(assets_dir, size, args.neighbors, mmap=args.mmap)
+            generated = round(time.perf_counter() - started, 3)
+
+            load, entries = run_controllers(assets_dir, args.iterations)
+            loads.append(dict(load, size=size, generate_seconds=generated))
+
+            if not args.no_routes:
+                env = dict(os.environ, SHOPWISE_ASSETS_DIR=assets_dir,
+                           SHOPWISE_RATINGS_DATABASE_URI=f"sqlite:///{os.path.join(directory, f'ratings_{size}.db')}")
+                output = subprocess.run([sys.executable, '-m', 'Benchmarks.run_benchmarks', '--routes-only', '1',
+                                         '--iterations', str(args.iterations)],
+                                        env=env, check=True, capture_output=True, text=True).stdout
+                entries += json.loads(output.strip().splitlines()[-1])
+
+            for entry in entries:
+                entry['size'] = size
+                print(f"{size:>9} {entry['kind']:<10} {entry['name']:<40} p50 {entry['p50_ms']:9.3f} ms  "
+                      f"p95 {entry['p95_ms']:9.3f} ms  p99 {entry['p99_ms']:9.3f} ms  "
+                      f"peak {entry['peak_kib']:10.1f} KiB")
+            results += entries
+
+    report = {
+        'commit': git_commit(),
+        'created_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'neighbors': args.neighbors,
+        'loads': loads,
+        'results': results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f'\nResults written to {args.output}')
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from Utils.mmap_assets import catalog_path, dense_similarity_path, write_catalog
+from Utils.neighbor_index import NeighborIndex, neighbor_index_path
+
+BRANDS = ['Samsung', 'Xiaomi', 'Vivo', 'Oppo', 'Apple', 'Infinix', 'Tecno', 'Realme', 'Nokia', 'Mibro', 'Dany',
+          'Audionic', 'Ronin', 'Lenovo', 'HP', 'Dell', 'Anker', 'Baseus', 'Haylou', 'QCY']
+TYPES = ['Smart Watch', 'Mobile Phone', 'Wireless Earbuds', 'Power Bank', 'Bluetooth Speaker', 'Laptop', 'Charger',
+         'Tablet', 'Headphones', 'Fitness Band']
+CATEGORIES = ['Smart-Watches', 'MobilePhones', 'Wireless-Earbuds', 'Power-Banks', 'Bluetooth-Speakers', 'Laptops',
+              'Mobile-Accessories', 'Tablets', 'Headphones', 'Fitness-Bands']
+SERIES = ['A', 'C', 'S', 'X', 'Pro', 'Note', 'Max', 'Lite', 'Air', 'Neo']
+VARIANTS = ['', ' 4GB 64GB', ' 8GB 128GB', ' 8GB 256GB', ' Black', ' Blue', ' 2024 Edition', ' Plus']
+STORES = ['PriceOye', 'Shophive']
+
+
+def generate_products(n_products, seed=0):
+    # Same columns and dtypes as Assets/products_dictionary.pkl. Products of one type sit in
+    # contiguous blocks so the generated neighbors mostly share a category.
+    rng = np.random.default_rng(seed)
+    kinds = np.repeat(np.arange(len(TYPES)), -(-n_products // len(TYPES)))[:n_products]
+    brands = rng.integers(0, len(BRANDS), n_products)
+    series = rng.integers(0, len(SERIES), n_products)
+    models = rng.integers(1, 100, n_products)
+    variants = rng.integers(0, len(VARIANTS), n_products)
+
+    names = [f'{BRANDS[b]} {SERIES[s]}{m} {TYPES[k]}{VARIANTS[v]}'
+             for b, s, m, k, v in zip(brands.tolist(), series.tolist(), models.tolist(), kinds.tolist(),
+                                      variants.tolist())]
+    slugs = [name.lower().replace(' ', '-') for name in names]
+    ratings = np.round(rng.uniform(1.0, 5.0, n_products) * 2) / 2
+    rating_count = rng.poisson(12, n_products).astype(np.float64)
+    rating_count[rng.random(n_products) < 0.3] = np.nan
+    stores = rng.integers(0, len(STORES), n_products)
+
+    return pd.DataFrame({
+        'product_name': names,
+        'product_price': np.round(rng.lognormal(9.5, 1.0, n_products), -1),
+        'product_image': [f'https://images.example.com/{slug}.jpg' for slug in slugs],
+        'product_link': [f'https://{STORES[store].lower()}.example.com/{slug}' for store, slug in
+                         zip(stores.tolist(), slugs)],
+        'product_store': [STORES[store] for store in stores.tolist()],
+        'product_category': [f'{CATEGORIES[k]}, {BRANDS[b]}' for k, b in zip(kinds.tolist(), brands.tolist())],
+        'product_ratings': ratings,
+        'rating_count': rating_count,
+        'description': [str({'Brand': BRANDS[b], 'Model': f'{SERIES[s]}{m}'})
+                        for b, s, m in zip(brands.tolist(), series.tolist(), models.tolist())],
+        'date': '2024-05-17',
+        'rating_weighted': ratings * np.nan_to_num(rating_count),
+        'product_id': np.arange(1, n_products + 1, dtype=np.int64),
+        'tags': [name.lower() for name in names],
+    })
+
+
+def generate_neighbors(n_products, n_neighbors=50, seed=0):
+    # Every product first lists itself, then distinct nearby products with descending scores.
+    # Scores are rounded to three decimals so rows contain ties, like the real cosine similarities.
+    rng = np.random.default_rng(seed)
+    n_neighbors = min(n_neighbors, n_products)
+    step = max(1, min(8, (n_products - 1) // max(1, n_neighbors - 1)))
+    offsets = np.arange(1, n_neighbors) * step + rng.integers(0, step, (n_products, n_neighbors - 1))
+    indices = np.empty((n_products, n_neighbors), dtype=np.int32)
+    indices[:, 0] = np.arange(n_products)
+    indices[:, 1:] = (np.arange(n_products)[:, None] + offsets) % n_products
+
+    scores = np.empty((n_products, n_neighbors), dtype=np.float32)
+    scores[:, 0] = 1.0
+    scores[:, 1:] = -np.sort(-np.round(rng.uniform(0.05, 0.99, (n_products, n_neighbors - 1)), 3), axis=1)
+
+    indptr = np.arange(0, n_products * n_neighbors + 1, n_neighbors, dtype=np.int64)
+    return NeighborIndex(indptr, indices.ravel(), scores.ravel())
+
+
+def write_assets(assets_dir, n_products, n_neighbors=50, seed=0, dense=False, mmap=False):
+    os.makedirs(assets_dir, exist_ok=True)
+    products = generate_products(n_products, seed)
+    if mmap:
+        write_catalog(products, catalog_path(assets_dir))
+    else:
+        with open(os.path.join(assets_dir, 'products_dictionary.pkl'), 'wb') as file:
+            pickle.dump(products.to_dict(), file)
+
+    for offset, name in enumerate(('similarity', 'collaborative_similarity')):
+        index = generate_neighbors(n_products, n_neighbors, seed + offset + 1)
+        if dense:
+            # Dense matrices hold the same neighbors with zeros elsewhere; only practical for small catalogs
+            matrix = np.zeros((n_products, n_products), dtype=np.float32)
+            rows = np.repeat(np.arange(n_products), np.diff(index.indptr))
+            matrix[rows, index.indices] = index.scores
+            np.save(dense_similarity_path(name, assets_dir), matrix)
+        else:
+            index.save(neighbor_index_path(name, assets_dir))
+    return products
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write a synthetic catalog in the layout load_products reads')
+    parser.add_argument('assets_dir')
+    parser.add_argument('--products', type=int, default=100000)
+    parser.add_argument('--neighbors', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--dense', action='store_true', help='dense .npy similarities instead of neighbor indexes')
+    parser.add_argument('--mmap', action='store_true', help='memory-mapped catalog instead of the pickle')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    write_assets(args.assets_dir, args.products, args.neighbors, args.seed, args.dense, args.mmap)
+    print(f'{args.products} products written to {args.assets_dir} in {time.perf_counter() - started:.1f} s')
@@ -1,3 +1,115 @@
-DEBUG = True
+import os
+
+# Development server settings for `python main.py`; PORT is also the port gunicorn binds
+DEBUG = os.environ.get('SHOPWISE_DEBUG', '1') != '0'
 HOST = '0.0.0.0'
-PORT = 5000
+PORT = int(os.environ.get('PORT', 5000))
+
+# Production server, `gunicorn -c gunicorn.conf.py wsgi:app`: worker processes forked from a master that loaded
+# the catalog once, so they share its arrays; more than one thread per worker switches to the gthread worker
+WEB_WORKERS = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+WEB_THREADS = int(os.environ.get('SHOPWISE_WEB_THREADS', 1))
+WEB_TIMEOUT = 60
+
+# Ranked neighbor lists kept per product for the recommendation endpoints (0 disables the cache)
+RANKING_CACHE_SIZE = 1024
+
+ASSETS_DIR = os.environ.get('SHOPWISE_ASSETS_DIR', 'Assets')
+
+# Catalogs converted by `python -m Utils.mmap_assets` load CATALOG_CATEGORY_COLUMNS as categoricals (codes into the
+# distinct values) and leave CATALOG_DEFERRED_COLUMNS on disk, decoding only the rows a response returns.
+# SHOPWISE_CATALOG_LAZY_LOADING=0 decodes every text column when the catalog loads instead
+CATALOG_LAZY_LOADING = os.environ.get('SHOPWISE_CATALOG_LAZY_LOADING', '1') != '0'
+CATALOG_CATEGORY_COLUMNS = ('product_store', 'product_category', 'date')
+CATALOG_DEFERRED_COLUMNS = ('product_image', 'product_link', 'description', 'tags')
+
+# Neighbors kept per product by `python -m Utils.neighbor_index`
+NEIGHBOR_COUNT = 200
+
+# /recommend?engine=ann: inverted-file index over hashed TF-IDF vectors of the product text, ANN_LISTS clusters
+# (None for sqrt of the product count) of which ANN_NPROBE are searched per query, the recall/latency knob.
+# The build takes seconds on large catalogs, so by default it happens on the first request that uses it, in every
+# worker: that request waits for the whole build. Reloads after it update the index before the new catalog is served.
+# SHOPWISE_ANN_ENABLED=1 builds it when the catalog loads instead, before gunicorn forks, for deployments that
+# serve engine=ann and can afford the memory and start-up time
+ANN_ENABLED = os.environ.get('SHOPWISE_ANN_ENABLED', '0') != '0'
+ANN_DIMENSIONS = 256
+ANN_LISTS = None
+ANN_NPROBE = 8
+ANN_KMEANS_ITERATIONS = 10
+ANN_TRAIN_SAMPLE = 50000
+# Columns the vectors are built from. tags is the name, description and category text already lowercased and
+# split into words, so adding those columns raw would mostly repeat its tokens with punctuation attached
+ANN_TEXT_COLUMNS = ('tags',)
+
+# Cached responses of the read endpoints, invalidated whenever the catalog version changes
+RESPONSE_CACHE_ENABLED = os.environ.get('SHOPWISE_RESPONSE_CACHE_ENABLED', '1') != '0'
+RESPONSE_CACHE_SIZE = 4096
+RESPONSE_CACHE_TTL = None  # seconds, None keeps entries until evicted or the catalog changes
+RESPONSE_CACHE_BACKEND = 'local'  # 'local' per worker, 'sqlite' shared by all workers through RESPONSE_CACHE_PATH
+RESPONSE_CACHE_PATH = 'instance/response_cache.db'
+
+# Concurrent identical reads of a cached endpoint share one computation. On start and after every catalog reload,
+# the WARMUP_REQUESTS reads this worker served most often (out of the last REQUEST_LOG_SIZE distinct ones) and the
+# WARMUP_PATHS pages of the WARMUP_SEEDS top-rated products are computed before traffic asks for them
+REQUEST_COALESCING = True
+WARMUP_ENABLED = os.environ.get('SHOPWISE_WARMUP_ENABLED', '1') != '0'
+WARMUP_REQUESTS = 100
+WARMUP_SEEDS = 50
+WARMUP_PATHS = ('/recommend', '/hybrid_recommendations')
+REQUEST_LOG_SIZE = 10000
+
+RATINGS_DATABASE_URI = os.environ.get('SHOPWISE_RATINGS_DATABASE_URI', 'sqlite:///ratings.db')
+
+# Submitted ratings are queued and written in batches of up to RATING_BATCH_SIZE rows,
+# at least every RATING_FLUSH_INTERVAL seconds. A batch that fails for another reason than its data (e.g. the
+# database is locked) is retried, waiting twice as long after every failure up to RATING_RETRY_MAX_BACKOFF seconds
+RATING_BATCH_SIZE = 500
+RATING_FLUSH_INTERVAL = 0.5
+RATING_RETRY_MAX_BACKOFF = 30.0
+
+# Live rating aggregates: stored ratings are added to the scraped count and sum of each product and
+# /top_rated_products ranks by them, by rating sum ('weighted', the scraped rating_weighted) or by the Bayesian
+# score (RATING_PRIOR_WEIGHT * mean rating + sum) / (RATING_PRIOR_WEIGHT + count) ('bayesian'). Ratings written by
+# other workers are picked up at most every RATING_AGGREGATE_REFRESH seconds.
+RATING_AGGREGATES_ENABLED = True
+TOP_RATED_SCORE = 'weighted'
+RATING_PRIOR_WEIGHT = 5
+RATING_AGGREGATE_REFRESH = 1.0
+
+# /get_all_ratings pagination; format=ndjson streams every matching row in chunks instead
+RATINGS_PAGE_SIZE = 100
+RATINGS_MAX_PAGE_SIZE = 1000
+RATINGS_STREAM_CHUNK_SIZE = 1000
+
+# Live collaborative similarity: stored ratings are folded into the neighbor rows every
+# COLLABORATIVE_UPDATE_INTERVAL seconds, scored base + COLLABORATIVE_LIVE_WEIGHT * shrunk cosine
+COLLABORATIVE_LIVE_UPDATES = True
+COLLABORATIVE_UPDATE_INTERVAL = 30
+COLLABORATIVE_LIVE_WEIGHT = 0.5
+COLLABORATIVE_SHRINKAGE = 5
+
+# /hybrid_recommendations blend: weighted sum of both similarity scores, or of their
+# reciprocal ranks 1 / (HYBRID_RRF_K + rank) with fusion 'rank'
+HYBRID_CONTENT_WEIGHT = 0.5
+HYBRID_COLLABORATIVE_WEIGHT = 0.5
+HYBRID_FUSION = 'weighted'
+HYBRID_RRF_K = 60
+
+# POST /recommend/batch: most seed products per request and recommendations returned per list
+BATCH_MAX_SEEDS = 100
+BATCH_TOP_K = 10
+
+# Catalog hot reload: seconds between checks of ASSETS_DIR for new files (None disables the watcher),
+# and the token /admin/reload expects in X-Admin-Token; the endpoint refuses every request while it is unset
+CATALOG_WATCH_INTERVAL = 60
+ADMIN_TOKEN = os.environ.get('SHOPWISE_ADMIN_TOKEN')
+
+# JSON responses of at least JSON_COMPRESS_MIN_BYTES are sent brotli (when installed) or gzip compressed
+# to clients that accept it
+JSON_COMPRESSION = True
+JSON_COMPRESS_MIN_BYTES = 1400
+
+# Request and stage timings plus lookup counters served on /metrics; off leaves only a flag check on the hot path
+METRICS_ENABLED = os.environ.get('SHOPWISE_METRICS_ENABLED', '1') != '0'
+METRICS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
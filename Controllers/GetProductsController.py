@@ -1,43 +1,46 @@
-import pandas as pd
 import numpy as np
-from flask import jsonify
 
+from Config.config import (BATCH_MAX_SEEDS, BATCH_TOP_K, HYBRID_COLLABORATIVE_WEIGHT, HYBRID_CONTENT_WEIGHT,
+                           HYBRID_FUSION)
+from Utils.ann import ann_depth
+from Utils.batch import aggregate_rows, seed_matrix
+from Utils.catalog import as_catalog
+from Utils.hybrid import blend_rows, dedupe_by_product_id, row_scores
+from Utils.metrics import stage
+from Utils.ranking import page_bounds, ranked_page, top_k
+from Utils.serializer import product_block, serialize_products
 
-def recommend_products(products, similarity, product_name, page=1, page_size=15):
+
+def recommend_products(products, similarity, product_name, page=1, page_size=15, cache=None, engine='exact',
+                       nprobe=None):
     try:
-        matching_products = products[products['product_name'].str.contains(product_name, case=False)]
+        if engine not in ('exact', 'ann'):
+            raise ValueError("engine must be 'exact' or 'ann'")
+        catalog = as_catalog(products)
+        products = catalog.products
+        with stage('recommend_products', 'resolve'):
+            seed_position = catalog.resolve_position(product_name)
 
         recommended_products = []
         total_pages = ''
 
-        if not matching_products.empty:
-            # Take the first matching product for simplicity (you can modify this logic as needed)
-            product_index = matching_products.index[0]
-            distances = similarity[product_index]
-            products_list = sorted(list(enumerate(distances)), reverse=True, key=lambda x: x[1])
-            # Calculate the total number of pages
-            total_pages = (len(products_list) - 1) // page_size + 1
-
-            # Calculate start and end index for the requested page
-            start_index = (page - 1) * page_size
-            end_index = start_index + page_size
-
-            for i in products_list[start_index:end_index]:
-                product_info = {
-                    'product_id': int(products.iloc[i[0]].product_id),
-                    'product_name': products.iloc[i[0]].product_name,
-                    'product_link': products.iloc[i[0]].product_link,
-                    'product_image': products.iloc[i[0]].product_image,
-                    'product_price': products.iloc[i[0]].product_price,
-                    'product_category': products.iloc[i[0]].product_category,
-                    'product_ratings': products.iloc[i[0]].product_ratings,
-                    'product_rating_count': products.iloc[i[0]].rating_count,
-                    'product_description': products.iloc[i[0]].description,
-                    'product_fetch_date': products.iloc[i[0]].date,
-                    'product_store': products.iloc[i[0]].product_store,
-                    'product_weighted_rating': products.iloc[i[0]].rating_weighted
-                }
-                recommended_products.append(product_info)
+        if seed_position is not None:
+            # Exact name or product id when there is one, otherwise the first product whose name matches
+            product_index = products.index[seed_position]
+            if engine == 'ann':
+                # Approximate neighbors from the tag vectors, which also cover products added after the
+                # similarity assets were computed
+                total_pages, start_index, end_index = page_bounds(ann_depth(catalog), page, page_size)
+                with stage('recommend_products', 'ann'):
+                    page_indices = catalog.ann.ranked_page(seed_position, start_index, end_index, nprobe)
+            else:
+                # Calculate the total number of pages and the rank range of the requested page
+                total_pages, start_index, end_index = page_bounds(len(similarity[product_index]), page, page_size)
+                with stage('recommend_products', 'rank'):
+                    page_indices = ranked_page(similarity, product_index, start_index, end_index, cache=cache)
+
+            with stage('recommend_products', 'serialize'):
+                recommended_products = serialize_products(products, page_indices)
 
         return {
             'success': True,
@@ -49,44 +52,35 @@ def recommend_products(products, similarity, product_name, page=1, page_size=15)
         return {'success': False, 'error': str(e)}
 
 
-def get_top_rated_products(products, page=1, per_page=10, category=None, store=None):
+def get_top_rated_products(products, page=1, per_page=10, category=None, store=None, aggregates=None):
     try:
-        # Calculate weighted ratings
-        products['weighted_ratings'] = products['product_ratings'] * products['rating_count']
+        catalog = as_catalog(products)
 
         # Filter by category and store if provided
-        if category:
-            products = products[products['product_category'].str.contains(category, case=False)]
-        if store:
-            products = products[products['product_store'].str.contains(store, case=False)]
-
-        # Sort products by weighted ratings in descending order
-        sorted_products = products.sort_values(by='weighted_ratings', ascending=False)
-        # Calculate the total number of pages
-        total_pages = (len(sorted_products) - 1) // per_page + 1
-
-        # Calculate start and end index for the requested page
-        start_index = (page - 1) * per_page
-        end_index = start_index + per_page
-
-        top_rated_products = []
-
-        for index, product in sorted_products.iloc[start_index:end_index].iterrows():
-            product_info = {
-                'product_id': product.product_id,
-                'product_name': product.product_name,
-                'product_link': product.product_link,
-                'product_image': product.product_image,
-                'product_price': product.product_price,
-                'product_category': product.product_category,
-                'product_ratings': product.product_ratings,
-                'product_rating_count': product.rating_count,
-                'product_description': product.description,
-                'product_fetch_date': product.date,
-                'product_store': product.product_store,
-                'product_weighted_rating': product.rating_weighted
-            }
-            top_rated_products.append(product_info)
+        positions = None
+        with stage('get_top_rated_products', 'filter'):
+            for column, query in (('product_category', category), ('product_store', store)):
+                if query:
+                    matches = catalog.match_positions(column, query)
+                    positions = matches if positions is None else np.intersect1d(positions, matches,
+                                                                                 assume_unique=True)
+
+        # Live aggregates of the same catalog include stored ratings; without them the scraped ratings are used
+        live = aggregates is not None and aggregates.serves(catalog)
+
+        # Products ordered by weighted ratings in descending order, taken from the precomputed order
+        with stage('get_top_rated_products', 'sort'):
+            total = len(catalog) if positions is None else len(positions)
+            # Calculate the total number of pages and the start and end index for the requested page
+            total_pages, start_index, end_index = page_bounds(total, page, per_page)
+            if live:
+                page_positions = aggregates.top(positions, end_index)[start_index:end_index]
+            else:
+                page_positions = catalog.by_weighted_rating(positions)[start_index:end_index]
+
+        with stage('get_top_rated_products', 'serialize'):
+            top_rated_products = product_block(catalog.products, page_positions,
+                                               **(aggregates.columns(page_positions) if live else {}))
 
         return {
             'success': True,
@@ -99,102 +93,73 @@ def get_top_rated_products(products, page=1, per_page=10, category=None, store=N
 
 
 def get_search_products(products, min_price=None, max_price=None, category=None, store=None, product_name=None,
-                        page=1, per_page=10, isCompare=None):
+                        page=1, per_page=10, isCompare=None, tags=None, stores=None, facets=False):
     try:
-        # Handle NaN values in product_rating_count
-        products['rating_count'] = products['rating_count'].apply(lambda x: 0.0 if pd.isna(x) else x)
-
-        # Filter by price range, category, store, and product name if provided
-        price_filtered_products = products[
-            ((min_price is None) or (products['product_price'] >= min_price)) &
-            ((max_price is None) or (products['product_price'] <= max_price))
-            ]
-
-        if category:
-            price_filtered_products = price_filtered_products[
-                price_filtered_products['product_category'].str.contains(category, case=False)]
-        if store:
-            price_filtered_products = price_filtered_products[
-                price_filtered_products['product_store'].str.contains(store, case=False)]
-        if product_name:
-            price_filtered_products = price_filtered_products[
-                price_filtered_products['product_name'].str.contains(product_name, case=False)]
-
-        # Conditionally sort products if min_price or max_price is provided
-        if min_price is not None or max_price is not None:
-            price_filtered_products = price_filtered_products.sort_values(by='product_price')
+        catalog = as_catalog(products)
+
+        # Filter by category, store, and product name if provided; None means no text or facet filter applied
+        with stage('get_search_products', 'filter'):
+            positions = None
+
+            # Exact facet filters: every tag in tags and any store in stores, from the precomputed postings
+            if tags or stores:
+                positions = catalog.facets.filter(tags or (), stores or ())
+
+            for column, query in (('product_category', category), ('product_store', store),
+                                  ('product_name', product_name)):
+                if query:
+                    matches = catalog.match_positions(column, query)
+                    positions = matches if positions is None else np.intersect1d(positions, matches,
+                                                                                 assume_unique=True)
 
+        # With a price range, the price index gives the products inside it already in price order
+        if min_price is not None or max_price is not None:
+            with stage('get_search_products', 'sort'):
+                # Filter out products with zero prices if isCompare is True
+                positions = catalog.by_price(positions, min_price, max_price, positive=bool(isCompare))
+        else:
+            if positions is None:
+                positions = np.arange(len(catalog))
             # Filter out products with zero prices if isCompare is True
-        if isCompare:
-            price_filtered_products = price_filtered_products[price_filtered_products['product_price'] > 0]
-
-        total_pages = (len(price_filtered_products) - 1) // per_page + 1
-
-        # Calculate start and end index for the requested page
-        start_index = (page - 1) * per_page
-        end_index = start_index + per_page
-
-        result_products = []
-
-        for index, product in price_filtered_products.iloc[start_index:end_index].iterrows():
-            product_info = {
-                'product_id': product.product_id,
-                'product_name': product.product_name,
-                'product_link': product.product_link,
-                'product_image': product.product_image,
-                'product_price': product.product_price,
-                'product_category': product.product_category,
-                'product_ratings': product.product_ratings,
-                'product_rating_count': product.rating_count,
-                'product_description': product.description,
-                'product_fetch_date': product.date,
-                'product_store': product.product_store,
-                'product_weighted_rating': product.rating_weighted
-            }
-            result_products.append(product_info)
+            if isCompare:
+                positions = positions[catalog.prices[positions] > 0]
 
-        return {
+        # Calculate the total number of pages and the start and end index for the requested page
+        total_pages, start_index, end_index = page_bounds(len(positions), page, per_page)
+
+        with stage('get_search_products', 'serialize'):
+            result_products = product_block(catalog.products, positions[start_index:end_index])
+
+        result = {
             'success': True,
             'Data': result_products,
             'total_pages': total_pages,
             'current_page': page,
         }
+        # Tag and store counts over the whole result set, not just this page. That costs O(result set) rather than
+        # the O(log N + page) of the price path, so they are computed only when asked for
+        if facets:
+            with stage('get_search_products', 'facets'):
+                result['facets'] = catalog.facets.counts(positions)
+        return result
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
 
 def comparedProducts(products, user_search, page=1, per_page=10):
     try:
-        # Perform the search
-        matching_products = products[products['product_name'].str.contains(user_search, case=False)]
+        catalog = as_catalog(products)
 
-        # Sort the matched products by product price in ascending order
-        sorted_products = matching_products.sort_values(by='product_price', ascending=True)
-        total_pages = (len(sorted_products) - 1) // per_page + 1
+        # Perform the search and order the matched products by product price in ascending order
+        with stage('comparedProducts', 'filter'):
+            matching_positions = catalog.match_positions('product_name', user_search)
+        with stage('comparedProducts', 'sort'):
+            sorted_positions = catalog.by_price(matching_positions)
+        total_pages, start_index, end_index = page_bounds(len(sorted_positions), page, per_page)
 
         # Paginate the results
-        start_index = (page - 1) * per_page
-        end_index = start_index + per_page
-        paginated_products = sorted_products.iloc[start_index:end_index]
-
-        result_products = []
-
-        for index, product in paginated_products.iterrows():
-            product_info = {
-                'product_id': product.product_id,
-                'product_name': product.product_name,
-                'product_link': product.product_link,
-                'product_image': product.product_image,
-                'product_price': product.product_price,
-                'product_category': product.product_category,
-                'product_ratings': product.product_ratings,
-                'product_rating_count': product.rating_count,
-                'product_description': product.description,
-                'product_fetch_date': product.date,
-                'product_store': product.product_store,
-                'product_weighted_rating': product.rating_weighted
-            }
-            result_products.append(product_info)
+        with stage('comparedProducts', 'serialize'):
+            result_products = product_block(catalog.products, sorted_positions[start_index:end_index])
 
         return {
             'success': True,
@@ -206,41 +171,28 @@ def comparedProducts(products, user_search, page=1, per_page=10):
         return {'success': False, 'error': str(e)}
 
 
-def collaborative_recommend_products(products, collaborative_similarity, product_name, page=1, page_size=15):
+def collaborative_recommend_products(products, collaborative_similarity, product_name, page=1, page_size=15,
+                                     cache=None):
     try:
-        matching_products = products[products['product_name'].str.contains(product_name, case=False)]
+        catalog = as_catalog(products)
+        products = catalog.products
+        with stage('collaborative_recommend_products', 'resolve'):
+            seed_position = catalog.resolve_position(product_name)
 
         recommended_products = []
         total_pages = ''
 
-        if not matching_products.empty:
-            # Take the first matching product for simplicity (you can modify this logic as needed)
-            product_index = matching_products.index[0]
-            distances = collaborative_similarity[product_index]
-            products_list = sorted(list(enumerate(distances)), reverse=True, key=lambda x: x[1])
-            # Calculate the total number of pages
-            total_pages = (len(products_list) - 1) // page_size + 1
-
-            # Calculate start and end index for the requested page
-            start_index = (page - 1) * page_size
-            end_index = start_index + page_size
-
-            for i in products_list[start_index:end_index]:
-                product_info = {
-                    'product_id': int(products.iloc[i[0]].product_id),
-                    'product_name': products.iloc[i[0]].product_name,
-                    'product_link': products.iloc[i[0]].product_link,
-                    'product_image': products.iloc[i[0]].product_image,
-                    'product_price': products.iloc[i[0]].product_price,
-                    'product_category': products.iloc[i[0]].product_category,
-                    'product_ratings': products.iloc[i[0]].product_ratings,
-                    'product_rating_count': products.iloc[i[0]].rating_count,
-                    'product_description': products.iloc[i[0]].description,
-                    'product_fetch_date': products.iloc[i[0]].date,
-                    'product_store': products.iloc[i[0]].product_store,
-                    'product_weighted_rating': products.iloc[i[0]].rating_weighted
-                }
-                recommended_products.append(product_info)
+        if seed_position is not None:
+            # Exact name or product id when there is one, otherwise the first product whose name matches
+            product_index = products.index[seed_position]
+            # Calculate the total number of pages and the rank range of the requested page
+            total_pages, start_index, end_index = page_bounds(len(collaborative_similarity[product_index]), page,
+                                                              page_size)
+            with stage('collaborative_recommend_products', 'rank'):
+                page_indices = ranked_page(collaborative_similarity, product_index, start_index, end_index, cache=cache)
+
+            with stage('collaborative_recommend_products', 'serialize'):
+                recommended_products = serialize_products(products, page_indices)
 
         return {
             'success': True,
@@ -252,78 +204,38 @@ def collaborative_recommend_products(products, collaborative_similarity, product
         return {'success': False, 'error': str(e)}
 
 
-def hybrid_recommendations(products, similarity, collaborative_similarity, product_name, page=1, page_size=10):
+def hybrid_recommendations(products, similarity, collaborative_similarity, product_name, page=1, page_size=10,
+                           content_weight=HYBRID_CONTENT_WEIGHT, collaborative_weight=HYBRID_COLLABORATIVE_WEIGHT,
+                           fusion=HYBRID_FUSION):
     try:
-        matching_products = products[products['product_name'].str.contains(product_name, case=False)]
+        catalog = as_catalog(products)
+        with stage('hybrid_recommendations', 'resolve'):
+            seed_position = catalog.resolve_position(product_name)
 
         hybrid_recommendations = []
         total_pages_hybrid = ''
 
-        if not matching_products.empty:
-            # Take the first matching product for simplicity (you can modify this logic as needed)
-            product_index = matching_products.index[0]
-
-            # Content-based recommendations
-            content_distances = similarity[product_index]
-            content_products_list = sorted(list(enumerate(content_distances)), reverse=True, key=lambda x: x[1])
-
-            # Collaborative recommendations
-            collaborative_distances = collaborative_similarity[product_index]
-            collaborative_products_list = sorted(list(enumerate(collaborative_distances)), reverse=True,
-                                                 key=lambda x: x[1])
-
-            # Calculate the total number of pages
-            total_pages_hybrid = (len(content_products_list) - 1 + len(
-                collaborative_products_list) - 1) // page_size + 1
-
-            # Calculate start and end index for the requested page
-            start_index = (page - 1) * page_size
-            end_index = start_index + page_size
-
-            # Get unique product IDs from both content-based and collaborative recommendations
-            unique_product_ids = set()
-
-            # Combine both recommendations
-            for i in range(start_index, end_index):
-                if i < len(content_products_list):
-                    content_product_id = int(products.iloc[content_products_list[i][0]].product_id)
-                    if content_product_id not in unique_product_ids:
-                        product_info = {
-                            'product_id': content_product_id,
-                            'product_name': products.iloc[content_products_list[i][0]].product_name,
-                            'product_link': products.iloc[content_products_list[i][0]].product_link,
-                            'product_image': products.iloc[content_products_list[i][0]].product_image,
-                            'product_price': products.iloc[content_products_list[i][0]].product_price,
-                            'product_category': products.iloc[content_products_list[i][0]].product_category,
-                            'product_ratings': products.iloc[content_products_list[i][0]].product_ratings,
-                            'product_rating_count': products.iloc[content_products_list[i][0]].rating_count,
-                            'product_description': products.iloc[content_products_list[i][0]].description,
-                            'product_fetch_date': products.iloc[content_products_list[i][0]].date,
-                            'product_store': products.iloc[content_products_list[i][0]].product_store,
-                            'product_weighted_rating': products.iloc[content_products_list[i][0]].rating_weighted,
-                        }
-                        hybrid_recommendations.append(product_info)
-                        unique_product_ids.add(content_product_id)
-
-                if i < len(collaborative_products_list):
-                    collaborative_product_id = int(products.iloc[collaborative_products_list[i][0]].product_id)
-                    if collaborative_product_id not in unique_product_ids:
-                        product_info = {
-                            'product_id': collaborative_product_id,
-                            'product_name': products.iloc[collaborative_products_list[i][0]].product_name,
-                            'product_link': products.iloc[collaborative_products_list[i][0]].product_link,
-                            'product_image': products.iloc[collaborative_products_list[i][0]].product_image,
-                            'product_price': products.iloc[collaborative_products_list[i][0]].product_price,
-                            'product_category': products.iloc[collaborative_products_list[i][0]].product_category,
-                            'product_ratings': products.iloc[collaborative_products_list[i][0]].product_ratings,
-                            'product_rating_count': products.iloc[collaborative_products_list[i][0]].rating_count,
-                            'product_description': products.iloc[collaborative_products_list[i][0]].description,
-                            'product_fetch_date': products.iloc[collaborative_products_list[i][0]].date,
-                            'product_store': products.iloc[collaborative_products_list[i][0]].product_store,
-                            'product_weighted_rating': products.iloc[collaborative_products_list[i][0]].rating_weighted,
-                        }
-                        hybrid_recommendations.append(product_info)
-                        unique_product_ids.add(collaborative_product_id)
+        if seed_position is not None:
+            # Exact name or product id when there is one, otherwise the first product whose name matches
+            product_index = catalog.products.index[seed_position]
+
+            # Blend content-based and collaborative scores in one vectorized pass
+            with stage('hybrid_recommendations', 'blend'):
+                candidates, scores = blend_rows(row_scores(similarity, product_index),
+                                                row_scores(collaborative_similarity, product_index),
+                                                content_weight, collaborative_weight, fusion)
+
+                # Get unique product IDs from both content-based and collaborative recommendations
+                if catalog.has_duplicate_product_ids:
+                    candidates, scores = dedupe_by_product_id(candidates, scores, catalog.product_ids)
+
+            # Calculate the total number of pages from the deduplicated candidates
+            total_pages_hybrid, start_index, end_index = page_bounds(len(candidates), page, page_size)
+
+            with stage('hybrid_recommendations', 'rank'):
+                page_indices = candidates[top_k(scores, start_index, end_index)]
+            with stage('hybrid_recommendations', 'serialize'):
+                hybrid_recommendations = serialize_products(catalog.products, page_indices)
 
         return {
             'success': True,
@@ -335,65 +247,164 @@ def hybrid_recommendations(products, similarity, collaborative_similarity, produ
         return {'success': False, 'error': str(e)}
 
 
+def batch_recommend_products(products, similarity, collaborative_similarity, product_ids=None, product_names=None,
+                             mode='content', aggregate='sum', count=BATCH_TOP_K,
+                             content_weight=HYBRID_CONTENT_WEIGHT, collaborative_weight=HYBRID_COLLABORATIVE_WEIGHT,
+                             fusion=HYBRID_FUSION, cache=None):
+    try:
+        catalog = as_catalog(products)
+        product_ids = list(product_ids or [])
+        product_names = list(product_names or [])
+        if len(product_ids) + len(product_names) > BATCH_MAX_SEEDS:
+            raise ValueError(f"At most {BATCH_MAX_SEEDS} seed products per request.")
+
+        # Resolve every seed once: ids by lookup, names the same way as /recommend
+        seeds = []
+        not_found = []
+        with stage('batch_recommend_products', 'resolve'):
+            for product_id in product_ids:
+                position = catalog.product_id_positions.get(str(product_id).strip())
+                if position is None:
+                    not_found.append(product_id)
+                else:
+                    seeds.append((product_id, position))
+            for product_name in product_names:
+                position = catalog.resolve_position(product_name)
+                if position is None:
+                    not_found.append(product_name)
+                else:
+                    seeds.append((product_name, position))
+
+        per_seed = []
+        combined = []
+
+        if seeds:
+            positions = np.array([position for _, position in seeds])
+            product_indices = catalog.products.index[positions]
+
+            # Similarity rows of every seed as one matrix over their candidate products
+            with stage('batch_recommend_products', 'gather'):
+                candidates, matrix, present = seed_matrix(product_indices, similarity, collaborative_similarity, mode,
+                                                          content_weight=content_weight,
+                                                          collaborative_weight=collaborative_weight, fusion=fusion)
+
+            # Never recommend a seed back, nor another row of the same product
+            keep = ~np.isin(candidates, positions)
+            if catalog.has_duplicate_product_ids:
+                keep &= ~np.isin(catalog.product_ids[candidates], catalog.product_ids[positions])
+
+            def best(scores, keep):
+                selected, scores = candidates[keep], scores[keep]
+                if catalog.has_duplicate_product_ids:
+                    selected, scores = dedupe_by_product_id(selected, scores, catalog.product_ids)
+                return selected[top_k(scores, 0, count)]
+
+            seed_pages = []
+            with stage('batch_recommend_products', 'rank'):
+                for row in range(len(seeds)):
+                    if mode == 'hybrid':
+                        seed_pages.append(best(matrix[row], keep & present[row]))
+                    else:
+                        # Same ranking as /recommend and /collaborative_recommendations, deep enough to skip the seeds
+                        source = similarity if mode == 'content' else collaborative_similarity
+                        ranked = ranked_page(source, product_indices[row], 0, count + int((~keep).sum()), cache=cache)
+                        seed_pages.append(ranked[~np.isin(catalog.product_ids[ranked],
+                                                          catalog.product_ids[positions])][:count])
+                combined_indices = best(aggregate_rows(matrix, present, aggregate), keep)
+
+            with stage('batch_recommend_products', 'serialize'):
+                per_seed = [{'seed': seed, 'Data': serialize_products(catalog.products, page_indices)}
+                            for (seed, _), page_indices in zip(seeds, seed_pages)]
+                combined = serialize_products(catalog.products, combined_indices)
+
+        return {
+            'success': True,
+            'Data': combined,
+            'per_seed': per_seed,
+            'not_found': not_found,
+        }
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
 def compare_prices(products, product_id, compare_product_ids):
     try:
-        # Convert product_id to the same type as products['product_id']
-        product_id = products['product_id'].iloc[0].dtype.type(product_id)
+        catalog = as_catalog(products)
 
-        # Convert compare_product_ids to the same type as products['product_id']
-        compare_product_ids = products['product_id'].iloc[0].dtype.type(compare_product_ids)
+        # Look up the base product by id (or exact name) and the comparison products by id
+        with stage('compare_prices', 'resolve'):
+            base_position = catalog.exact_position(product_id)
+            comparison_positions = catalog.id_positions(compare_product_ids)
 
-        # Ensure the provided product_id is in the products DataFrame
-        if not np.any(products['product_id'].values == product_id):
+        if base_position is None:
             raise ValueError(f"Product with ID {product_id} not found.")
-
-        # Ensure the provided comparison product_ids are in the products DataFrame
-        if not np.any(products['product_id'].isin(compare_product_ids)):
+        if not len(comparison_positions):
             raise ValueError(f"Some comparison product IDs not found.")
 
-        # Extract information for the base product
-        base_product_info = products[products['product_id'] == product_id].iloc[0]
-
-        # Extract information for the comparison products
-        comparison_products_info = products[products['product_id'].isin(compare_product_ids)]
-
-        if comparison_products_info.empty:
-            raise ValueError("No comparison products found.")
-
-        # Calculate prices differences
-        price_diff = base_product_info['product_price'] - comparison_products_info['product_price']
-
-        # Create a DataFrame with comparison results
-        comparison_results = pd.DataFrame({
-            'product_id': comparison_products_info['product_id'],
-            'product_name': comparison_products_info['product_name'],
-            'product_link': comparison_products_info['product_link'],
-            'product_image': comparison_products_info['product_image'],
-            'product_price': comparison_products_info['product_price'],
-            'product_category': comparison_products_info['product_category'],
-            'product_ratings': comparison_products_info['product_ratings'],
-            'product_rating_count': comparison_products_info['rating_count'],
-            'product_description': comparison_products_info['description'],
-            'product_fetch_date': comparison_products_info['date'],
-            'product_store': comparison_products_info['product_store'],
-            'product_weighted_rating': comparison_products_info['rating_weighted'],
-            'price_difference': price_diff
-        })
-
-        # Sort the DataFrame by price_difference in ascending order
-        sorted_comparison_results = comparison_results.sort_values(by='price_difference', ascending=True)
+        # Calculate prices differences and sort them in ascending order
+        with stage('compare_prices', 'sort'):
+            price_diff = catalog.prices[base_position] - catalog.prices[comparison_positions]
+            order = np.argsort(price_diff, kind='stable')
+
+        with stage('compare_prices', 'serialize'):
+            comparison_results = product_block(catalog.products, comparison_positions[order],
+                                               price_difference=price_diff[order].tolist())
 
         return {
             'success': True,
-            'Data': sorted_comparison_results.to_dict(orient='records')
+            'Data': comparison_results
         }
 
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
 
+def get_price_groups(products, product_name=None, page=1, per_page=10):
+    try:
+        catalog = as_catalog(products)
+        groups = catalog.price_groups
+
+        # The group of one product when product_name (or id) is given, else the groups with the biggest savings
+        with stage('get_price_groups', 'resolve'):
+            if product_name:
+                position = catalog.resolve_position(product_name)
+                if position is None:
+                    raise ValueError("Product not found.")
+                group_ids = [groups.group_of[position]]
+                total_pages = 1
+            else:
+                total_pages, start_index, end_index = page_bounds(len(groups.savings_order), page, per_page)
+                group_ids = groups.savings_order[start_index:end_index]
+
+        # Cheapest listing of every store in each group, with what it costs over the cheapest one
+        with stage('get_price_groups', 'serialize'):
+            result_groups = []
+            for group in np.asarray(group_ids).tolist():
+                listings = groups.cheapest_per_store(group)
+                price_difference = catalog.prices[listings] - groups.min_price[group]
+                result_groups.append({
+                    'group_key': groups.keys[group],
+                    'min_price': groups.min_price[group].item(),
+                    'max_price': groups.max_price[group].item(),
+                    'price_spread': groups.spread[group].item(),
+                    'store_count': groups.store_count[group].item(),
+                    'listing_count': len(groups.group_members(group)),
+                    'listings': product_block(catalog.products, listings, price_difference=price_difference.tolist()),
+                })
+
+        return {
+            'success': True,
+            'Data': result_groups,
+            'total_pages': total_pages,
+            'current_page': page,
+        }
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
 def get_all_products(products, page=1, page_size=10):
     try:
+        products = as_catalog(products).products
         total_products = len(products)
         total_pages = (total_products - 1) // page_size + 1
 
@@ -403,11 +414,14 @@ def get_all_products(products, page=1, page_size=10):
         start_index = (page - 1) * page_size
         end_index = min(start_index + page_size, total_products)
 
-        paginated_products = products.iloc[start_index:end_index]
+        with stage('get_all_products', 'serialize'):
+            # Every catalog column under its own name, encoded column by column
+            paginated_products = product_block(products, np.arange(start_index, end_index),
+                                               [(column, column) for column in products.columns])
 
         return {
             'success': True,
-            'Data': paginated_products.to_dict(orient='records'),
+            'Data': paginated_products,
             'total_pages': total_pages,
             'current_page': page,
         }
@@ -0,0 +1,174 @@
+import zlib
+
+import numpy as np
+
+from Config.config import (ANN_DIMENSIONS, ANN_KMEANS_ITERATIONS, ANN_LISTS, ANN_NPROBE, ANN_TEXT_COLUMNS,
+                           ANN_TRAIN_SAMPLE, NEIGHBOR_COUNT)
+from Utils.ranking import top_k
+
+# Token hashes are split into an IDF bucket (low bits), an embedding dimension (next bits) and a sign (high bit)
+IDF_BUCKET_BITS = 18
+DIMENSION_BITS = 13
+CHUNK_ROWS = 8192
+
+
+class TextVectorizer:
+    # TF-IDF of the whitespace tokens of each text, hashed with signs into a few hundred dimensions (a sparse
+    # random projection) and L2-normalized, so dot products approximate the cosine similarity of the full vectors.
+    # crc32 keeps the hashes identical in every process; unseen tokens still land in a dimension.
+    def __init__(self, dimensions=ANN_DIMENSIONS, idf=None):
+        self.dimensions = dimensions
+        self.idf = idf
+        self._codes = {}
+
+    def _tokenize(self, texts):
+        # (row of every token, hash of every token), one crc32 per distinct token
+        tokens = [str(text).split() if isinstance(text, str) else [] for text in texts]
+        rows = np.repeat(np.arange(len(tokens)), [len(row) for row in tokens])
+        flat = [token for row in tokens for token in row]
+        for token in set(flat).difference(self._codes):
+            self._codes[token] = zlib.crc32(token.encode())
+        return rows, np.array([self._codes[token] for token in flat], dtype=np.int64)
+
+    def fit(self, texts):
+        rows, codes = self._tokenize(texts)
+        buckets = codes & ((1 << IDF_BUCKET_BITS) - 1)
+        # Document frequency counts a token once per text
+        unique = np.unique(rows.astype(np.int64) << IDF_BUCKET_BITS | buckets) & ((1 << IDF_BUCKET_BITS) - 1)
+        frequency = np.bincount(unique, minlength=1 << IDF_BUCKET_BITS)
+        self.idf = (np.log((1 + len(texts)) / (1 + frequency)) + 1).astype(np.float32)
+        return self
+
+    def transform(self, texts):
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for start in range(0, len(texts), CHUNK_ROWS):
+            chunk = texts[start:start + CHUNK_ROWS]
+            rows, codes = self._tokenize(chunk)
+            weights = self.idf[codes & ((1 << IDF_BUCKET_BITS) - 1)] * (1 - 2 * (codes >> 31 & 1))
+            dimensions = (codes >> IDF_BUCKET_BITS & ((1 << DIMENSION_BITS) - 1)) % self.dimensions
+            block = np.bincount(rows * self.dimensions + dimensions, weights, minlength=len(chunk) * self.dimensions)
+            vectors[start:start + len(chunk)] = block.reshape(-1, self.dimensions)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+def spherical_kmeans(vectors, n_lists, iterations=ANN_KMEANS_ITERATIONS, sample=ANN_TRAIN_SAMPLE, seed=0):
+    # Unit-length centroids trained on a sample; empty lists restart from a random vector
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample:
+        vectors = vectors[np.sort(rng.choice(len(vectors), sample, replace=False))]
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = assign_lists(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        empty = np.bincount(assignment, minlength=n_lists) == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.where(norms > 0, norms, 1)
+    return centroids.astype(np.float32)
+
+
+def assign_lists(vectors, centroids):
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), CHUNK_ROWS):
+        assignment[start:start + CHUNK_ROWS] = np.argmax(vectors[start:start + CHUNK_ROWS] @ centroids.T, axis=1)
+    return assignment
+
+
+class IVFIndex:
+    # Inverted-file index: vectors grouped by their nearest centroid, stored list after list. A query scores
+    # the centroids, then only the vectors of the nprobe best lists; more lists means better recall, more time.
+    def __init__(self, vectorizer, centroids, assignment, vectors, digests, nprobe=ANN_NPROBE):
+        self.vectorizer = vectorizer
+        self.centroids = centroids
+        self.nprobe = nprobe
+        self.assignment = assignment
+        # text_digests of the text every row was vectorized from, to find the rows a new catalog changed
+        self.digests = digests
+
+        # Row positions ordered by list, and the start of every list in that order
+        self.ids = np.argsort(assignment, kind='stable')
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=len(centroids)))))
+        self.vectors = vectors[self.ids]
+        self.slots = np.empty_like(self.ids)
+        self.slots[self.ids] = np.arange(len(self.ids))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, texts, n_lists=ANN_LISTS, nprobe=ANN_NPROBE, seed=0):
+        vectorizer = TextVectorizer().fit(texts)
+        vectors = vectorizer.transform(texts)
+        n_lists = min(len(vectors), n_lists or max(1, int(np.sqrt(len(vectors)))))
+        centroids = spherical_kmeans(vectors, n_lists, seed=seed)
+        return cls(vectorizer, centroids, assign_lists(vectors, centroids), vectors, text_digests(texts), nprobe)
+
+    def vector(self, position):
+        return self.vectors[self.slots[position]]
+
+    def updated(self, texts, digests=None):
+        # New index over texts, whose first len(self) rows are the products of this index: rows whose text
+        # changed are vectorized again, rows past len(self) are appended, and both join the lists of their
+        # nearest centroids. The centroids and IDF weights stay, so nothing is clustered again.
+        digests = text_digests(texts) if digests is None else digests
+        rows = np.concatenate((np.flatnonzero(digests[:len(self)] != self.digests), np.arange(len(self), len(texts))))
+        if not len(rows):
+            return self
+        vectors = self.vectorizer.transform([texts[row] for row in rows.tolist()])
+
+        all_vectors = np.empty((len(texts), self.vectors.shape[1]), dtype=self.vectors.dtype)
+        all_vectors[:len(self)] = self.vectors[self.slots]
+        all_vectors[rows] = vectors
+        assignment = np.empty(len(texts), dtype=self.assignment.dtype)
+        assignment[:len(self)] = self.assignment
+        assignment[rows] = assign_lists(vectors, self.centroids)
+        return IVFIndex(self.vectorizer, self.centroids, assignment, all_vectors, digests, self.nprobe)
+
+    def search(self, query, count, nprobe=None):
+        # Row positions and scores of the count best vectors in the probed lists, best first. Past the nprobe
+        # best lists, further lists are probed until they hold count vectors, so a deep page is never short.
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        order = top_k(self.centroids @ query, 0, len(self.centroids))
+        covering = int(np.searchsorted(np.cumsum(np.diff(self.indptr)[order]), min(count, len(self)))) + 1
+        lists = order[:max(nprobe, covering)]
+        slots = np.concatenate([np.arange(self.indptr[item], self.indptr[item + 1]) for item in lists])
+        scores = self.vectors[slots] @ query
+        best = top_k(scores, 0, count)
+        return self.ids[slots[best]], scores[best]
+
+    def ranked_page(self, product_index, start, end, nprobe=None):
+        # Same contract as the neighbor indexes: ranks [start, end) of the products closest to product_index
+        return self.search(self.vector(product_index), end, nprobe)[0][start:end]
+
+
+def ann_texts(products, columns=ANN_TEXT_COLUMNS):
+    # Text of every product the vectors are built from, the columns joined by spaces
+    texts = [products[column].fillna('').astype(str).tolist() for column in columns]
+    return texts[0] if len(texts) == 1 else [' '.join(parts) for parts in zip(*texts)]
+
+
+def text_digests(texts):
+    return np.array([zlib.crc32(text.encode()) for text in texts], dtype=np.uint32)
+
+
+def ann_index(catalog, previous=None):
+    # Updates the index of previous when catalog kept its products in place (appending, or changing the text of
+    # fewer than half of them), else builds a new one; past that the centroids and IDF weights would be stale
+    texts = ann_texts(catalog.products)
+    index = previous.__dict__.get('ann') if previous is not None else None
+    if (index is not None and len(index) <= len(catalog)
+            and np.array_equal(previous.product_ids, catalog.product_ids[:len(previous.product_ids)])):
+        digests = text_digests(texts)
+        if np.count_nonzero(digests[:len(index)] != index.digests) * 2 < len(index):
+            return index.updated(texts, digests)
+    return IVFIndex.build(texts)
+
+
+def ann_depth(catalog):
+    # Ranks served per product, like the precomputed neighbor indexes
+    return min(len(catalog), NEIGHBOR_COUNT)
@@ -0,0 +1,46 @@
+import numpy as np
+
+from Utils.hybrid import blend_rows, row_scores
+
+
+def gather_rows(similarity, positions):
+    # Dense matrices are sliced in one fancy-indexing call over every product
+    matrix = np.asarray(similarity[positions], dtype=np.float64)
+    return np.arange(matrix.shape[1]), matrix, np.ones(matrix.shape, dtype=bool)
+
+
+def stack_rows(rows):
+    # Sparse (positions, scores) rows scattered onto the union of their candidates;
+    # present marks which candidates each row actually scored
+    candidates = np.unique(np.concatenate([indices for indices, _ in rows]))
+    matrix = np.zeros((len(rows), len(candidates)))
+    present = np.zeros(matrix.shape, dtype=bool)
+    for row, (indices, scores) in enumerate(rows):
+        columns = np.searchsorted(candidates, indices)
+        matrix[row, columns] = scores
+        present[row, columns] = True
+    return candidates, matrix, present
+
+
+def seed_matrix(positions, similarity, collaborative_similarity=None, mode='content', **blend_options):
+    if mode == 'content' or mode == 'collaborative':
+        source = similarity if mode == 'content' else collaborative_similarity
+        if isinstance(source, np.ndarray):
+            return gather_rows(source, positions)
+        return stack_rows([row_scores(source, position) for position in positions])
+
+    if mode == 'hybrid':
+        return stack_rows([blend_rows(row_scores(similarity, position),
+                                      row_scores(collaborative_similarity, position), **blend_options)
+                           for position in positions])
+
+    raise ValueError(f"Unknown mode '{mode}', expected 'content', 'collaborative' or 'hybrid'.")
+
+
+def aggregate_rows(matrix, present, aggregate='sum'):
+    if aggregate == 'sum':
+        return np.where(present, matrix, 0.0).sum(axis=0)
+    if aggregate == 'max':
+        return np.where(present, matrix, -np.inf).max(axis=0)
+    raise ValueError(f"Unknown aggregate '{aggregate}', expected 'sum' or 'max'.")
+
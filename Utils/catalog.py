@@ -0,0 +1,163 @@
+import copy
+from functools import cached_property
+
+import numpy as np
+
+from Utils.ann import ann_index
+from Utils.facets import FacetIndex
+from Utils.metrics import LOOKUPS
+from Utils.price_groups import PriceGroups
+from Utils.price_index import PriceIndex
+from Utils.search_index import match_positions, normalize_name
+
+
+def _read_only(array):
+    array.setflags(write=False)
+    return array
+
+
+def _inverse(order):
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return _read_only(rank)
+
+
+class CatalogSnapshot:
+    # Read-only view of the catalog built once per load; request handlers never mutate it
+    def __init__(self, products, similarity=None, collaborative_similarity=None, search_index=None, version=None):
+        # Derived once here instead of rewriting the shared frame on every request
+        if products['rating_count'].isna().any():
+            products = products.assign(rating_count=products['rating_count'].fillna(0.0))
+
+        self.products = products
+        self.similarity = similarity
+        self.collaborative_similarity = collaborative_similarity
+        self.search_index = search_index
+        self.version = version if version is not None else id(self)
+        # Version of the loaded assets, kept when live updates derive new snapshots from this one
+        self.asset_version = self.version
+        # Last rating folded into collaborative_similarity by live updates
+        self.collaborative_version = 0
+
+    def __len__(self):
+        return len(self.products)
+
+    def replace(self, **changes):
+        # New snapshot sharing everything else, including the derived arrays already computed
+        snapshot = copy.copy(self)
+        snapshot.__dict__.update(changes)
+        return snapshot
+
+    @cached_property
+    def product_ids(self):
+        return _read_only(self.products['product_id'].to_numpy())
+
+    @cached_property
+    def has_duplicate_product_ids(self):
+        return len(np.unique(self.product_ids)) != len(self.product_ids)
+
+    @cached_property
+    def product_id_positions(self):
+        # First row of every product id
+        positions = {}
+        for position, product_id in enumerate(self.products['product_id'].tolist()):
+            positions.setdefault(str(product_id), position)
+        return positions
+
+    @cached_property
+    def name_positions(self):
+        # Rows of every normalized product name, in catalog order
+        positions = {}
+        for position, name in enumerate(self.products['product_name'].tolist()):
+            if isinstance(name, str):
+                positions.setdefault(normalize_name(name), []).append(position)
+        return positions
+
+    @cached_property
+    def facets(self):
+        return FacetIndex.from_products(self.products, self.search_index)
+
+    @cached_property
+    def prices(self):
+        return _read_only(self.products['product_price'].to_numpy(dtype=np.float64))
+
+    @cached_property
+    def weighted_ratings(self):
+        ratings = self.products['product_ratings'].to_numpy(dtype=np.float64)
+        return _read_only(ratings * self.products['rating_count'].to_numpy(dtype=np.float64))
+
+    @cached_property
+    def weighted_rating_order(self):
+        # Descending, ties in catalog order, NaN last
+        return _read_only(np.argsort(-self.weighted_ratings, kind='stable'))
+
+    @cached_property
+    def weighted_rating_rank(self):
+        return _inverse(self.weighted_rating_order)
+
+    @cached_property
+    def price_groups(self):
+        return PriceGroups.from_products(self.products, self.prices)
+
+    @cached_property
+    def ann(self):
+        return ann_index(self)
+
+    @cached_property
+    def price_index(self):
+        return PriceIndex(self.prices)
+
+    def match_positions(self, column, query):
+        return match_positions(self.products, column, query, self.search_index)
+
+    def id_positions(self, product_ids):
+        # Every row holding one of product_ids, in catalog order
+        if self.has_duplicate_product_ids:
+            keys = {str(product_id).strip() for product_id in product_ids}
+            return np.flatnonzero([str(product_id) in keys for product_id in self.products['product_id'].tolist()])
+
+        positions = (self.product_id_positions.get(str(product_id).strip()) for product_id in product_ids)
+        return np.unique(np.array([position for position in positions if position is not None], dtype=np.int64))
+
+    def exact_position(self, query):
+        # First row whose normalized name or product id equals query, in O(1)
+        positions = self.name_positions.get(normalize_name(query))
+        if positions is not None:
+            return positions[0]
+        return self.product_id_positions.get(str(query).strip())
+
+    def resolve_position(self, query):
+        # Seed product of a recommendation: the exact match when there is one, else the first substring match
+        position = self.exact_position(query)
+        if position is not None:
+            LOOKUPS.inc('seed', 'exact')
+            return position
+
+        matching_positions = self.match_positions('product_name', query)
+        LOOKUPS.inc('seed', 'substring' if len(matching_positions) else 'miss')
+        return int(matching_positions[0]) if len(matching_positions) else None
+
+    def ordered(self, order, rank, positions=None):
+        # Positions rearranged into a precomputed order without sorting the catalog again
+        if positions is None:
+            return order
+        if len(positions) * 8 < len(order):
+            return positions[np.argsort(rank[positions], kind='stable')]
+
+        mask = np.zeros(len(order), dtype=bool)
+        mask[positions] = True
+        return order[mask[order]]
+
+    def by_weighted_rating(self, positions=None):
+        return self.ordered(self.weighted_rating_order, self.weighted_rating_rank, positions)
+
+    def by_price(self, positions=None, min_price=None, max_price=None, positive=False):
+        # Price-ordered positions, optionally limited to a price range, straight from the price index
+        start, end = self.price_index.bounds(min_price, max_price, positive)
+        return self.price_index.select(start, end, positions)
+
+
+def as_catalog(products):
+    if isinstance(products, CatalogSnapshot):
+        return products
+    return CatalogSnapshot(products)
@@ -0,0 +1,127 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from Config.config import ASSETS_DIR, CATALOG_WATCH_INTERVAL
+from Utils.serializer import PRODUCT_FIELDS
+from Utils.utils import asset_version
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = {column for _, column in PRODUCT_FIELDS} | {'tags'}
+
+
+def validate_catalog(catalog):
+    # Rejects assets that would break the endpoints before they replace the serving catalog
+    products = catalog.products
+    missing = REQUIRED_COLUMNS.difference(products.columns)
+    if missing:
+        raise ValueError(f"Catalog is missing columns: {', '.join(sorted(missing))}.")
+    if not len(products):
+        raise ValueError("Catalog has no products.")
+    if products['product_id'].isna().any():
+        raise ValueError("Catalog has products without a product_id.")
+
+    for name in ('similarity', 'collaborative_similarity'):
+        similarity = getattr(catalog, name)
+        if len(similarity) != len(products):
+            raise ValueError(f"{name} has {len(similarity)} rows for {len(products)} products.")
+        shape = getattr(similarity, 'shape', None)
+        if shape is not None and tuple(shape) != (len(products), len(products)):
+            raise ValueError(f"{name} has shape {tuple(shape)} for {len(products)} products.")
+        indices = getattr(similarity, 'indices', None)
+        if indices is not None and len(indices) and (indices.min() < 0 or indices.max() >= len(products)):
+            raise ValueError(f"{name} points at products outside the catalog.")
+
+
+class CatalogReloader:
+    # Loads the assets again in the background and hands the new snapshot to publish once it validates.
+    # Requests already running keep the snapshot they started with.
+    def __init__(self, load, publish, current, assets_dir=ASSETS_DIR, watch_interval=CATALOG_WATCH_INTERVAL):
+        self._load = load
+        self._publish = publish
+        self._current = current
+        self.assets_dir = assets_dir
+        self.watch_interval = watch_interval
+        self.last_report = None
+
+        self._reload_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._rejected_version = None
+        self._worker = None
+        self._worker_pid = None
+        self._stopped = threading.Event()
+
+    @property
+    def reloading(self):
+        return self._reload_lock.locked()
+
+    def reload(self):
+        # Returns the report of this reload, or None when another one is already running
+        if not self._reload_lock.acquire(blocking=False):
+            return None
+
+        try:
+            previous = self._current()
+            report = {'previous_version': previous.version}
+            started = time.perf_counter()
+            try:
+                catalog = self._load(self.assets_dir)
+                loaded = time.perf_counter()
+                validate_catalog(catalog)
+                validated = time.perf_counter()
+                self._publish(catalog)
+                swapped = time.perf_counter()
+
+                report.update({
+                    'success': True,
+                    'version': self._current().version,
+                    'products': len(catalog),
+                    'load_seconds': round(loaded - started, 4),
+                    'validate_seconds': round(validated - loaded, 4),
+                    'swap_seconds': round(swapped - validated, 4),
+                })
+                logger.info('Catalog reloaded: version %s, %d products', catalog.version, len(catalog))
+            except Exception as e:
+                logger.exception('Catalog reload failed, keeping version %s', previous.version)
+                report.update({'success': False, 'error': str(e)})
+
+            report['finished_at'] = datetime.utcnow().isoformat()
+            self.last_report = report
+            return report
+        finally:
+            self._reload_lock.release()
+
+    def reload_in_background(self):
+        if self.reloading:
+            return False
+        threading.Thread(target=self.reload, name='catalog-reload', daemon=True).start()
+        return True
+
+    def ensure_watching(self):
+        if not self.watch_interval or (self._worker_pid == os.getpid() and self._worker.is_alive()):
+            return
+        with self._start_lock:
+            if self._worker_pid != os.getpid() or not self._worker.is_alive():
+                self._worker_pid = os.getpid()
+                self._worker = threading.Thread(target=self._watch, name='catalog-watcher', daemon=True)
+                self._worker.start()
+
+    def _watch(self):
+        pending = None
+        while not self._stopped.wait(self.watch_interval):
+            try:
+                version = asset_version(self.assets_dir)
+                # Only reload once the files stopped changing for a whole interval, never halfway through a copy
+                if version == pending and version not in (self._current().asset_version, self._rejected_version):
+                    report = self.reload()
+                    if report is not None and not report['success']:
+                        self._rejected_version = version
+                pending = version
+            except Exception:
+                logger.exception('Watching %s for new assets failed', self.assets_dir)
+
+    def stop(self):
+        self._stopped.set()
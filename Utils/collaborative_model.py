@@ -0,0 +1,208 @@
+import logging
+import math
+import os
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+from Config.config import (COLLABORATIVE_LIVE_WEIGHT, COLLABORATIVE_SHRINKAGE, COLLABORATIVE_UPDATE_INTERVAL,
+                           NEIGHBOR_COUNT)
+from Utils.ranking import ranked_page, top_k
+
+logger = logging.getLogger(__name__)
+
+
+class CoRatingModel:
+    # Sparse item-user co-rating statistics: per-item rating norms and per-pair dot products
+    def __init__(self, shrinkage=COLLABORATIVE_SHRINKAGE):
+        self.shrinkage = shrinkage
+        self.user_ratings = defaultdict(dict)
+        self.norms = defaultdict(float)
+        self.dots = defaultdict(lambda: defaultdict(float))
+        self.co_counts = defaultdict(lambda: defaultdict(int))
+
+    def add(self, user_id, item, rating):
+        # Returns the items whose similarity rows changed
+        ratings = self.user_ratings[user_id]
+        previous = ratings.get(item)
+        if previous == rating:
+            return set()
+
+        delta = rating - (previous or 0)
+        self.norms[item] += rating * rating - (previous or 0) ** 2
+        for other, other_rating in ratings.items():
+            if other == item:
+                continue
+            self.dots[item][other] += delta * other_rating
+            self.dots[other][item] += delta * other_rating
+            if previous is None:
+                self.co_counts[item][other] += 1
+                self.co_counts[other][item] += 1
+
+        ratings[item] = rating
+        # The new norm of item changes its cosine with every item it was co-rated with, by any user
+        dots = self.dots.get(item)
+        return set(dots) | {item} if dots else set()
+
+    def similarities(self, item):
+        # Cosine similarity to every co-rated item, shrunk toward zero when few users rated both
+        dots = self.dots.get(item)
+        if not dots:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        others = sorted(dots)
+        item_norm = math.sqrt(self.norms[item])
+        scores = []
+        for other in others:
+            co_count = self.co_counts[item][other]
+            cosine = dots[other] / ((item_norm * math.sqrt(self.norms[other])) or 1.0)
+            scores.append(cosine * co_count / (co_count + self.shrinkage))
+        return np.array(others, dtype=np.int64), np.array(scores, dtype=np.float64)
+
+
+class LiveNeighborIndex:
+    # Base collaborative similarity with the rows touched by live ratings replaced by blended neighbor lists.
+    # overrides maps a row to (ranked indices, their scores, added scores). Over a dense base a blended row keeps
+    # its full length: its best ranks are stored, and deeper pages rank the base row plus the added live scores.
+    def __init__(self, base, overrides=None):
+        self.base = base
+        self.overrides = overrides or {}
+
+    def __len__(self):
+        return len(self.base)
+
+    def __getitem__(self, product_index):
+        if product_index in self.overrides:
+            _, scores, added = self.overrides[product_index]
+            if added is None:
+                return scores
+            row = np.array(self.base[product_index], dtype=np.float64)
+            row[added[0]] += added[1]
+            return row
+        return self.base[product_index]
+
+    def neighbors(self, product_index):
+        if product_index in self.overrides:
+            indices, scores, added = self.overrides[product_index]
+            if added is None:
+                return indices, scores
+            row = self[product_index]
+            return np.arange(len(row)), row
+        if hasattr(self.base, 'neighbors'):
+            return self.base.neighbors(product_index)
+        scores = np.asarray(self.base[product_index])
+        return np.arange(len(scores)), scores
+
+    def ranked_page(self, product_index, start, end, cache=None):
+        if product_index in self.overrides:
+            indices, _, added = self.overrides[product_index]
+            if added is None or end <= len(indices):
+                return indices[start:end]
+            return top_k(self[product_index], start, end)
+        return ranked_page(self.base, product_index, start, end, cache)
+
+    def blend(self, product_index, live_indices, live_scores, live_weight=COLLABORATIVE_LIVE_WEIGHT,
+              n_neighbors=NEIGHBOR_COUNT):
+        # Every co-rated item scored base + live_weight * live similarity. A neighbor index row keeps all of its
+        # neighbors; a dense row stores its n_neighbors best ranks, which only its base top n_neighbors and the
+        # co-rated items can reach, since live similarities are never negative
+        added = live_weight * live_scores
+        if hasattr(self.base, 'neighbors'):
+            base_indices, base_scores = self.base.neighbors(product_index)
+            candidates = np.union1d(base_indices, live_indices)
+            scores = np.zeros(len(candidates))
+            scores[np.searchsorted(candidates, base_indices)] = base_scores
+            scores[np.searchsorted(candidates, live_indices)] += added
+            ranked = top_k(scores, 0, len(candidates))
+            return candidates[ranked].astype(np.int32), scores[ranked].astype(np.float32), None
+
+        row = np.asarray(self.base[product_index])
+        candidates = np.union1d(top_k(row, 0, n_neighbors), live_indices)
+        scores = row[candidates].astype(np.float64)
+        scores[np.searchsorted(candidates, live_indices)] += added
+        ranked = top_k(scores, 0, n_neighbors)
+        return candidates[ranked].astype(np.int32), scores[ranked].astype(np.float32), (live_indices, added)
+
+    def with_rows(self, rows):
+        overrides = dict(self.overrides)
+        overrides.update(rows)
+        return LiveNeighborIndex(self.base, overrides)
+
+
+class CollaborativeUpdater:
+    # Folds newly stored ratings into the co-rating model and publishes refreshed neighbor rows.
+    # Every worker reads the ratings table itself, so all processes converge on the same rows.
+    def __init__(self, base, fetch_ratings, resolve_position, publish, interval=COLLABORATIVE_UPDATE_INTERVAL):
+        self.model = CoRatingModel()
+        self.index = LiveNeighborIndex(base)
+        self.last_rating_id = 0
+        self._fetch_ratings = fetch_ratings
+        self._resolve_position = resolve_position
+        self._publish = publish
+        self.interval = interval
+
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self._stopped = threading.Event()
+
+    def update(self):
+        with self._lock:
+            return self._update()
+
+    def _update(self):
+        affected = set()
+        for rating_id, user_id, product_id, user_rating in self._fetch_ratings(self.last_rating_id):
+            position = self._resolve_position(product_id)
+            if position is not None and user_rating is not None:
+                affected |= self.model.add(user_id, position, user_rating)
+            self.last_rating_id = rating_id
+
+        if not affected:
+            return False
+
+        rows = {item: self.index.blend(item, *self.model.similarities(item)) for item in affected}
+        self.index = self.index.with_rows(rows)
+        self._publish(self.index, self.last_rating_id)
+        return True
+
+    def rebase(self, base, install, reset=False):
+        # Swaps in a freshly loaded base similarity while no update can publish rows of the old one.
+        # install(index, last_rating_id) publishes it with the new catalog; the live rows are then
+        # re-blended on the new base, or replayed from the ratings table with reset when rows moved.
+        with self._lock:
+            if reset:
+                self.model = CoRatingModel(self.model.shrinkage)
+                self.last_rating_id = 0
+                self.index = LiveNeighborIndex(base)
+            else:
+                index = LiveNeighborIndex(base)
+                rows = {item: index.blend(item, *self.model.similarities(item)) for item in self.index.overrides}
+                self.index = index.with_rows(rows)
+
+            install(self.index, self.last_rating_id)
+            if reset:
+                self._update()
+            return self.index
+
+    def ensure_started(self):
+        if self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker_pid != os.getpid() or not self._worker.is_alive():
+                self._worker_pid = os.getpid()
+                self._worker = threading.Thread(target=self._run, name='collaborative-updater', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.update()
+            except Exception:
+                logger.exception('Collaborative similarity update failed')
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
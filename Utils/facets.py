@@ -0,0 +1,71 @@
+import numpy as np
+
+from Utils.search_index import EMPTY_POSITIONS, TokenIndex
+
+
+def _gather(indptr, values, positions):
+    # values of every row in positions from a CSR layout, without a Python loop over the rows
+    starts = indptr[positions]
+    lengths = indptr[positions + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return values[np.arange(lengths.sum()) + offsets]
+
+
+class FacetIndex:
+    # Sorted position arrays per category tag and per store, built once per catalog. Filters intersect
+    # them; counts for a result set read each row's facet codes instead of rescanning the strings.
+    def __init__(self, category_index, store_index, n_products):
+        self.n_products = n_products
+        self.tags = sorted(category_index.tokens)
+        self.tag_positions = {tag: np.unique(category_index.tokens[tag]) for tag in self.tags}
+        self.stores = sorted(value for value in store_index.values if isinstance(value, str))
+        self.store_positions = {store: store_index.values[store] for store in self.stores}
+
+        # Tags of every row in CSR layout, rows in catalog order
+        rows = np.concatenate([self.tag_positions[tag] for tag in self.tags] or [EMPTY_POSITIONS])
+        codes = np.repeat(np.arange(len(self.tags)), [len(self.tag_positions[tag]) for tag in self.tags])
+        order = np.argsort(rows, kind='stable')
+        self.row_tags = codes[order]
+        self.tag_indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n_products))))
+
+        self.row_stores = np.full(n_products, -1, dtype=np.int64)
+        for code, store in enumerate(self.stores):
+            self.row_stores[self.store_positions[store]] = code
+
+    @classmethod
+    def from_products(cls, products, search_index=None):
+        if search_index is not None:
+            columns = search_index.columns
+            return cls(columns['product_category'], columns['product_store'], len(products))
+        return cls(TokenIndex(products['product_category'].tolist()), TokenIndex(products['product_store'].tolist()),
+                   len(products))
+
+    def filter(self, tags=(), stores=()):
+        # Rows carrying every tag and any of the stores, or None when neither is given
+        positions = None
+        for tag in tags:
+            postings = self.tag_positions.get(tag, EMPTY_POSITIONS)
+            positions = postings if positions is None else np.intersect1d(positions, postings, assume_unique=True)
+
+        if stores:
+            postings = np.unique(np.concatenate([self.store_positions.get(store, EMPTY_POSITIONS)
+                                                 for store in stores]))
+            positions = postings if positions is None else np.intersect1d(positions, postings, assume_unique=True)
+        return positions
+
+    def counts(self, positions):
+        # Products per tag and per store within positions, most frequent first
+        positions = np.asarray(positions, dtype=np.int64)
+        tag_counts = np.bincount(_gather(self.tag_indptr, self.row_tags, positions), minlength=len(self.tags))
+        store_codes = self.row_stores[positions]
+        store_counts = np.bincount(store_codes[store_codes >= 0], minlength=len(self.stores))
+        return {
+            'tags': self._ranked(self.tags, tag_counts),
+            'stores': self._ranked(self.stores, store_counts),
+        }
+
+    @staticmethod
+    def _ranked(names, counts):
+        present = np.flatnonzero(counts)
+        order = present[np.argsort(-counts[present], kind='stable')]
+        return {names[code]: int(counts[code]) for code in order}
@@ -0,0 +1,47 @@
+import numpy as np
+
+from Config.config import HYBRID_COLLABORATIVE_WEIGHT, HYBRID_CONTENT_WEIGHT, HYBRID_FUSION, HYBRID_RRF_K
+from Utils.ranking import top_k
+
+
+def row_scores(similarity, product_index):
+    # (positions, scores) of one similarity row: stored neighbors for indexes, every product for dense matrices
+    if hasattr(similarity, 'neighbors'):
+        indices, scores = similarity.neighbors(product_index)
+        return np.asarray(indices, dtype=np.int64), np.asarray(scores, dtype=np.float64)
+
+    scores = np.asarray(similarity[product_index], dtype=np.float64)
+    return np.arange(len(scores)), scores
+
+
+def _reciprocal_ranks(scores, rrf_k):
+    ranks = np.empty(len(scores))
+    ranks[top_k(scores, 0, len(scores))] = np.arange(1, len(scores) + 1)
+    return 1.0 / (rrf_k + ranks)
+
+
+def blend_rows(content, collaborative, content_weight=HYBRID_CONTENT_WEIGHT,
+               collaborative_weight=HYBRID_COLLABORATIVE_WEIGHT, fusion=HYBRID_FUSION, rrf_k=HYBRID_RRF_K):
+    # Weighted sum of both score vectors, or of their reciprocal ranks with fusion='rank';
+    # a product missing from one row contributes nothing from it
+    content_indices, content_scores = content
+    collaborative_indices, collaborative_scores = collaborative
+    if fusion == 'rank':
+        content_scores = _reciprocal_ranks(content_scores, rrf_k)
+        collaborative_scores = _reciprocal_ranks(collaborative_scores, rrf_k)
+    elif fusion != 'weighted':
+        raise ValueError(f"Unknown fusion '{fusion}', expected 'weighted' or 'rank'.")
+
+    candidates = np.union1d(content_indices, collaborative_indices)
+    scores = np.zeros(len(candidates))
+    np.add.at(scores, np.searchsorted(candidates, content_indices), content_weight * content_scores)
+    np.add.at(scores, np.searchsorted(candidates, collaborative_indices), collaborative_weight * collaborative_scores)
+    return candidates, scores
+
+
+def dedupe_by_product_id(candidates, scores, product_ids):
+    # Keeps the best scoring row of every product id
+    order = top_k(scores, 0, len(scores))
+    _, first = np.unique(product_ids[candidates[order]], return_index=True)
+    keep = np.sort(order[first])
+    return candidates[keep], scores[keep]
@@ -0,0 +1,150 @@
+import gzip
+import json
+import math
+import secrets
+from datetime import date, datetime, time
+from json.encoder import encode_basestring, encode_basestring_ascii
+
+import numpy as np
+import pandas as pd
+from flask import request
+
+from Config.config import JSON_COMPRESS_MIN_BYTES, JSON_COMPRESSION
+from Utils.metrics import TimedJSONProvider
+from Utils.serializer import ProductBlock
+
+# Both encoders are optional: without orjson the standard library encodes, without brotli only gzip is offered
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Product blocks are written into the encoded document in place of these strings
+_BLOCK_MARK = f'\x00product-block-{secrets.token_hex(8)}:'
+
+
+def _plain(value):
+    # NumPy and pandas scalars, arrays, missing values and datetimes as JSON-ready Python values
+    if isinstance(value, np.ndarray):
+        return [_plain(item) for item in value.tolist()] if value.dtype.kind in 'fcOM' else value.tolist()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (pd.Timedelta, np.timedelta64)):
+        return pd.Timedelta(value).total_seconds()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if isinstance(value, pd.Series):
+        return [_plain(item) for item in value.tolist()]
+    return value
+
+
+def _finite(value):
+    # The standard library writes NaN and Infinity, which are not JSON; orjson writes null for them already
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+class FastJSONProvider(TimedJSONProvider):
+    # orjson when installed, the standard library otherwise; NumPy/pandas values, NaN and datetimes come out
+    # the same with both. Without orjson, product blocks are encoded column by column through a row template.
+    def default(self, value):
+        plain = _plain(value)
+        # Anything else (dataclasses, UUIDs, decimals) the way Flask's provider encodes it
+        return super().default(value) if plain is value else plain
+
+    def _orjson_default(self, value):
+        # orjson writes the record dicts of a block faster than Python can join its encoded columns
+        if isinstance(value, ProductBlock):
+            return value.records()
+        return self.default(value)
+
+    def dumps(self, obj, **kwargs):
+        # Flask passes compact separators, or indent=2 in debug mode; anything else goes to the standard library
+        if orjson is not None and set(kwargs) <= {'separators', 'indent'} and kwargs.get('indent') in (None, 2):
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if kwargs.get('indent'):
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(obj, default=self._orjson_default, option=option).decode()
+
+        blocks = []
+
+        def default(value):
+            if isinstance(value, ProductBlock):
+                blocks.append(value)
+                return f'{_BLOCK_MARK}{len(blocks) - 1}'
+            return _finite(self.default(value))
+
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        text = json.dumps(_finite(obj), default=default, **kwargs)
+        encode_string = encode_basestring_ascii if kwargs['ensure_ascii'] else encode_basestring
+        for number, block in enumerate(blocks):
+            text = text.replace(encode_string(f'{_BLOCK_MARK}{number}'), self.encode_block(block, encode_string), 1)
+        return text
+
+    def encode_block(self, block, encode_string=encode_basestring_ascii):
+        # '[{"field": value, ...}, ...]' from one list of encoded values per column and a row template
+        fields = sorted(block.columns) if self.sort_keys else list(block.columns)
+        if not len(block):
+            return '[]'
+        template = '{' + ','.join(encode_string(field).replace('%', '%%') + ':%s' for field in fields) + '}'
+        columns = [self.encode_column(block.columns[field], encode_string) for field in fields]
+        return '[' + ','.join(template % row for row in zip(*columns)) + ']'
+
+    def encode_column(self, values, encode_string=encode_basestring_ascii):
+        values = values.tolist() if isinstance(values, np.ndarray) else list(values)
+        kinds = set(map(type, values))
+        if kinds <= {str}:
+            return list(map(encode_string, values))
+        if kinds <= {int}:
+            return list(map(int.__repr__, values))
+        if kinds <= {float, int}:
+            return [repr(value) if math.isfinite(value) else 'null' for value in values]
+        return [self.dumps(value) for value in values]
+
+
+def compress(response, min_bytes=JSON_COMPRESS_MIN_BYTES):
+    # Brotli or gzip, whichever the client accepts (brotli first), for JSON bodies of at least min_bytes
+    if (not response.is_json or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+    body = response.get_data()
+    if len(body) < min_bytes:
+        return response
+
+    accepted = {coding.split(';')[0].strip() for coding in request.headers.get('Accept-Encoding', '').split(',')}
+    if brotli is not None and 'br' in accepted:
+        response.set_data(brotli.compress(body, quality=4))
+        response.headers['Content-Encoding'] = 'br'
+    elif 'gzip' in accepted:
+        response.set_data(gzip.compress(body, compresslevel=5))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def install_json_provider(app, compression=JSON_COMPRESSION):
+    app.json = FastJSONProvider(app)
+    if compression:
+        # After the response cache, which keeps the uncompressed body for clients that accept neither
+        app.after_request(compress)
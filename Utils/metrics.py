@@ -0,0 +1,163 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+from flask import g, request
+from flask.json.provider import DefaultJSONProvider
+
+from Config.config import METRICS_BUCKETS, METRICS_ENABLED
+
+REGISTRY = []
+NULL_TIMER = nullcontext()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return '+Inf' if value == float('inf') else repr(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} counter'
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+
+
+class CallbackMetric:
+    # Counter or gauge whose samples are read from existing state, e.g. cache hit counts, when scraped
+    def __init__(self, name, documentation, kind, samples, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.samples = samples
+        self.labelnames = labelnames
+        REGISTRY.append(self)
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.kind}'
+        for labels, value in self.samples():
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=METRICS_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, *labels):
+        if not METRICS_ENABLED:
+            return
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][bucket] += 1
+            entry[1] += value
+
+    def time(self, *labels):
+        return Timer(self, labels) if METRICS_ENABLED else NULL_TIMER
+
+    def collect(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            values = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for upper, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", _number(upper))])} {cumulative}'
+            yield f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}'
+
+
+class Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+REQUEST_SECONDS = Histogram('shopwise_request_duration_seconds', 'Time spent handling a request',
+                            ('endpoint', 'method', 'status'))
+STAGE_SECONDS = Histogram('shopwise_stage_duration_seconds', 'Time spent in one stage of a request',
+                          ('function', 'stage'))
+LOOKUPS = Counter('shopwise_lookups_total', 'Catalog lookups by the path that answered them', ('lookup', 'path'))
+
+
+def stage(function, name):
+    # with stage('recommend_products', 'rank'): ...
+    return STAGE_SECONDS.time(function, name)
+
+
+def render():
+    return '\n'.join(line for metric in REGISTRY for line in metric.collect()) + '\n'
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    # Times the JSON encoding of every response body built from a dict or jsonify
+    def response(self, *args, **kwargs):
+        with stage(request.endpoint or 'unknown', 'json'):
+            return super().response(*args, **kwargs)
+
+
+def instrument_app(app):
+    if not METRICS_ENABLED:
+        return
+
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            REQUEST_SECONDS.observe(time.perf_counter() - started, request.endpoint or 'unknown', request.method,
+                                    str(response.status_code))
+        return response
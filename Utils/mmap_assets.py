@@ -0,0 +1,257 @@
+import argparse
+import json
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import ExtensionArray, ExtensionDtype
+from pandas.api.indexers import check_array_indexer
+from pandas.core.strings.object_array import ObjectStringArrayMixin
+
+from Config.config import ASSETS_DIR, CATALOG_CATEGORY_COLUMNS, CATALOG_DEFERRED_COLUMNS, CATALOG_LAZY_LOADING
+
+
+def catalog_path(assets_dir=ASSETS_DIR):
+    return os.path.join(assets_dir, 'catalog')
+
+
+def dense_similarity_path(name, assets_dir=ASSETS_DIR):
+    return os.path.join(assets_dir, f'{name}.npy')
+
+
+def _encode_strings(values):
+    # Arrow-style layout: one UTF-8 blob plus int64 offsets, and which values are missing
+    nulls = np.asarray(pd.isna(values), dtype=bool)
+    encoded = [b'' if null else str(value).encode('utf-8') for value, null in zip(values, nulls)]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8), nulls
+
+
+def _write_string_column(path, name, values):
+    # Both arrays are loadable with mmap_mode='r'
+    offsets, data, nulls = _encode_strings(values)
+    np.save(os.path.join(path, f'{name}.offsets.npy'), offsets)
+    np.save(os.path.join(path, f'{name}.data.npy'), data)
+    if nulls.any():
+        np.save(os.path.join(path, f'{name}.nulls.npy'), nulls)
+    return bool(nulls.any())
+
+
+def _read_string_column(path, name, nulls):
+    offsets = np.load(os.path.join(path, f'{name}.offsets.npy'), mmap_mode='r')
+    data = np.load(os.path.join(path, f'{name}.data.npy'), mmap_mode='r').tobytes()
+    bounds = offsets.tolist()
+    values = [data[start:end].decode('utf-8') for start, end in zip(bounds[:-1], bounds[1:])]
+
+    values = np.array(values, dtype=object)
+    if nulls:
+        values[np.load(os.path.join(path, f'{name}.nulls.npy'))] = None
+    return values
+
+
+def _deferred_string_column(path, name, nulls):
+    # Plain ndarray views of the maps: indexing a np.memmap costs more than decoding a page of rows
+    return DeferredStringArray(np.load(os.path.join(path, f'{name}.offsets.npy'), mmap_mode='r').view(np.ndarray),
+                               np.load(os.path.join(path, f'{name}.data.npy'), mmap_mode='r').view(np.ndarray),
+                               np.load(os.path.join(path, f'{name}.nulls.npy')) if nulls else None)
+
+
+class DeferredStringDtype(ExtensionDtype):
+    name = 'deferred_string'
+    type = str
+    kind = 'O'
+    na_value = np.nan
+
+    @classmethod
+    def construct_array_type(cls):
+        return DeferredStringArray
+
+
+class DeferredStringArray(ObjectStringArrayMixin, ExtensionArray):
+    # Read-only strings left in the memory-mapped blob of a converted catalog. Slicing and take() only pick
+    # rows; values are decoded when they are read, so a response decodes the rows it returns and nothing else.
+    # rows maps positions of this array to rows of the blob, -1 for a missing value. The .str methods decode
+    # every row and return the same results as an object column.
+    def __init__(self, offsets, data, nulls=None, rows=None):
+        self._offsets = offsets
+        self._data = data
+        self._nulls = nulls
+        self._rows = rows
+
+    @property
+    def dtype(self):
+        return DeferredStringDtype()
+
+    @property
+    def nbytes(self):
+        return self._offsets.nbytes + self._data.nbytes + (0 if self._rows is None else self._rows.nbytes)
+
+    def __len__(self):
+        return len(self._offsets) - 1 if self._rows is None else len(self._rows)
+
+    def _positions(self, indices=None):
+        # Blob rows of indices (every position by default), without building the identity mapping for them
+        if self._rows is not None:
+            return self._rows if indices is None else self._rows[indices]
+        if indices is None or isinstance(indices, slice):
+            return np.arange(len(self))[slice(None) if indices is None else indices]
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            return np.flatnonzero(indices)
+        indices = indices.astype(np.int64, copy=False)
+        if not len(indices):
+            return indices
+        lowest = indices.min()
+        if lowest < -len(self) or indices.max() >= len(self):
+            raise IndexError('index out of bounds')
+        return indices if lowest >= 0 else np.where(indices < 0, indices + len(self), indices)
+
+    def _decode(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        missing = self._missing(rows)
+        data = memoryview(self._data)
+        values = np.array([str(data[start:end], 'utf-8')
+                           for start, end in zip(self._offsets[rows].tolist(), self._offsets[rows + 1].tolist())],
+                          dtype=object)
+        if missing.any():
+            values[missing] = np.nan
+        return values
+
+    def _missing(self, rows):
+        missing = rows < 0
+        if self._nulls is not None:
+            missing[~missing] = self._nulls[rows[~missing]]
+        return missing
+
+    def _with_rows(self, rows):
+        return DeferredStringArray(self._offsets, self._data, self._nulls, rows)
+
+    def __getitem__(self, item):
+        if isinstance(item, (int, np.integer)):
+            return self._decode(self._positions([item]))[0]
+        if not isinstance(item, slice):
+            item = check_array_indexer(self, item)
+        return self._with_rows(np.asarray(self._positions(item), dtype=np.int64))
+
+    def __array__(self, dtype=None, copy=None):
+        values = self._decode(self._positions())
+        return values if dtype is None else values.astype(dtype)
+
+    def __eq__(self, other):
+        return np.asarray(self) == other
+
+    def tolist(self):
+        return self._decode(self._positions()).tolist()
+
+    def isna(self):
+        return self._missing(np.asarray(self._positions(), dtype=np.int64))
+
+    def fillna(self, value, limit=None, copy=True):
+        values = np.asarray(self)
+        missing = pd.isna(values)
+        if not missing.any():
+            return self.copy() if copy else self
+        if limit is not None:
+            missing[np.flatnonzero(missing)[limit:]] = False
+        values[missing] = value
+        return self._from_sequence(values)
+
+    def take(self, indices, allow_fill=False, fill_value=None):
+        indices = np.asarray(indices, dtype=np.int64)
+        if not allow_fill:
+            return self._with_rows(np.asarray(self._positions(indices), dtype=np.int64))
+        if (indices < -1).any():
+            raise ValueError("Invalid value in 'indices'. Must be all >= -1 for allow_fill=True")
+        rows = np.full(len(indices), -1, dtype=np.int64)
+        rows[indices >= 0] = self._positions(indices[indices >= 0])
+        return self._with_rows(rows)
+
+    def copy(self):
+        # Nothing is ever written to the buffers, so a copy shares them
+        return self._with_rows(None if self._rows is None else self._rows.copy())
+
+    @classmethod
+    def _from_sequence(cls, scalars, *, dtype=None, copy=False):
+        return cls(*_encode_strings(np.asarray(scalars, dtype=object)))
+
+    @classmethod
+    def _from_factorized(cls, values, original):
+        return cls._from_sequence(values)
+
+    def _values_for_factorize(self):
+        return np.asarray(self), np.nan
+
+    @classmethod
+    def _concat_same_type(cls, to_concat):
+        return cls._from_sequence(np.concatenate([np.asarray(array) for array in to_concat]))
+
+
+def write_catalog(products, path, category_columns=CATALOG_CATEGORY_COLUMNS):
+    os.makedirs(path, exist_ok=True)
+    columns = []
+    for name in products.columns:
+        values = products[name]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            np.save(os.path.join(path, f'{name}.npy'), values.to_numpy())
+            columns.append({'name': name, 'kind': 'numeric'})
+        elif name in category_columns:
+            # Dictionary encoded: int32 codes (-1 when missing) into the distinct values
+            codes, categories = pd.factorize(values.to_numpy(dtype=object))
+            np.save(os.path.join(path, f'{name}.codes.npy'), codes.astype(np.int32))
+            _write_string_column(path, f'{name}.categories', categories)
+            columns.append({'name': name, 'kind': 'category'})
+        else:
+            nulls = _write_string_column(path, name, values.to_numpy(dtype=object))
+            columns.append({'name': name, 'kind': 'string', 'nulls': nulls})
+
+    # The manifest is written last so a half-converted directory is never picked up by the loader
+    with open(os.path.join(path, 'manifest.json'), 'w') as manifest:
+        json.dump({'rows': len(products), 'columns': columns}, manifest)
+
+
+def read_catalog(path, lazy=CATALOG_LAZY_LOADING, category_columns=CATALOG_CATEGORY_COLUMNS,
+                 deferred_columns=CATALOG_DEFERRED_COLUMNS):
+    # lazy loads category_columns as pandas categoricals and leaves deferred_columns on disk; otherwise every
+    # text column is decoded into Python strings up front
+    with open(os.path.join(path, 'manifest.json')) as manifest:
+        manifest = json.load(manifest)
+
+    columns = {}
+    for column in manifest['columns']:
+        name = column['name']
+        if column['kind'] == 'numeric':
+            # Numeric columns stay memory-mapped, so forked workers share them through the page cache
+            columns[name] = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+        elif column['kind'] == 'category':
+            values = pd.Categorical.from_codes(np.load(os.path.join(path, f'{name}.codes.npy')),
+                                               _read_string_column(path, f'{name}.categories', False))
+            columns[name] = values if lazy else np.asarray(values, dtype=object)
+        elif lazy and name in deferred_columns:
+            columns[name] = _deferred_string_column(path, name, column['nulls'])
+        elif lazy and name in category_columns:
+            # Converted before category columns were written encoded
+            columns[name] = pd.Categorical(_read_string_column(path, name, column['nulls']))
+        else:
+            columns[name] = _read_string_column(path, name, column['nulls'])
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def convert_assets(assets_dir=ASSETS_DIR):
+    product_dict = pickle.load(open(os.path.join(assets_dir, 'products_dictionary.pkl'), 'rb'))
+    write_catalog(pd.DataFrame(product_dict), catalog_path(assets_dir))
+
+    for name in ('similarity', 'collaborative_similarity'):
+        pickle_path = os.path.join(assets_dir, f'{name}.pkl')
+        if os.path.exists(pickle_path):
+            np.save(dense_similarity_path(name, assets_dir), np.asarray(pickle.load(open(pickle_path, 'rb'))))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert the pickled assets to memory-mappable .npy files')
+    parser.add_argument('--assets-dir', default=ASSETS_DIR)
+    args = parser.parse_args()
+
+    convert_assets(args.assets_dir)
@@ -0,0 +1,83 @@
+import argparse
+import os
+import pickle
+
+import numpy as np
+
+from Config.config import ASSETS_DIR, NEIGHBOR_COUNT
+from Utils.ranking import top_k
+
+
+class NeighborIndex:
+    # Top-N neighbors per product in CSR layout, each row already ranked by descending score
+    def __init__(self, indptr, indices, scores):
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, product_index):
+        return self.scores[self.indptr[product_index]:self.indptr[product_index + 1]]
+
+    def neighbors(self, product_index):
+        start, end = self.indptr[product_index], self.indptr[product_index + 1]
+        return self.indices[start:end], self.scores[start:end]
+
+    def ranked_page(self, product_index, start, end, cache=None):
+        return self.neighbors(product_index)[0][start:end]
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.scores.nbytes
+
+    @classmethod
+    def from_dense(cls, similarity, n_neighbors=NEIGHBOR_COUNT):
+        n_items = len(similarity)
+        n_neighbors = min(n_neighbors, n_items)
+
+        indices = np.empty((n_items, n_neighbors), dtype=np.int32)
+        scores = np.empty((n_items, n_neighbors), dtype=np.float32)
+        for product_index in range(n_items):
+            row = np.asarray(similarity[product_index])
+            ranked = top_k(row, 0, n_neighbors)
+            indices[product_index] = ranked
+            scores[product_index] = row[ranked]
+
+        indptr = np.arange(0, n_items * n_neighbors + 1, n_neighbors, dtype=np.int64)
+        return cls(indptr, indices.ravel(), scores.ravel())
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'indptr.npy'), self.indptr)
+        np.save(os.path.join(path, 'indices.npy'), self.indices)
+        np.save(os.path.join(path, 'scores.npy'), self.scores)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        return cls(np.load(os.path.join(path, 'indptr.npy'), mmap_mode=mmap_mode),
+                   np.load(os.path.join(path, 'indices.npy'), mmap_mode=mmap_mode),
+                   np.load(os.path.join(path, 'scores.npy'), mmap_mode=mmap_mode))
+
+
+def neighbor_index_path(name, assets_dir=ASSETS_DIR):
+    return os.path.join(assets_dir, f'{name}_neighbors')
+
+
+def build_neighbor_indexes(assets_dir=ASSETS_DIR, n_neighbors=NEIGHBOR_COUNT):
+    for name in ('similarity', 'collaborative_similarity'):
+        similarity = pickle.load(open(os.path.join(assets_dir, f'{name}.pkl'), 'rb'))
+        index = NeighborIndex.from_dense(similarity, n_neighbors)
+        index.save(neighbor_index_path(name, assets_dir))
+        print(f'{name}: {len(index)} products x {n_neighbors} neighbors, '
+              f'{index.nbytes / 2 ** 20:.1f} MiB (dense: {np.asarray(similarity).nbytes / 2 ** 20:.1f} MiB)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the top-N neighbor indexes from the dense similarity pickles')
+    parser.add_argument('--assets-dir', default=ASSETS_DIR)
+    parser.add_argument('--neighbors', type=int, default=NEIGHBOR_COUNT)
+    args = parser.parse_args()
+
+    build_neighbor_indexes(args.assets_dir, args.neighbors)
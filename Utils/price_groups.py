@@ -0,0 +1,66 @@
+import re
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9+]+')
+# Words stores add around the same product name. Memory and storage sizes are kept: they tell SKUs apart
+NOISE_TOKENS = {'ram', 'rom', 'storage', 'with', 'and', 'the', 'pta', 'approved', 'official', 'warranty', 'edition',
+                'dual', 'sim'}
+
+
+def equivalence_key(name):
+    # Listings of the same product in different stores share this key
+    tokens = TOKEN_PATTERN.findall(str(name).casefold())
+    kept = {token for token in tokens if token not in NOISE_TOKENS}
+    return ' '.join(sorted(kept))
+
+
+class PriceGroups:
+    # Listings grouped across stores by equivalence_key, members of every group stored cheapest first, and the
+    # price range of every group in columns. Only positive prices count; the other listings sort last.
+    # A name with no key tokens left says nothing about the product, so its listing is a group of its own.
+    def __init__(self, names, stores, prices):
+        keys = np.array([equivalence_key(name) for name in names], dtype=object)
+        empty = keys == ''
+        self.keys, grouped = np.unique(keys[~empty], return_inverse=True)
+        self.group_of = np.empty(len(keys), dtype=np.int64)
+        self.group_of[~empty] = grouped
+        self.group_of[empty] = len(self.keys) + np.arange(np.count_nonzero(empty))
+        self.keys = np.concatenate((self.keys, keys[empty]))
+        self.prices = prices
+        n_groups = len(self.keys)
+        valid = np.isfinite(prices) & (prices > 0)
+        self.valid = valid
+
+        self.members = np.lexsort((np.where(valid, prices, np.inf), self.group_of))
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(self.group_of, minlength=n_groups))))
+
+        self.store_names, self.store_codes = np.unique(np.array(stores, dtype=object).astype(str), return_inverse=True)
+        self.min_price = np.full(n_groups, np.nan)
+        self.max_price = np.full(n_groups, np.nan)
+        np.fmin.at(self.min_price, self.group_of[valid], prices[valid])
+        np.fmax.at(self.max_price, self.group_of[valid], prices[valid])
+        self.spread = self.max_price - self.min_price
+        pairs = np.unique(self.group_of[valid] * len(self.store_names) + self.store_codes[valid])
+        self.store_count = np.bincount(pairs // len(self.store_names), minlength=n_groups)
+
+        # Groups sold by more than one store, biggest price difference first
+        compared = np.flatnonzero(self.store_count > 1)
+        self.savings_order = compared[np.argsort(-self.spread[compared], kind='stable')]
+
+    @classmethod
+    def from_products(cls, products, prices):
+        return cls(products['product_name'].tolist(), products['product_store'].tolist(), prices)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def group_members(self, group):
+        return self.members[self.indptr[group]:self.indptr[group + 1]]
+
+    def cheapest_per_store(self, group):
+        # The cheapest priced listing of every store in group, cheapest first, in O(group size)
+        members = self.group_members(group)
+        members = members[self.valid[members]]
+        _, first = np.unique(self.store_codes[members], return_index=True)
+        return members[np.sort(first)]
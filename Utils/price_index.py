@@ -0,0 +1,40 @@
+import numpy as np
+
+
+class PriceIndex:
+    # Prices sorted once, with the permutation that sorts them and its inverse. A price range is one
+    # contiguous slice of the permutation found by two binary searches; NaN prices sort last.
+    def __init__(self, prices):
+        self.order = np.argsort(prices, kind='stable')
+        self.sorted_prices = prices[self.order]
+        self.rank = np.empty_like(self.order)
+        self.rank[self.order] = np.arange(len(self.order))
+        for array in (self.order, self.sorted_prices, self.rank):
+            array.setflags(write=False)
+
+    def __len__(self):
+        return len(self.order)
+
+    def bounds(self, min_price=None, max_price=None, positive=False):
+        # [start, end) of the sorted prices satisfying the predicates; without any, NaN prices are kept too
+        if min_price is None and max_price is None and not positive:
+            return 0, len(self.order)
+
+        start = 0 if min_price is None else np.searchsorted(self.sorted_prices, min_price, side='left')
+        if positive:
+            start = max(start, np.searchsorted(self.sorted_prices, 0, side='right'))
+        end = np.searchsorted(self.sorted_prices, np.inf if max_price is None else max_price, side='right')
+        return int(start), int(max(start, end))
+
+    def select(self, start, end, positions=None):
+        # Positions ranked [start, end) by price, restricted to positions when given, in price order
+        if positions is None:
+            return self.order[start:end]
+        if len(positions) * 8 < end - start:
+            ranks = self.rank[positions]
+            return self.order[np.sort(ranks[(ranks >= start) & (ranks < end)])]
+
+        mask = np.zeros(len(self.order), dtype=bool)
+        mask[positions] = True
+        window = self.order[start:end]
+        return window[mask[window]]
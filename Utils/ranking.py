@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+
+
+def page_bounds(total, page, page_size):
+    total_pages = (total - 1) // page_size + 1
+
+    # Same slice semantics as products_list[start_index:end_index] on the full ranking
+    start_index = (page - 1) * page_size
+    end_index = start_index + page_size
+    ranks = range(total)[start_index:end_index]
+
+    return total_pages, ranks.start, max(ranks.start, ranks.stop)
+
+
+def top_k(scores, start, end):
+    # Row positions holding ranks [start, end) of scores in descending order.
+    # Ties keep the lower position first, like the stable sorted(..., reverse=True) it replaces.
+    scores = np.asarray(scores)
+    total = len(scores)
+    end = min(end, total)
+    if start >= end:
+        return np.empty(0, dtype=np.intp)
+
+    keys = -scores
+    if end < total:
+        partitioned = np.argpartition(keys, end - 1)
+        threshold = keys[partitioned[end - 1]]
+        above = np.flatnonzero(keys < threshold)
+        tied = np.flatnonzero(keys == threshold)[:end - len(above)]
+        candidates = np.concatenate((above, tied))
+    else:
+        candidates = np.arange(total)
+
+    ordered = candidates[np.lexsort((candidates, keys[candidates]))]
+    return ordered[start:end]
+
+
+class NeighborCache:
+    def __init__(self, max_items=1024, min_depth=64):
+        self.max_items = max_items
+        self.min_depth = min_depth
+        self._ranked = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def ranked(self, key, scores, end):
+        with self._lock:
+            ranked = self._ranked.get(key)
+            if ranked is not None:
+                self._ranked.move_to_end(key)
+
+        if ranked is None or (len(ranked) < end and len(ranked) < len(scores)):
+            self.misses += 1
+            # Rank a little deeper than asked so the next pages are served from the cache as well
+            depth = max(end * 2, self.min_depth)
+            ranked = top_k(scores, 0, depth)
+            ranked.setflags(write=False)
+            with self._lock:
+                self._ranked[key] = ranked
+                self._ranked.move_to_end(key)
+                while len(self._ranked) > self.max_items:
+                    self._ranked.popitem(last=False)
+        else:
+            self.hits += 1
+
+        return ranked
+
+    def clear(self):
+        with self._lock:
+            self._ranked.clear()
+
+
+def ranked_page(similarity, product_index, start, end, cache=None):
+    if hasattr(similarity, 'ranked_page'):
+        # Neighbor indexes store their rows already ranked
+        return similarity.ranked_page(product_index, start, end, cache)
+
+    scores = similarity[product_index]
+    if cache is None:
+        return top_k(scores, start, end)
+
+    return cache.ranked((id(similarity), product_index), scores, end)[start:end]
@@ -0,0 +1,169 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+import numpy as np
+
+from Config.config import RATING_AGGREGATE_REFRESH, RATING_PRIOR_WEIGHT, TOP_RATED_SCORE
+
+
+class RatingAggregates:
+    # Stored ratings added to the scraped rating count and sum of every catalog row, and the top-rated order
+    # kept current as they arrive. Rows whose score changed leave the precomputed order for a sorted overlay,
+    # so a write costs a binary search there; the order is rebuilt once the overlay grows large.
+    def __init__(self, catalog, load_summary, fetch_ratings, score=TOP_RATED_SCORE, prior_weight=RATING_PRIOR_WEIGHT,
+                 refresh_interval=RATING_AGGREGATE_REFRESH):
+        if score not in ('weighted', 'bayesian'):
+            raise ValueError("score must be 'weighted' or 'bayesian'")
+        self.score = score
+        self.prior_weight = prior_weight
+        self.refresh_interval = refresh_interval
+        self._load_summary = load_summary
+        self._fetch_ratings = fetch_ratings
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refreshed_at = 0.0
+        self.rebase(catalog)
+
+    def rebase(self, catalog):
+        # Starts over on catalog from the summary table, e.g. after a reload moved or replaced products
+        rows, last_rating_id = self._load_summary()
+        products = catalog.products
+        counts = np.nan_to_num(products['rating_count'].to_numpy(dtype=np.float64))
+        ratings = np.nan_to_num(products['product_ratings'].to_numpy(dtype=np.float64))
+        base_sums = ratings * counts
+        # Prior of the Bayesian score: the mean scraped rating, worth prior_weight ratings
+        prior_mean = base_sums.sum() / counts.sum() if counts.sum() else 0.0
+
+        live_counts = np.zeros(len(catalog), dtype=np.int64)
+        live_sums = np.zeros(len(catalog), dtype=np.int64)
+        for product_id, rating_count, rating_sum in rows:
+            position = catalog.product_id_positions.get(str(product_id))
+            if position is not None:
+                live_counts[position] += rating_count
+                live_sums[position] += rating_sum
+
+        with self._lock:
+            self.catalog = catalog
+            self.products = products
+            self.last_rating_id = last_rating_id
+            self.prior_mean = prior_mean
+            self._base_counts = counts
+            self._base_sums = base_sums
+            self._live_counts = live_counts
+            self._live_sums = live_sums
+            self._compact()
+
+    def serves(self, catalog):
+        return catalog.products is self.products
+
+    def scores(self, positions):
+        # Current score of positions; rows without stored ratings keep the catalog's value
+        counts = self._base_counts[positions] + self._live_counts[positions]
+        sums = self._base_sums[positions] + self._live_sums[positions]
+        if self.score == 'bayesian':
+            return (self.prior_weight * self.prior_mean + sums) / (self.prior_weight + counts)
+        return np.where(self._live_counts[positions] > 0, sums, self.catalog.weighted_ratings[positions])
+
+    def _compact(self):
+        # Folds the overlay back into one precomputed order
+        if self.score == 'weighted' and not self._live_counts.any():
+            self._order, self._rank = self.catalog.weighted_rating_order, self.catalog.weighted_rating_rank
+        else:
+            scores = self.scores(np.arange(len(self.catalog)))
+            self._order = np.argsort(-scores, kind='stable')
+            self._rank = np.empty_like(self._order)
+            self._rank[self._order] = np.arange(len(self._order))
+        self._overlay = []
+        self._overlay_scores = {}
+        self._moved = np.zeros(len(self.catalog), dtype=bool)
+
+    def apply(self, ratings):
+        # ratings: (product_id, user_rating) pairs stored after the ones already counted
+        positions = []
+        for product_id, user_rating in ratings:
+            position = self.catalog.product_id_positions.get(str(product_id))
+            if position is not None and user_rating is not None:
+                self._live_counts[position] += 1
+                self._live_sums[position] += user_rating
+                positions.append(position)
+
+        if not positions:
+            return
+        affected = np.unique(positions)
+        for position, score in zip(affected.tolist(), self.scores(affected).tolist()):
+            previous = self._overlay_scores.get(position)
+            if previous is not None:
+                del self._overlay[bisect_left(self._overlay, (-previous, position))]
+            insort(self._overlay, (-score, position))
+            self._overlay_scores[position] = score
+            self._moved[position] = True
+
+        if len(self._overlay) > max(1024, len(self.catalog) // 16):
+            self._compact()
+
+    def refresh(self, max_age=0):
+        # Applies ratings written since the last refresh, by this process or any other
+        if time.monotonic() - self._refreshed_at < max_age or not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            after_id = self.last_rating_id
+            rows = list(self._fetch_ratings(after_id))
+            with self._lock:
+                # A rebase meanwhile already counted these ratings from the summary table
+                if rows and self.last_rating_id == after_id:
+                    self.apply((product_id, user_rating) for _, _, product_id, user_rating in rows)
+                    self.last_rating_id = rows[-1][0]
+            self._refreshed_at = time.monotonic()
+            return bool(rows)
+        finally:
+            self._refresh_lock.release()
+
+    def maybe_refresh(self):
+        return self.refresh(self.refresh_interval)
+
+    def top(self, positions=None, count=None):
+        # First count positions (all of them by default) in the current top-rated order
+        with self._lock:
+            total = len(self.catalog) if positions is None else len(positions)
+            count = total if count is None else min(count, total)
+
+            moved = len(self._overlay)
+            if positions is None:
+                unmoved = self._order[:count + moved]
+                overlay = [position for _, position in self._overlay[:count]]
+            else:
+                unmoved = self.catalog.ordered(self._order, self._rank, positions)
+                selected = np.zeros(len(self.catalog), dtype=bool)
+                selected[positions] = True
+                overlay = [position for _, position in self._overlay if selected[position]][:count]
+            unmoved = unmoved[~self._moved[unmoved]][:count]
+
+            if not overlay:
+                return unmoved
+            candidates = np.concatenate([unmoved, np.array(overlay, dtype=unmoved.dtype)])
+            scores = self.scores(candidates)
+            # Descending score, ties in catalog order, NaN last: the order argsort gave the precomputed one
+            return candidates[np.lexsort((candidates, -scores))][:count]
+
+    def columns(self, positions):
+        # Rating fields of positions with the stored ratings included, for product_block
+        with self._lock:
+            live = self._live_counts[positions] > 0
+            counts = self._base_counts[positions] + self._live_counts[positions]
+            sums = self._base_sums[positions] + self._live_sums[positions]
+            bayesian = (self.prior_weight * self.prior_mean + sums) / (self.prior_weight + counts)
+            products = self.products
+        positions = np.asarray(positions, dtype=np.intp)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ratings = np.where(live, sums / counts, products['product_ratings'].to_numpy(dtype=np.float64)[positions])
+        return {
+            'product_ratings': ratings.tolist(),
+            'product_rating_count': np.where(live, counts,
+                                             products['rating_count'].to_numpy(dtype=np.float64)[positions]).tolist(),
+            'product_weighted_rating': np.where(live, sums,
+                                                products['rating_weighted'].to_numpy(dtype=np.float64)[positions]
+                                                ).tolist(),
+            'product_bayesian_rating': bayesian.tolist(),
+        }
@@ -0,0 +1,150 @@
+import atexit
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RatingIngestQueue:
+    # Accepts ratings immediately and writes them in batches from a background thread. Rows that fail with one of
+    # data_errors can never be written and are dropped; any other failure (e.g. a locked database) puts the batch
+    # back at the head of the queue, and writing waits up to max_backoff seconds before the next attempt.
+    def __init__(self, flush, batch_size=500, flush_interval=0.5, data_errors=(), max_backoff=30.0):
+        self._write = flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.data_errors = data_errors
+        self.max_backoff = max_backoff
+        self.listeners = []
+
+        self._pending = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self._closed = False
+        self.accepted = 0
+        self.written = 0
+        self.dropped = 0
+        self.retried = 0
+        self.failures = 0
+
+        atexit.register(self.close)
+
+    def put(self, rating):
+        self.put_many([rating])
+
+    def put_many(self, ratings):
+        with self._condition:
+            self._pending.extend(ratings)
+            self.accepted += len(ratings)
+            self._ensure_worker()
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def _ensure_worker(self):
+        # Started lazily, and again after a fork, since threads do not survive into forked workers
+        if self._worker is None or self._worker_pid != os.getpid() or not self._worker.is_alive():
+            self._worker_pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name='rating-ingest', daemon=True)
+            self._worker.start()
+
+    def retry_delay(self):
+        # Seconds to wait before writing again after failures in a row, 0 while writes succeed
+        if not self.failures:
+            return 0.0
+        return min(self.max_backoff, self.flush_interval * 2 ** self.failures)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                delay = self.retry_delay()
+                deadline = time.monotonic() + (delay or self.flush_interval)
+                while not self._closed and (delay or len(self._pending) < self.batch_size):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                closed = self._closed
+
+            self.flush()
+            if closed:
+                return
+
+    def flush(self):
+        with self._flush_lock:
+            while True:
+                with self._condition:
+                    batch = self._pending[:self.batch_size]
+                    del self._pending[:self.batch_size]
+                if not batch:
+                    return
+
+                try:
+                    self._write(batch)
+                except self.data_errors:
+                    # One bad row must not hold back every rating queued after it
+                    logger.exception('Writing %d ratings failed, writing them one at a time', len(batch))
+                    batch, complete = self._write_each(batch)
+                    self._written(batch)
+                    if not complete:
+                        return
+                except Exception:
+                    self._requeue(batch)
+                    return
+                else:
+                    self._written(batch)
+                self.failures = 0
+
+    def _write_each(self, batch):
+        # The rows of a failed batch that could be written, the invalid ones logged and dropped, and whether the
+        # whole batch was handled; on another error the rows not tried yet are requeued
+        written = []
+        for i, rating in enumerate(batch):
+            try:
+                self._write([rating])
+            except self.data_errors:
+                logger.exception('Dropping rating that could not be written: %r', rating)
+                self.dropped += 1
+            except Exception:
+                self._requeue(batch[i:])
+                return written, False
+            else:
+                written.append(rating)
+        return written, True
+
+    def _written(self, batch):
+        if not batch:
+            return
+        self.written += len(batch)
+        for listener in self.listeners:
+            try:
+                listener(batch)
+            except Exception:
+                logger.exception('Rating listener %r failed', listener)
+
+    def _requeue(self, batch):
+        # Back at the head of the queue, so ratings are still written in the order they arrived
+        with self._condition:
+            self._pending[:0] = batch
+        self.retried += len(batch)
+        self.failures += 1
+        logger.warning('Writing %d ratings failed, retrying in %.1f s', len(batch), self.retry_delay(), exc_info=True)
+
+    def pending(self):
+        with self._condition:
+            return len(self._pending)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        worker = self._worker
+        if worker is not None and self._worker_pid == os.getpid() and worker.is_alive():
+            worker.join()
+        # Whatever is still queued is written before the process exits
+        self.flush()
+        if self.pending():
+            logger.error('%d ratings could not be written before exit', self.pending())
@@ -0,0 +1,68 @@
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    # Concurrent calls with the same key run fn once: the first caller computes, the others wait for its
+    # result (or its exception) instead of repeating the work. Finished calls are forgotten, nothing is cached.
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class RequestLog:
+    # Request counts per path and arguments, the most requested first. Past max_entries every count is halved
+    # and the ones that reach zero are dropped, so old traffic fades and the log stays bounded.
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, path, args):
+        key = (path, tuple(sorted(args.items(multi=True))))
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+            if len(self._counts) > self.max_entries:
+                self._counts = {key: count // 2 for key, count in self._counts.items() if count > 1}
+
+    def most_common(self, count):
+        with self._lock:
+            items = list(self._counts.items())
+        items.sort(key=lambda item: item[1], reverse=True)
+        return [key for key, _ in items[:count]]
+
+    def __len__(self):
+        return len(self._counts)
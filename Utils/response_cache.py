@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+
+class LocalBackend:
+    # In-process LRU; every worker process keeps its own
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SqliteBackend:
+    # Shared LRU in a SQLite file, a local stand-in for a networked cache so all workers share entries
+    def __init__(self, path, max_entries=4096):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = {}
+        with self._connect() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS response_cache ('
+                               'key TEXT PRIMARY KEY, body BLOB, status INTEGER, mimetype TEXT, '
+                               'expires_at REAL, used_at REAL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_response_cache_used_at ON response_cache (used_at)')
+
+    def _connect(self):
+        # One connection per process and thread; sqlite3 connections must not cross either
+        owner = (os.getpid(), threading.get_ident())
+        connection = self._local.get(owner)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            self._local[owner] = connection
+        return connection
+
+    def get(self, key):
+        connection = self._connect()
+        row = connection.execute('SELECT body, status, mimetype, expires_at FROM response_cache WHERE key = ?',
+                                 (key,)).fetchone()
+        if row is None:
+            return None
+        body, status, mimetype, expires_at = row
+        now = time.time()
+        if expires_at is not None and expires_at < now:
+            connection.execute('DELETE FROM response_cache WHERE key = ?', (key,))
+            return None
+        connection.execute('UPDATE response_cache SET used_at = ? WHERE key = ?', (now, key))
+        return body, status, mimetype
+
+    def set(self, key, value, ttl=None):
+        body, status, mimetype = value
+        now = time.time()
+        connection = self._connect()
+        connection.execute('INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?, ?)',
+                           (key, body, status, mimetype, now + ttl if ttl else None, now))
+        connection.execute('DELETE FROM response_cache WHERE key IN (SELECT key FROM response_cache '
+                           'ORDER BY used_at DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+
+    def clear(self):
+        self._connect().execute('DELETE FROM response_cache')
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM response_cache').fetchone()[0]
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl=None):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(endpoint, args, version):
+        # Argument order never changes the response, so it never changes the key either. Names and values are
+        # escaped, so a value containing '&' or '=' cannot produce the key of other arguments
+        query = urlencode(sorted(args.items(multi=True)))
+        return f'{version}:{endpoint}?{query}'
+
+    def check_version(self, version):
+        # A new catalog version makes every stored response stale
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self.backend.clear()
+                    self._version = version
+
+    def get(self, key):
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value, self.ttl)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.backend), 'version': self._version}
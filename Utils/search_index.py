@@ -0,0 +1,119 @@
+import re
+from collections import defaultdict
+
+import numpy as np
+
+from Utils.metrics import LOOKUPS
+
+REGEX_SPECIAL_CHARACTERS = set('.^$*+?{}[]\\|()')
+EMPTY_POSITIONS = np.empty(0, dtype=np.int64)
+
+
+def split_tags(value):
+    return value.split(', ')
+
+
+def normalize_name(value):
+    # Case- and whitespace-insensitive key for exact product name lookups
+    return ' '.join(str(value).split()).casefold()
+
+
+def is_literal(query):
+    return query.isascii() and not REGEX_SPECIAL_CHARACTERS.intersection(query)
+
+
+def _postings(positions_by_key):
+    return {key: np.array(positions, dtype=np.int64) for key, positions in positions_by_key.items()}
+
+
+def _regex_scan(values, positions, query):
+    # Same matching rule as Series.str.contains(query, case=False)
+    pattern = re.compile(query, flags=re.IGNORECASE)
+    return np.array([position for position in positions
+                     if isinstance(values[position], str) and pattern.search(values[position])], dtype=np.int64)
+
+
+class TrigramIndex:
+    # Lowercase trigram postings over a text column, used for case-insensitive substring queries
+    def __init__(self, values):
+        self.values = list(values)
+        self.lowered = [value.lower() if isinstance(value, str) else None for value in self.values]
+
+        grams = defaultdict(list)
+        for position, value in enumerate(self.lowered):
+            if value is not None:
+                for gram in {value[i:i + 3] for i in range(len(value) - 2)}:
+                    grams[gram].append(position)
+        self.grams = _postings(grams)
+
+        # Rows whose lowercase form may not line up with re.IGNORECASE always go through the regex check
+        self.non_ascii = np.array([position for position, value in enumerate(self.values)
+                                   if isinstance(value, str) and not value.isascii()], dtype=np.int64)
+
+    def search(self, query):
+        if not is_literal(query):
+            LOOKUPS.inc('text_search', 'regex_scan')
+            return _regex_scan(self.values, range(len(self.values)), query)
+
+        lowered = query.lower()
+        if len(lowered) < 3:
+            LOOKUPS.inc('text_search', 'substring_scan')
+            return np.array([position for position, value in enumerate(self.lowered)
+                             if value is not None and lowered in value], dtype=np.int64)
+
+        candidates = None
+        for gram in sorted({lowered[i:i + 3] for i in range(len(lowered) - 2)},
+                           key=lambda gram: len(self.grams.get(gram, EMPTY_POSITIONS))):
+            postings = self.grams.get(gram, EMPTY_POSITIONS)
+            candidates = postings if candidates is None else np.intersect1d(candidates, postings, assume_unique=True)
+            if not len(candidates):
+                break
+
+        LOOKUPS.inc('text_search', 'trigram')
+        candidates = np.union1d(candidates, self.non_ascii)
+        return _regex_scan(self.values, candidates, query)
+
+
+class TokenIndex:
+    # Postings per distinct value and per comma-separated token of a low-cardinality column
+    def __init__(self, values):
+        by_value = defaultdict(list)
+        by_token = defaultdict(list)
+        for position, value in enumerate(values):
+            by_value[value].append(position)
+            if isinstance(value, str):
+                for token in split_tags(value):
+                    by_token[token].append(position)
+
+        self.distinct = list(by_value)
+        self.values = _postings(by_value)
+        self.tokens = _postings(by_token)
+
+    def token(self, token):
+        return self.tokens.get(token, EMPTY_POSITIONS)
+
+    def search(self, query):
+        # Substring queries only need to scan the distinct values, not every row
+        matched = _regex_scan(self.distinct, range(len(self.distinct)), query)
+        if not len(matched):
+            return EMPTY_POSITIONS
+        return np.sort(np.concatenate([self.values[self.distinct[i]] for i in matched]))
+
+
+class ProductSearchIndex:
+    def __init__(self, products):
+        self.columns = {
+            'product_name': TrigramIndex(products['product_name'].tolist()),
+            'product_category': TokenIndex(products['product_category'].tolist()),
+            'product_store': TokenIndex(products['product_store'].tolist()),
+        }
+
+    def search(self, column, query):
+        return self.columns[column].search(query)
+
+
+def match_positions(products, column, query, search_index=None):
+    # Row positions whose column contains query, in catalog order
+    if search_index is not None and column in search_index.columns:
+        return search_index.search(column, query)
+    return np.flatnonzero(products[column].str.contains(query, case=False, na=False).to_numpy(dtype=bool))
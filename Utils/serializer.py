@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+# Payload field -> catalog column, in the order the endpoints have always returned them
+PRODUCT_FIELDS = (
+    ('product_id', 'product_id'),
+    ('product_name', 'product_name'),
+    ('product_link', 'product_link'),
+    ('product_image', 'product_image'),
+    ('product_price', 'product_price'),
+    ('product_category', 'product_category'),
+    ('product_ratings', 'product_ratings'),
+    ('product_rating_count', 'rating_count'),
+    ('product_description', 'description'),
+    ('product_fetch_date', 'date'),
+    ('product_store', 'product_store'),
+    ('product_weighted_rating', 'rating_weighted'),
+)
+
+
+def product_columns(products, positions=None, fields=PRODUCT_FIELDS):
+    # One take per column instead of one iloc lookup per field and row
+    if positions is None:
+        return {field: products[column].tolist() for field, column in fields}
+
+    # Take through .array so string and categorical columns are not converted in full first
+    positions = np.asarray(positions, dtype=np.intp)
+    return {field: _take(products[column].array, positions).tolist() for field, column in fields}
+
+
+def _take(values, positions):
+    # Categoricals are read through their codes rather than by building a new Categorical for every page;
+    # a missing value's code of -1 picks the NaN appended to the categories
+    if isinstance(values, pd.Categorical):
+        categories = np.asarray(values.categories.array, dtype=object)
+        return np.append(categories, np.nan)[values.codes[positions]]
+    return np.asarray(values.take(positions))
+
+
+def serialize_products(products, positions=None, fields=PRODUCT_FIELDS):
+    columns = product_columns(products, positions, fields)
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+class ProductBlock:
+    # Product records kept as one list per field. FastJSONProvider encodes the columns directly; Python callers
+    # still get a sequence of dicts, built on first access
+    def __init__(self, columns):
+        self.columns = columns
+        self._records = None
+
+    def records(self):
+        if self._records is None:
+            names = list(self.columns)
+            self._records = [dict(zip(names, row)) for row in zip(*self.columns.values())]
+        return self._records
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    def __iter__(self):
+        return iter(self.records())
+
+    def __getitem__(self, index):
+        return self.records()[index]
+
+    def __eq__(self, other):
+        return self.records() == (other.records() if isinstance(other, ProductBlock) else other)
+
+    def __repr__(self):
+        return f'ProductBlock({self.records()!r})'
+
+
+def product_block(products, positions=None, fields=PRODUCT_FIELDS, **extra_columns):
+    # Same records as serialize_products, plus extra_columns (field -> values in the order of positions)
+    columns = product_columns(products, positions, fields)
+    columns.update(extra_columns)
+    return ProductBlock(columns)
@@ -1,11 +1,60 @@
+import hashlib
+import os
 import pickle
+import numpy as np
 import pandas as pd
 
+from Config.config import ANN_ENABLED, ASSETS_DIR
+from Utils.ann import ann_index
+from Utils.catalog import CatalogSnapshot
+from Utils.mmap_assets import catalog_path, dense_similarity_path, read_catalog
+from Utils.neighbor_index import NeighborIndex, neighbor_index_path
+from Utils.search_index import ProductSearchIndex
 
-def load_products():
-    product_dict = pickle.load(open('Assets/products_dictionary.pkl', 'rb'))
-    products = pd.DataFrame(product_dict)
-    similarity = pickle.load(open('Assets/similarity.pkl', 'rb'))
-    collaborative_similarity = pickle.load(open('Assets/collaborative_similarity.pkl', 'rb'))
+
+def load_similarity(name, assets_dir=ASSETS_DIR):
+    # Prefer the top-N neighbor index built by `python -m Utils.neighbor_index`, then the dense
+    # matrix converted by `python -m Utils.mmap_assets`, and fall back to the pickle
+    index_path = neighbor_index_path(name, assets_dir)
+    if os.path.isdir(index_path):
+        return NeighborIndex.load(index_path, mmap_mode='r')
+    dense_path = dense_similarity_path(name, assets_dir)
+    if os.path.exists(dense_path):
+        return np.load(dense_path, mmap_mode='r')
+    return pickle.load(open(os.path.join(assets_dir, f'{name}.pkl'), 'rb'))
+
+
+def load_products(assets_dir=ASSETS_DIR):
+    if os.path.exists(os.path.join(catalog_path(assets_dir), 'manifest.json')):
+        products = read_catalog(catalog_path(assets_dir))
+    else:
+        product_dict = pickle.load(open(os.path.join(assets_dir, 'products_dictionary.pkl'), 'rb'))
+        products = pd.DataFrame(product_dict)
+    similarity = load_similarity('similarity', assets_dir)
+    collaborative_similarity = load_similarity('collaborative_similarity', assets_dir)
     return products, similarity, collaborative_similarity
 
+
+def asset_version(assets_dir=ASSETS_DIR):
+    # Identical asset files give every worker the same version, so shared caches agree on it
+    digest = hashlib.sha1()
+    for root, directories, files in sorted(os.walk(assets_dir)):
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            path = os.path.relpath(os.path.join(root, name), assets_dir)
+            digest.update(f'{path}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+    return digest.hexdigest()[:12]
+
+
+def load_catalog(assets_dir=ASSETS_DIR, previous=None):
+    version = asset_version(assets_dir)
+    products, similarity, collaborative_similarity = load_products(assets_dir)
+    catalog = CatalogSnapshot(products, similarity, collaborative_similarity,
+                              search_index=ProductSearchIndex(products), version=version)
+    # Build the lookup tables now rather than on the first request
+    catalog.product_id_positions, catalog.name_positions, catalog.facets, catalog.price_index, catalog.price_groups
+    if ANN_ENABLED or (previous is not None and 'ann' in previous.__dict__):
+        # Also on reloads once engine=ann has been used, so requests never wait for the build after the first.
+        # Products appended to the previous catalog or changed in it update its index instead of clustering again
+        catalog.ann = ann_index(catalog, previous)
+    return catalog
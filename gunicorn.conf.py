@@ -0,0 +1,26 @@
+import gc
+import os
+
+from Config.config import HOST, PORT, WEB_THREADS, WEB_TIMEOUT, WEB_WORKERS
+
+bind = f'{HOST}:{PORT}'
+workers = WEB_WORKERS
+threads = WEB_THREADS
+timeout = WEB_TIMEOUT
+
+# The master imports main once, loading the catalog before it forks; workers share those pages copy-on-write
+# instead of each loading its own copy. Background threads start in each worker on its first request.
+# SHOPWISE_PRELOAD=0 lets every worker import main itself, for comparing the two with Benchmarks/load_test.py
+preload_app = os.environ.get('SHOPWISE_PRELOAD', '1') != '0'
+
+
+def when_ready(server):
+    # Move the preloaded objects out of the collector's reach so its passes do not write to, and copy, their pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Pooled database connections opened by the master must not be shared; each worker opens its own
+    from main import app, db
+    with app.app_context():
+        db.engine.dispose(close=False)
@@ -1,117 +1,457 @@
-from flask import Flask, request, jsonify
+import hmac
+import json
+import threading
+import time
+from functools import wraps
+
+import numpy as np
+
+from flask import Flask, Response, request, jsonify, make_response, stream_with_context
 from Controllers.GetProductsController import *
-from Utils.utils import load_products
-from Config.config import DEBUG, HOST, PORT
+from Utils.utils import load_catalog
+from Utils.catalog_reload import CatalogReloader
+from Utils.collaborative_model import CollaborativeUpdater
+from Utils.json_provider import install_json_provider
+from Utils.metrics import CallbackMetric, instrument_app, render, stage
+from Utils.ranking import NeighborCache
+from Utils.rating_aggregates import RatingAggregates
+from Utils.rating_ingest import RatingIngestQueue
+from Utils.request_coalescing import RequestLog, SingleFlight
+from Utils.response_cache import LocalBackend, ResponseCache, SqliteBackend
+from Config.config import (ADMIN_TOKEN, BATCH_TOP_K, CATALOG_WATCH_INTERVAL, COLLABORATIVE_LIVE_UPDATES, DEBUG, HOST,
+                           HYBRID_COLLABORATIVE_WEIGHT, HYBRID_CONTENT_WEIGHT, HYBRID_FUSION, PORT, RANKING_CACHE_SIZE,
+                           RATINGS_DATABASE_URI, RATINGS_MAX_PAGE_SIZE, RATINGS_PAGE_SIZE, RATINGS_STREAM_CHUNK_SIZE,
+                           RATING_AGGREGATES_ENABLED, RATING_BATCH_SIZE, RATING_FLUSH_INTERVAL,
+                           RATING_RETRY_MAX_BACKOFF, REQUEST_COALESCING, REQUEST_LOG_SIZE, RESPONSE_CACHE_BACKEND,
+                           RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_PATH, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL,
+                           WARMUP_ENABLED, WARMUP_PATHS, WARMUP_REQUESTS, WARMUP_SEEDS)
 from flask_sqlalchemy import SQLAlchemy
+from werkzeug.datastructures import MultiDict
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.exc import DataError, IntegrityError
 from datetime import datetime
 
 # Functions in product Controller
 # recommend_products, get_top_rated_products, get_search_products,
-# comparedProducts, collaborative_recommend_products, hybrid_recommendations, compare_prices, get_all_products
+# comparedProducts, collaborative_recommend_products, hybrid_recommendations, batch_recommend_products,
+# compare_prices, get_price_groups, get_all_products
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///ratings.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = RATINGS_DATABASE_URI
+instrument_app(app)
+install_json_provider(app)
 db = SQLAlchemy(app)
 
 
 class Rating(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.String(50), nullable=False)
-    product_id = db.Column(db.String(50), nullable=False)
+    user_id = db.Column(db.String(50), nullable=False, index=True)
+    product_id = db.Column(db.String(50), nullable=False, index=True)
     user_rating = db.Column(db.Integer, nullable=False)
     review = db.Column(db.String(255), nullable=True)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class RatingSummary(db.Model):
+    # Count and sum of the stored ratings per product, kept current by write_ratings
+    product_id = db.Column(db.String(50), primary_key=True)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+
+
+def enable_sqlite_wal(dbapi_connection, connection_record):
+    # WAL lets readers continue while a batch is written, NORMAL skips the fsync on every commit
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
 
 
 with app.app_context():
+    if db.engine.dialect.name == 'sqlite':
+        event.listen(db.engine, 'connect', enable_sqlite_wal)
+        db.engine.dispose()
     db.create_all()
+    # create_all skips tables that already exist, so indexes added later are created here
+    for index in Rating.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    # Ratings stored before the summary table existed are summarized once
+    if db.session.execute(select(RatingSummary.product_id).limit(1)).first() is None:
+        db.session.execute(insert(RatingSummary).from_select(
+            ['product_id', 'rating_count', 'rating_sum'],
+            select(Rating.product_id, func.count(), func.sum(Rating.user_rating)).group_by(Rating.product_id)))
+        db.session.commit()
+
+
+def summarize_ratings(ratings):
+    # Adds the batch to the per-product counts and sums, in the transaction that inserts it
+    totals = {}
+    for rating in ratings:
+        count, total = totals.get(rating['product_id'], (0, 0))
+        totals[rating['product_id']] = (count + 1, total + rating['user_rating'])
+
+    for product_id, (count, total) in totals.items():
+        updated = db.session.execute(update(RatingSummary).where(RatingSummary.product_id == product_id).values(
+            rating_count=RatingSummary.rating_count + count, rating_sum=RatingSummary.rating_sum + total))
+        if not updated.rowcount:
+            db.session.execute(insert(RatingSummary).values(product_id=product_id, rating_count=count,
+                                                            rating_sum=total))
+
+
+def write_ratings(ratings):
+    # One multi-row INSERT and one commit per batch
+    with app.app_context():
+        with stage('write_ratings', 'insert'):
+            db.session.execute(insert(Rating), ratings)
+            summarize_ratings(ratings)
+        with stage('write_ratings', 'commit'):
+            db.session.commit()
+
+
+rating_queue = RatingIngestQueue(write_ratings, batch_size=RATING_BATCH_SIZE, flush_interval=RATING_FLUSH_INTERVAL,
+                                 data_errors=(IntegrityError, DataError), max_backoff=RATING_RETRY_MAX_BACKOFF)
+
+catalog = load_catalog()
+catalog_lock = threading.Lock()
+
+content_cache = NeighborCache(RANKING_CACHE_SIZE) if RANKING_CACHE_SIZE else None
+collaborative_cache = NeighborCache(RANKING_CACHE_SIZE) if RANKING_CACHE_SIZE else None
+
+
+def fetch_new_ratings(after_id, chunk_size=10000):
+    query = select(Rating.id, Rating.user_id, Rating.product_id, Rating.user_rating).order_by(Rating.id)
+    with app.app_context():
+        while True:
+            rows = db.session.execute(query.where(Rating.id > after_id).limit(chunk_size)).all()
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            after_id = rows[-1][0]
+
+
+def publish_collaborative_similarity(collaborative_similarity, last_rating_id, snapshot=None):
+    global catalog
+    with catalog_lock:
+        if snapshot is None:
+            snapshot = catalog
+        catalog = snapshot.replace(collaborative_similarity=collaborative_similarity,
+                                   collaborative_version=last_rating_id)
+
+
+def collaborative_version():
+    # Live collaborative rows change without a new catalog version, so only the endpoints reading them see it
+    return catalog.collaborative_version
+
+
+collaborative_updater = CollaborativeUpdater(catalog.collaborative_similarity, fetch_new_ratings,
+                                             lambda product_id: catalog.product_id_positions.get(str(product_id)),
+                                             publish_collaborative_similarity)
+
+
+def publish_catalog(new_catalog):
+    global catalog
+    if COLLABORATIVE_LIVE_UPDATES:
+        # Live ratings are replayed from scratch when products were added, removed or reordered
+        reset = not np.array_equal(catalog.product_ids, new_catalog.product_ids)
+        collaborative_updater.rebase(new_catalog.collaborative_similarity,
+                                     lambda similarity, last_rating_id: publish_collaborative_similarity(
+                                         similarity, last_rating_id, new_catalog),
+                                     reset)
+    else:
+        with catalog_lock:
+            catalog = new_catalog
+
+    for cache in (content_cache, collaborative_cache):
+        if cache is not None:
+            cache.clear()
+
+    if rating_aggregates is not None:
+        rating_aggregates.rebase(new_catalog)
+
+    if WARMUP_ENABLED:
+        threading.Thread(target=warm_up, name='cache-warm-up', daemon=True).start()
+
+
+def load_rating_summary():
+    # Summary rows and the last rating id they include, read from one snapshot so a batch committed in between is
+    # in both or in neither
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            # pysqlite begins no transaction for reads, which would leave every SELECT its own snapshot
+            db.session.connection().exec_driver_sql('BEGIN')
+        else:
+            db.session.connection(execution_options={'isolation_level': 'REPEATABLE READ'})
+        try:
+            rows = db.session.execute(select(RatingSummary.product_id, RatingSummary.rating_count,
+                                             RatingSummary.rating_sum)).all()
+            last_rating_id = db.session.execute(select(func.max(Rating.id))).scalar() or 0
+        finally:
+            db.session.rollback()
+    return rows, last_rating_id
+
+
+rating_aggregates = None
+if RATING_AGGREGATES_ENABLED:
+    rating_aggregates = RatingAggregates(catalog, load_rating_summary, fetch_new_ratings)
+    # Ratings written by this worker count right away, those of other workers on the next refresh
+    rating_queue.listeners.append(lambda ratings: rating_aggregates.refresh())
+
+
+catalog_reloader = CatalogReloader(lambda assets_dir: load_catalog(assets_dir, previous=catalog), publish_catalog,
+                                   lambda: catalog, watch_interval=CATALOG_WATCH_INTERVAL)
+
+
+@app.before_request
+def start_background_workers():
+    # Threads do not survive a fork, so each worker process starts its own on its first request
+    if COLLABORATIVE_LIVE_UPDATES:
+        collaborative_updater.ensure_started()
+    catalog_reloader.ensure_watching()
+
+
+response_cache = None
+if RESPONSE_CACHE_ENABLED:
+    if RESPONSE_CACHE_BACKEND == 'sqlite':
+        response_cache = ResponseCache(SqliteBackend(RESPONSE_CACHE_PATH, RESPONSE_CACHE_SIZE), RESPONSE_CACHE_TTL)
+    else:
+        response_cache = ResponseCache(LocalBackend(RESPONSE_CACHE_SIZE), RESPONSE_CACHE_TTL)
+
+
+single_flight = SingleFlight() if REQUEST_COALESCING else None
+request_log = RequestLog(REQUEST_LOG_SIZE)
+
+
+def cached_response(view=None, live_version=None, defaults=None):
+    # Serve repeated reads of the same catalog version from response_cache. live_version() adds state that
+    # changes more often than the catalog to the key, without dropping the rest of the cache when it does.
+    # Identical reads that miss the cache at the same time wait for the first one instead of computing again.
+    # Arguments sent with their default value (defaults: name -> value) are left out of the key, so ?page=1 and
+    # no page share one entry.
+    if view is None:
+        return lambda view: cached_response(view, live_version, defaults)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        query = MultiDict([(name, value) for name, value in request.args.items(multi=True)
+                           if defaults is None or defaults.get(name) != value])
+        if not request.environ.get('shopwise.warm_up'):
+            request_log.record(request.path, query)
+        if response_cache is None and single_flight is None:
+            return view(*args, **kwargs)
+
+        version = catalog.version
+        key = ResponseCache.key(request.endpoint, query,
+                                version if live_version is None else f'{version}:{live_version()}')
+        if response_cache is not None:
+            response_cache.check_version(version)
+            cached = response_cache.get(key)
+            if cached is not None:
+                body, status, mimetype = cached
+                return app.response_class(body, status=status, mimetype=mimetype)
+
+        def compute():
+            response = make_response(view(*args, **kwargs))
+            if response_cache is not None and response.status_code == 200:
+                response_cache.set(key, (response.get_data(), response.status_code, response.mimetype))
+            return response.get_data(), response.status_code, response.mimetype
+
+        body, status, mimetype = compute() if single_flight is None else single_flight.do(key, compute)
+        return app.response_class(body, status=status, mimetype=mimetype)
+
+    return wrapper
+
+
+warm_up_report = None
+
+
+def warm_up(requests=WARMUP_REQUESTS, seeds=WARMUP_SEEDS, paths=WARMUP_PATHS):
+    # Runs the reads this worker served most often, then the first pages of paths for the top-rated products
+    # (in the /top_rated_products order), through cached_response so the caches are filled before traffic asks
+    global warm_up_report
+    snapshot = catalog
+    started = time.perf_counter()
+    queries = request_log.most_common(requests)
+
+    if rating_aggregates is not None and rating_aggregates.serves(snapshot):
+        top_rated = rating_aggregates.top(count=seeds)
+    else:
+        top_rated = snapshot.by_weighted_rating()[:seeds]
+    names = dict.fromkeys(snapshot.products['product_name'].to_numpy()[top_rated].tolist())
+    queries += [(path, (('product_name', name),)) for name in names for path in paths]
+
+    failed = 0
+    for path, args in dict.fromkeys(queries):
+        try:
+            with app.test_request_context(path, query_string=list(args), environ_base={'shopwise.warm_up': True}):
+                app.dispatch_request()
+        except Exception:
+            failed += 1
+
+    warm_up_report = {'version': snapshot.version, 'requests': len(dict.fromkeys(queries)), 'failed': failed,
+                      'seconds': round(time.perf_counter() - started, 3)}
+    return warm_up_report
 
-products, similarity, collaborative_similarity = load_products()
 
 @app.route('/')
 def home():
     return "ShopWise Navigator Backend is running!"
 
 
-@app.route('/submit_rating', methods=['POST'])
-def submit_rating():
-    data = request.json
-
+def parse_rating(data):
     user_id = data.get('user_id')
     product_id = data.get('product_id')
     user_rating = data.get('user_rating')
     review = data.get('review')
 
-    new_rating = Rating(user_id=user_id, product_id=product_id, user_rating=user_rating, review=review)
-    db.session.add(new_rating)
-    db.session.commit()
+    if user_id is None or product_id is None or user_rating is None:
+        raise ValueError("'user_id', 'product_id' and 'user_rating' are required")
+    # Whole stars only: bools, floats and numeric strings are refused rather than coerced
+    if type(user_rating) is not int or not 1 <= user_rating <= 5:
+        raise ValueError("'user_rating' must be an integer from 1 to 5")
+    if review is not None and not isinstance(review, str):
+        raise ValueError("'review' must be a string")
+    # Longer values than the columns hold would fail the whole batch they are written in
+    for name, value in (('user_id', str(user_id)), ('product_id', str(product_id)), ('review', review)):
+        limit = Rating.__table__.c[name].type.length
+        if value is not None and len(value) > limit:
+            raise ValueError(f"'{name}' must be at most {limit} characters")
+
+    return {
+        'user_id': str(user_id),
+        'product_id': str(product_id),
+        'user_rating': user_rating,
+        'review': review,
+        # Stamped on arrival so batching does not shift the rating time
+        'timestamp': datetime.utcnow(),
+    }
+
+
+@app.route('/submit_rating', methods=['POST'])
+def submit_rating():
+    try:
+        rating = parse_rating(request.json)
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    rating_queue.put(rating)
+
+    return jsonify({'message': 'Rating accepted'}), 202
+
+
+@app.route('/submit_ratings', methods=['POST'])
+def submit_ratings():
+    data = request.json
+    ratings = data.get('ratings') if isinstance(data, dict) else data
+
+    try:
+        ratings = [parse_rating(rating) for rating in ratings]
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
 
-    return jsonify({'message': 'Rating submitted successfully'}), 201
+    rating_queue.put_many(ratings)
+
+    return jsonify({'message': 'Ratings accepted', 'accepted': len(ratings)}), 202
+
+
+def rating_to_dict(rating):
+    return {
+        'id': rating.id,
+        'user_id': rating.user_id,
+        'product_id': rating.product_id,
+        'user_rating': rating.user_rating,
+        'review': rating.review,
+        'timestamp': rating.timestamp.isoformat() if rating.timestamp else None
+    }
 
 
 @app.route('/get_all_ratings', methods=['GET'])
 def get_all_ratings():
     try:
-        ratings = Rating.query.all()
-
-        ratings_list = []
-        for rating in ratings:
-            rating_data = {
-                'id': rating.id,
-                'user_id': rating.user_id,
-                'product_id': rating.product_id,
-                'user_rating': rating.user_rating,
-                'review': rating.review,
-                'timestamp': rating.timestamp.isoformat()
-            }
-            ratings_list.append(rating_data)
-
-        return jsonify({'ratings': ratings_list})
-
+        after_id = int(request.args.get('after_id', 0))
+        limit = min(int(request.args.get('limit', RATINGS_PAGE_SIZE)), RATINGS_MAX_PAGE_SIZE)
+        stream = request.args.get('format') == 'ndjson'
+
+        # Keyset pagination on the primary key, filters served by the user_id / product_id indexes
+        query = select(Rating.__table__).where(Rating.id > after_id).order_by(Rating.id)
+        if request.args.get('user_id'):
+            query = query.where(Rating.user_id == request.args['user_id'])
+        if request.args.get('product_id'):
+            query = query.where(Rating.product_id == request.args['product_id'])
+        if request.args.get('since'):
+            query = query.where(Rating.timestamp >= datetime.fromisoformat(request.args['since']))
+
+        if stream:
+            # Rows are fetched in chunks and written out as they arrive, so exports run in constant memory
+            def generate():
+                rows = db.session.execute(query.execution_options(yield_per=RATINGS_STREAM_CHUNK_SIZE))
+                for rating in rows:
+                    yield json.dumps(rating_to_dict(rating)) + '\n'
+
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+        ratings_list = [rating_to_dict(rating) for rating in db.session.execute(query.limit(limit))]
+        next_cursor = ratings_list[-1]['id'] if len(ratings_list) == limit else None
+
+        return jsonify({'ratings': ratings_list, 'next_cursor': next_cursor})
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/recommend', methods=['GET'])
+@cached_response(defaults={'page': '1', 'engine': 'exact'})
 def get_recommendations():
     product_name = request.args.get('product_name')
     page = int(request.args.get('page', 1))
+    # engine=ann serves approximate neighbors from the tag vector index, nprobe trades its recall for speed
+    engine = request.args.get('engine', 'exact')
+    nprobe = request.args.get('nprobe', type=int)
 
     if product_name is None:
         return jsonify({"error": "Please provide 'product_name' as a query parameter"}), 400
 
-    recommendations = recommend_products(products, similarity, product_name, page=page)
+    # One snapshot for the whole request, even if a reload swaps the catalog meanwhile
+    snapshot = catalog
+    recommendations = recommend_products(snapshot, snapshot.similarity, product_name, page=page, cache=content_cache,
+                                         engine=engine, nprobe=nprobe)
     return recommendations
 
 
+def refreshed_rating_version():
+    if rating_aggregates is None:
+        return None
+    rating_aggregates.maybe_refresh()
+    return rating_aggregates.last_rating_id
+
+
 @app.route('/top_rated_products', methods=['GET'])
+@cached_response(live_version=refreshed_rating_version, defaults={'page': '1', 'per_page': '10'})
 def get_top_rated_products_endpoint():
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 10))
     category = request.args.get('category')
     store = request.args.get('store')
 
-    top_rated_products = get_top_rated_products(products, page=page, per_page=per_page, category=category,
-                                                store=store)
+    top_rated_products = get_top_rated_products(catalog, page=page, per_page=per_page, category=category,
+                                                store=store, aggregates=rating_aggregates)
 
     return top_rated_products
 
 @app.route('/all_tags', methods=['GET'])
+@cached_response
 def get_all_tags_endpoint():
     try:
-        all_tags = set()
-        categories = set(products['product_category'])
-        for category in categories:
-            splitCategories = category.split(', ')
-            all_tags.update(splitCategories)
-        sorted_tags = sorted(all_tags)
-        return jsonify({'tags': list(sorted_tags)})
+        # Sorted once when the catalog is loaded
+        return jsonify({'tags': catalog.facets.tags})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 
 @app.route('/search_products', methods=['GET'])
+@cached_response(defaults={'page': '1', 'per_page': '10'})
 def get_search_product_route():
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 10))
@@ -121,44 +461,81 @@ def get_search_product_route():
     store = request.args.get('store') or None if request.args.get('store') != '' else None
     product_name = request.args.get('product_name') or None
     is_compare = request.args.get('isCompare', False)
+    tags = request.args.getlist('tags[]')
+    stores = request.args.getlist('stores[]')
+    facets = request.args.get('facets', '').lower() in ('1', 'true')
 
-    price_range_products = get_search_products(products, min_price=min_price, max_price=max_price,
+    price_range_products = get_search_products(catalog, min_price=min_price, max_price=max_price,
                                                category=category, store=store,
                                                product_name=product_name,
                                                page=page, per_page=per_page,
-                                               isCompare=is_compare)
+                                               isCompare=is_compare, tags=tags, stores=stores, facets=facets)
     return price_range_products
 
 
 @app.route('/get_compared_products', methods=['GET'])
+@cached_response(defaults={'page': '1', 'per_page': '10'})
 def compared_product_route():
     user_search = request.args.get('user_search', '')
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 10))
 
-    result = comparedProducts(products, user_search, page, per_page)
+    result = comparedProducts(catalog, user_search, page, per_page)
 
     return result
 
 
 @app.route('/collaborative_recommendations', methods=['GET'])
+@cached_response(live_version=collaborative_version, defaults={'page': '1', 'page_size': '5'})
 def get_collaborative_recommendations():
     product_name = request.args.get('product_name', '')
     page = int(request.args.get('page', 1))
     page_size = int(request.args.get('page_size', 5))
 
-    result = collaborative_recommend_products(products, collaborative_similarity, product_name, page, page_size)
+    snapshot = catalog
+    result = collaborative_recommend_products(snapshot, snapshot.collaborative_similarity, product_name, page,
+                                              page_size, cache=collaborative_cache)
 
     return jsonify(result)
 
 
 @app.route('/hybrid_recommendations', methods=['GET'])
+@cached_response(live_version=collaborative_version, defaults={'page': '1', 'page_size': '5'})
 def get_hybrid_recommendations():
     product_name = request.args.get('product_name', '')
     page = int(request.args.get('page', 1))
     page_size = int(request.args.get('page_size', 5))
+    content_weight = float(request.args.get('content_weight', HYBRID_CONTENT_WEIGHT))
+    collaborative_weight = float(request.args.get('collaborative_weight', HYBRID_COLLABORATIVE_WEIGHT))
+    fusion = request.args.get('fusion', HYBRID_FUSION)
+
+    snapshot = catalog
+    result = hybrid_recommendations(snapshot, snapshot.similarity, snapshot.collaborative_similarity, product_name,
+                                    page, page_size, content_weight=content_weight,
+                                    collaborative_weight=collaborative_weight, fusion=fusion)
+
+    return jsonify(result)
+
+
+@app.route('/recommend/batch', methods=['POST'])
+def get_batch_recommendations():
+    data = request.json or {}
+    product_ids = data.get('product_ids') or []
+    product_names = data.get('product_names') or []
 
-    result = hybrid_recommendations(products, similarity, collaborative_similarity, product_name, page, page_size)
+    if not product_ids and not product_names:
+        return jsonify({"error": "Please provide 'product_ids' or 'product_names' in the request body"}), 400
+
+    mode = data.get('mode', 'content')
+    snapshot = catalog
+    result = batch_recommend_products(snapshot, snapshot.similarity, snapshot.collaborative_similarity, product_ids,
+                                      product_names, mode=mode, aggregate=data.get('aggregate', 'sum'),
+                                      count=int(data.get('top_k', BATCH_TOP_K)),
+                                      content_weight=float(data.get('content_weight', HYBRID_CONTENT_WEIGHT)),
+                                      collaborative_weight=float(data.get('collaborative_weight',
+                                                                          HYBRID_COLLABORATIVE_WEIGHT)),
+                                      fusion=data.get('fusion', HYBRID_FUSION),
+                                      cache={'content': content_cache, 'collaborative': collaborative_cache}.get(mode))
 
     return jsonify(result)
 
@@ -169,7 +546,7 @@ def get_price_comparison():
         product_id = request.args.get('product_id', '')
         compare_product_ids = request.args.getlist('compare_product_ids[]')
 
-        result = compare_prices(products, product_id, compare_product_ids)
+        result = compare_prices(catalog, product_id, compare_product_ids)
 
         return jsonify(result)
 
@@ -177,13 +554,25 @@ def get_price_comparison():
         return jsonify({'success': False, 'error': str(e)})
 
 
+@app.route('/price_groups', methods=['GET'])
+@cached_response(defaults={'page': '1', 'per_page': '10'})
+def price_groups_route():
+    product_name = request.args.get('product_name', '')
+    page = int(request.args.get('page', 1))
+    per_page = int(request.args.get('per_page', 10))
+
+    result = get_price_groups(catalog, product_name, page, per_page)
+
+    return result
+
+
 @app.route('/get_all_products', methods=['GET'])
 def get_all_products_endpoint():
     try:
         page = int(request.args.get('page', 1))
         page_size = int(request.args.get('page_size', 10))
 
-        result = get_all_products(products, page, page_size)
+        result = get_all_products(catalog, page, page_size)
 
         return jsonify(result)
 
@@ -191,5 +580,68 @@ def get_all_products_endpoint():
         return jsonify({'success': False, 'error': str(e)})
 
 
+@app.route('/admin/reload', methods=['GET', 'POST'])
+def reload_catalog():
+    # Closed unless a token is configured: a reload is a full catalog load, too costly to leave open
+    if not ADMIN_TOKEN or not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({'error': 'Invalid admin token'}), 403
+
+    if request.method == 'GET':
+        return jsonify({'version': catalog.version, 'reloading': catalog_reloader.reloading,
+                        'last_reload': catalog_reloader.last_report})
+
+    # Loads in the background by default; ?wait=true answers with the report once the new catalog is served
+    if request.args.get('wait', '').lower() in ('1', 'true'):
+        report = catalog_reloader.reload()
+        if report is None:
+            return jsonify({'error': 'A catalog reload is already running'}), 409
+        return jsonify(report), 200 if report['success'] else 500
+
+    if not catalog_reloader.reload_in_background():
+        return jsonify({'error': 'A catalog reload is already running'}), 409
+    return jsonify({'message': 'Catalog reload started'}), 202
+
+
+CallbackMetric('shopwise_response_cache_requests_total', 'Response cache lookups by result', 'counter',
+               lambda: [(('hit',), response_cache.hits), (('miss',), response_cache.misses)]
+               if response_cache is not None else [], ('result',))
+CallbackMetric('shopwise_coalesced_requests_total', 'Reads answered with the result of an identical one in flight',
+               'counter', lambda: [((), single_flight.shared)] if single_flight is not None else [])
+CallbackMetric('shopwise_neighbor_cache_requests_total', 'Ranked neighbor cache lookups by result', 'counter',
+               lambda: [sample for name, cache in (('content', content_cache), ('collaborative', collaborative_cache))
+                        if cache is not None
+                        for sample in (((name, 'hit'), cache.hits), ((name, 'miss'), cache.misses))],
+               ('cache', 'result'))
+CallbackMetric('shopwise_ratings_total', 'Ratings accepted by the ingest queue, written to the database, dropped, '
+               'or requeued after a failed write', 'counter',
+               lambda: [(('accepted',), rating_queue.accepted), (('written',), rating_queue.written),
+                        (('dropped',), rating_queue.dropped), (('retried',), rating_queue.retried)], ('state',))
+CallbackMetric('shopwise_ratings_pending', 'Ratings waiting for the next batch write', 'gauge',
+               lambda: [((), rating_queue.pending())])
+CallbackMetric('shopwise_catalog_products', 'Products in the served catalog', 'gauge', lambda: [((), len(catalog))])
+# The version as an info metric: one series per loaded asset version, not one per sample of the products gauge
+CallbackMetric('shopwise_catalog_info', 'Asset version of the served catalog', 'gauge',
+               lambda: [((catalog.version,), 1)], ('version',))
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/cache_stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify({'response_cache': response_cache.stats() if response_cache is not None else None,
+                    'warm_up': warm_up_report})
+
+
+# Under gunicorn this runs once in the master, and every forked worker starts with the warm caches. Stored ratings
+# are folded in first, as publishing them later would leave the warmed hybrid responses behind.
+if WARMUP_ENABLED:
+    if COLLABORATIVE_LIVE_UPDATES:
+        collaborative_updater.update()
+    warm_up()
+
+
 if __name__ == '__main__':
     app.run(debug=DEBUG, host=HOST, port=PORT)
@@ -0,0 +1,49 @@
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+# Config reads the environment once on import, so the synthetic assets and database are chosen before anything
+# imports it
+ASSETS = tempfile.TemporaryDirectory()
+os.environ['SHOPWISE_ASSETS_DIR'] = os.path.join(ASSETS.name, 'assets')
+os.environ['SHOPWISE_RATINGS_DATABASE_URI'] = f"sqlite:///{os.path.join(ASSETS.name, 'ratings.db')}"
+os.environ['SHOPWISE_DEBUG'] = '0'
+
+from Benchmarks.synthetic_catalog import write_assets  # noqa: E402
+
+write_assets(os.environ['SHOPWISE_ASSETS_DIR'], 2000)
+
+
+@pytest.fixture(scope='session')
+def app():
+    import main
+    return main
+
+
+@pytest.fixture
+def client(app):
+    return app.app.test_client()
+
+
+@pytest.fixture(scope='session')
+def products():
+    # Small synthetic catalog with the cases the indexes have to get right: non-ASCII names whose case folding
+    # differs from lower(), repeated names, missing and non-positive prices
+    from Benchmarks.synthetic_catalog import generate_products
+
+    products = generate_products(1200, seed=3)
+    products.loc[[5, 6, 7], 'product_name'] = ['Çay Makinesi İnox 2L', 'Straße Lautsprecher MAX', 'Kelvin \u212aettle']
+    products.loc[[8, 9], 'product_name'] = products.loc[4, 'product_name']
+    products.loc[[10, 11, 12], 'product_price'] = [np.nan, 0.0, -5.0]
+    products.loc[[13, 14], 'product_category'] = ['Kitchen, Appliances, Çaydanlık', 'Audio']
+    return products
+
+
+@pytest.fixture(scope='session')
+def catalog(products):
+    from Utils.catalog import CatalogSnapshot
+    from Utils.search_index import ProductSearchIndex
+
+    return CatalogSnapshot(products, search_index=ProductSearchIndex(products))
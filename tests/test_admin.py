@@ -0,0 +1,25 @@
+import pytest
+
+
+@pytest.fixture
+def reloads(app, monkeypatch):
+    started = []
+    monkeypatch.setattr(app.catalog_reloader, 'reload_in_background', lambda: started.append(True) or True)
+    return started
+
+
+def test_reload_is_refused_without_a_configured_token(app, client, monkeypatch, reloads):
+    monkeypatch.setattr(app, 'ADMIN_TOKEN', None)
+    assert client.post('/admin/reload').status_code == 403
+    assert client.post('/admin/reload', headers={'X-Admin-Token': ''}).status_code == 403
+    assert client.get('/admin/reload').status_code == 403
+    assert not reloads
+
+
+def test_reload_needs_the_configured_token(app, client, monkeypatch, reloads):
+    monkeypatch.setattr(app, 'ADMIN_TOKEN', 'secret')
+    assert client.post('/admin/reload').status_code == 403
+    assert client.post('/admin/reload', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+    assert not reloads
+    assert client.post('/admin/reload', headers={'X-Admin-Token': 'secret'}).status_code == 202
+    assert reloads == [True]
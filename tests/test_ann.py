@@ -0,0 +1,56 @@
+import numpy as np
+
+from Benchmarks.synthetic_catalog import generate_products
+from Utils.ann import ann_index, ann_texts
+from Utils.catalog import CatalogSnapshot
+
+
+def snapshot(products):
+    return CatalogSnapshot(products.reset_index(drop=True))
+
+
+def assert_vectors_match_texts(index, texts):
+    expected = index.vectorizer.transform(texts)
+    assert np.allclose(index.vectors[index.slots], expected)
+    assert np.array_equal(index.assignment, np.argmax(expected @ index.centroids.T, axis=1))
+
+
+def test_changed_texts_are_vectorized_again():
+    products = generate_products(600)
+    previous = snapshot(products)
+    previous.ann
+    changed = products.copy()
+    changed.loc[[3, 250, 599], 'tags'] = ['kettle steel', 'garden hose 20m', 'usb c cable braided']
+    catalog = snapshot(changed)
+
+    index = ann_index(catalog, previous)
+    assert index.vectorizer is previous.ann.vectorizer
+    assert_vectors_match_texts(index, ann_texts(catalog.products))
+    assert index.ranked_page(250, 0, 1).tolist() == [250]
+
+
+def test_appended_products_are_inserted():
+    products = generate_products(700)
+    previous = snapshot(products[:600])
+    previous.ann
+    catalog = snapshot(products)
+
+    index = ann_index(catalog, previous)
+    assert len(index) == 700 and index.vectorizer is previous.ann.vectorizer
+    assert_vectors_match_texts(index, ann_texts(catalog.products))
+
+
+def test_an_unchanged_catalog_keeps_the_index():
+    products = generate_products(300)
+    previous = snapshot(products)
+    previous.ann
+    assert ann_index(snapshot(products.copy()), previous) is previous.ann
+
+
+def test_mostly_changed_or_moved_products_rebuild_the_index():
+    products = generate_products(300)
+    previous = snapshot(products)
+    previous.ann
+    renamed = products.assign(tags=[f'{tags} refurbished' for tags in products['tags']])
+    assert ann_index(snapshot(renamed), previous).vectorizer is not previous.ann.vectorizer
+    assert ann_index(snapshot(products[::-1]), previous).vectorizer is not previous.ann.vectorizer
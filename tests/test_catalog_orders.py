@@ -0,0 +1,50 @@
+import pytest
+
+from Controllers.GetProductsController import comparedProducts, get_all_products, get_top_rated_products
+
+
+def ids(result):
+    assert result['success'], result.get('error')
+    return [record['product_id'] for record in result['Data']]
+
+
+def pages(frame, page, per_page):
+    # product_ids and total_pages of one page of frame, the way the endpoints page it
+    start = (page - 1) * per_page
+    return frame['product_id'].iloc[start:start + per_page].tolist(), (len(frame) - 1) // per_page + 1
+
+
+def contains(products, column, query):
+    return products[column].str.contains(query, case=False)
+
+
+@pytest.mark.parametrize('category, store', [(None, None), ('smart', None), (None, 'shophive'),
+                                             ('laptops', 'priceoye'), ('no such category', None)])
+@pytest.mark.parametrize('page, per_page', [(1, 10), (3, 7), (40, 25)])
+def test_top_rated_order_matches_a_stable_sort(products, catalog, category, store, page, per_page):
+    expected = products.assign(weighted=products['product_ratings'] * products['rating_count'].fillna(0))
+    if category:
+        expected = expected[contains(expected, 'product_category', category)]
+    if store:
+        expected = expected[contains(expected, 'product_store', store)]
+    expected = expected.sort_values('weighted', ascending=False, kind='stable')
+
+    result = get_top_rated_products(catalog, page=page, per_page=per_page, category=category, store=store)
+    assert (ids(result), result['total_pages']) == pages(expected, page, per_page)
+    # A plain frame goes through the same orders without the search index
+    result = get_top_rated_products(products, page=page, per_page=per_page, category=category, store=store)
+    assert (ids(result), result['total_pages']) == pages(expected, page, per_page)
+
+
+@pytest.mark.parametrize('query', ['samsung', 'watch', 'Kettle', 'no such product'])
+@pytest.mark.parametrize('page', [1, 2, 9])
+def test_compared_products_are_in_stable_price_order(products, catalog, query, page):
+    expected = products[contains(products, 'product_name', query)].sort_values('product_price', kind='stable')
+    result = comparedProducts(catalog, query, page=page, per_page=10)
+    assert (ids(result), result['total_pages']) == pages(expected, page, 10)
+
+
+@pytest.mark.parametrize('page, page_size', [(1, 10), (7, 13), (120, 10)])
+def test_all_products_are_in_catalog_order(products, catalog, page, page_size):
+    result = get_all_products(catalog, page=page, page_size=page_size)
+    assert (ids(result), result['total_pages']) == pages(products, page, page_size)
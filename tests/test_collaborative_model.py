@@ -0,0 +1,44 @@
+import numpy as np
+
+from Benchmarks.synthetic_catalog import generate_neighbors
+from Utils.collaborative_model import LiveNeighborIndex
+from Utils.ranking import page_bounds, top_k
+
+
+def pages(index, product_index, page_size=5):
+    total_pages, _, _ = page_bounds(len(index[product_index]), 1, page_size)
+    ranked = [index.ranked_page(product_index, start, start + page_size)
+              for start in range(0, total_pages * page_size, page_size)]
+    return total_pages, np.concatenate(ranked).tolist()
+
+
+def test_a_blended_dense_row_keeps_every_rank():
+    rng = np.random.default_rng(0)
+    base = rng.random((500, 500)).astype(np.float32)
+    live_indices, live_scores = np.array([3, 17, 400, 499]), np.array([0.9, 0.2, 0.5, 1.0])
+    index = LiveNeighborIndex(base)
+    index = index.with_rows({7: index.blend(7, live_indices, live_scores, live_weight=0.5, n_neighbors=20)})
+
+    blended = base[7].astype(np.float64)
+    blended[live_indices] += 0.5 * live_scores
+    assert len(index[7]) == 500
+    assert pages(index, 7) == (100, top_k(blended, 0, 500).tolist())
+    assert index.ranked_page(7, 15, 25).tolist() == top_k(blended, 15, 25).tolist()
+    indices, scores = index.neighbors(7)
+    assert len(indices) == 500 and np.allclose(scores, blended)
+    # Rows without live ratings are unchanged
+    assert pages(index, 8) == (100, top_k(base[8], 0, 500).tolist())
+
+
+def test_a_blended_neighbor_row_keeps_its_stored_neighbors():
+    base = generate_neighbors(300, n_neighbors=50)
+    base_indices, base_scores = base.neighbors(7)
+    new = np.setdiff1d(np.arange(300), base_indices)[:3]
+    live_indices = np.sort(np.concatenate((base_indices[-2:], new)))
+    index = LiveNeighborIndex(base)
+    index = index.with_rows({7: index.blend(7, live_indices, np.full(len(live_indices), 0.4), n_neighbors=20)})
+
+    total_pages, ranked = pages(index, 7)
+    assert len(index[7]) == 53 and total_pages == 11
+    assert sorted(ranked) == sorted(set(base_indices.tolist()) | set(new.tolist()))
+    assert np.all(np.diff(index[7]) <= 0)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Controllers.GetProductsController import get_search_products
+
+FILTERS = [(['Smart-Watches'], None), (['Laptops', 'Apple'], None), (['Apple', 'Laptops', 'Tablets'], None),
+           (None, ['PriceOye']), (['Audio'], ['Shophive', 'PriceOye']), (['No-Such-Tag'], None),
+           (None, ['No Such Store']), (['Kitchen', 'Çaydanlık'], ['PriceOye', 'Shophive'])]
+
+
+def tag_lists(products):
+    return products['product_category'].str.split(', ')
+
+
+def expected_mask(products, tags, stores):
+    mask = np.ones(len(products), dtype=bool)
+    for tag in tags or ():
+        mask &= tag_lists(products).map(lambda row: tag in row).to_numpy(dtype=bool)
+    if stores:
+        mask &= products['product_store'].isin(stores).to_numpy(dtype=bool)
+    return mask
+
+
+def ranked_counts(values):
+    # Most frequent first, ties by name
+    counts = pd.Series(values).value_counts()
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+def test_all_tags_match_the_split_categories(products, catalog):
+    assert catalog.facets.tags == sorted({tag for row in tag_lists(products) for tag in row})
+
+
+@pytest.mark.parametrize('tags, stores', FILTERS)
+def test_facet_filters_match_pandas_masks(products, catalog, tags, stores):
+    assert catalog.facets.filter(tags or (), stores or ()).tolist() == \
+        np.flatnonzero(expected_mask(products, tags, stores)).tolist()
+
+
+@pytest.mark.parametrize('tags, stores', FILTERS + [(None, None)])
+def test_facet_counts_match_value_counts(products, catalog, tags, stores):
+    selected = products[expected_mask(products, tags, stores)]
+    result = get_search_products(catalog, tags=tags, stores=stores, page=2, per_page=5, facets=True)
+    assert result['success'], result.get('error')
+
+    start = 5
+    assert [record['product_id'] for record in result['Data']] == selected['product_id'].iloc[start:start + 5].tolist()
+    assert result['total_pages'] == (len(selected) - 1) // 5 + 1
+    assert list(result['facets']['tags'].items()) == ranked_counts(tag_lists(selected).explode().dropna())
+    assert list(result['facets']['stores'].items()) == ranked_counts(selected['product_store'])
+
+
+def test_facets_are_only_counted_on_request(catalog):
+    assert 'facets' not in get_search_products(catalog, tags=['Laptops'])
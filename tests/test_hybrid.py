@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Benchmarks.synthetic_catalog import generate_neighbors
+from Config.config import HYBRID_RRF_K
+from Controllers.GetProductsController import hybrid_recommendations
+from Utils.catalog import CatalogSnapshot
+from Utils.hybrid import row_scores
+
+N_PRODUCTS = 300
+
+
+@pytest.fixture(scope='module')
+def catalog(products):
+    # Every product id used by three rows, so deduplication has work to do
+    products = products.iloc[:N_PRODUCTS].assign(product_id=np.arange(N_PRODUCTS) % 100)
+    return CatalogSnapshot(products)
+
+
+def dense(seed):
+    # Scores rounded to one decimal, so many of them tie
+    return np.round(np.random.default_rng(seed).random((N_PRODUCTS, N_PRODUCTS)), 1).astype(np.float32)
+
+
+SIMILARITIES = {'dense': (dense(1), dense(2)),
+                'neighbors': (generate_neighbors(N_PRODUCTS, 40, seed=1), generate_neighbors(N_PRODUCTS, 40, seed=2)),
+                'mixed': (dense(1), generate_neighbors(N_PRODUCTS, 40, seed=2))}
+
+
+def expected_page(catalog, similarity, collaborative_similarity, seed, page, page_size, content_weight,
+                  collaborative_weight, fusion, rrf_k=HYBRID_RRF_K):
+    # Both rows outer-joined by position, blended, the best row of every product id kept, ranked by score with
+    # ties in catalog order
+    rows = []
+    for name, matrix, weight in (('content', similarity, content_weight),
+                                 ('collaborative', collaborative_similarity, collaborative_weight)):
+        indices, scores = row_scores(matrix, seed)
+        scores = pd.Series(scores, index=indices)
+        if fusion == 'rank':
+            scores = 1.0 / (rrf_k + scores.rank(method='first', ascending=False))
+        rows.append((weight * scores).rename(name))
+    frame = pd.concat(rows, axis=1).fillna(0.0)
+    frame['score'] = frame['content'] + frame['collaborative']
+    frame['position'] = frame.index
+    frame['product_id'] = catalog.product_ids[frame.index]
+    frame = frame.sort_values(['score', 'position'], ascending=[False, True], kind='stable')
+    frame = frame.drop_duplicates('product_id')
+
+    start = (page - 1) * page_size
+    return frame['product_id'].iloc[start:start + page_size].tolist(), (len(frame) - 1) // page_size + 1
+
+
+@pytest.mark.parametrize('kind', SIMILARITIES)
+@pytest.mark.parametrize('fusion, content_weight, collaborative_weight', [('weighted', 0.5, 0.5),
+                                                                         ('weighted', 0.8, 0.2),
+                                                                         ('rank', 1.0, 1.0)])
+@pytest.mark.parametrize('page, page_size', [(1, 10), (4, 7), (30, 10)])
+def test_hybrid_pages_match_a_pandas_blend(catalog, kind, fusion, content_weight, collaborative_weight, page,
+                                           page_size):
+    similarity, collaborative_similarity = SIMILARITIES[kind]
+    for query in catalog.products['product_name'].iloc[[0, 57, 211]]:
+        seed = catalog.resolve_position(query)
+        result = hybrid_recommendations(catalog, similarity, collaborative_similarity, query, page=page,
+                                        page_size=page_size, content_weight=content_weight,
+                                        collaborative_weight=collaborative_weight, fusion=fusion)
+        assert result['success'], result.get('error')
+        product_ids = [record['product_id'] for record in result['Data']]
+        assert len(set(product_ids)) == len(product_ids)
+        assert (product_ids, result['total_pages']) == expected_page(
+            catalog, similarity, collaborative_similarity, seed, page, page_size, content_weight,
+            collaborative_weight, fusion)
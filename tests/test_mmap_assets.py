@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Benchmarks.synthetic_catalog import generate_products
+from Utils.mmap_assets import DeferredStringArray, read_catalog, write_catalog
+from Utils.search_index import match_positions
+from Utils.serializer import product_block
+
+
+def plain(values):
+    # Missing values compare equal whichever missing marker a column uses
+    return [None if not isinstance(value, (list, tuple)) and pd.isna(value) else value for value in values]
+
+
+@pytest.fixture(scope='module')
+def catalogs(tmp_path_factory):
+    products = generate_products(500)
+    # Missing values in a deferred, a category and an eagerly decoded text column, and non-ASCII text
+    products.loc[[3, 17, 250], 'description'] = None
+    products.loc[[5, 499], 'product_store'] = None
+    products.loc[[0, 42], 'product_name'] = None
+    products.loc[7, 'tags'] = 'çay bardağı – 🙂'
+    path = tmp_path_factory.mktemp('catalog')
+    write_catalog(products, path)
+    return read_catalog(path, lazy=False), read_catalog(path, lazy=True)
+
+
+def test_lazy_columns_are_deferred(catalogs):
+    _, lazy = catalogs
+    assert isinstance(lazy['description'].array, DeferredStringArray)
+    assert isinstance(lazy['product_store'].array, pd.Categorical)
+
+
+def test_lazy_and_eager_loads_hold_the_same_values(catalogs):
+    eager, lazy = catalogs
+    assert list(eager.columns) == list(lazy.columns)
+    for column in eager.columns:
+        assert plain(lazy[column].tolist()) == plain(eager[column].tolist()), column
+        assert lazy[column].isna().tolist() == eager[column].isna().tolist(), column
+
+
+def test_lazy_and_eager_pages_serialize_the_same(catalogs):
+    eager, lazy = catalogs
+    rng = np.random.default_rng(0)
+    for positions in [rng.choice(len(eager), 10, replace=False) for _ in range(20)] + [[3, 5, 0, 499, 7]]:
+        lazy_records = product_block(lazy, positions).records()
+        eager_records = product_block(eager, positions).records()
+        assert [plain(record.values()) for record in lazy_records] == \
+               [plain(record.values()) for record in eager_records]
+
+
+@pytest.mark.parametrize('column', ['description', 'tags', 'product_link'])
+def test_str_methods_match_an_object_column(catalogs, column):
+    eager, lazy = catalogs
+    assert match_positions(lazy, column, 'SAMSUNG').tolist() == match_positions(eager, column, 'SAMSUNG').tolist()
+    assert lazy[column].str.contains('pro', na=False).tolist() == \
+           eager[column].str.contains('pro', na=False).tolist()
+    assert plain(lazy[column].str.lower()) == plain(eager[column].str.lower())
+    assert plain(lazy[column].str.len()) == plain(eager[column].str.len())
+    assert lazy[column].fillna('').tolist() == eager[column].fillna('').tolist()
+
+
+def test_selection_matches_an_object_column(catalogs):
+    eager, lazy = catalogs
+    mask = (eager['product_price'] > 20000).to_numpy()
+    for column in ('description', 'tags'):
+        deferred, values = lazy[column].array, eager[column].to_numpy(dtype=object)
+        assert plain(deferred[10:40:3]) == plain(values[10:40:3])
+        assert plain(deferred[mask]) == plain(values[mask])
+        assert plain(deferred[[-1, 3, 0, 3]]) == plain(values[[-1, 3, 0, 3]])
+        assert plain(deferred.take([4, -1, 2], allow_fill=True)) == [values[4], None, values[2]]
+        assert plain(deferred[100:200].take([0, -1])) == plain(values[100:200][[0, -1]])
+        assert plain(deferred[100:200].isna()) == plain(pd.isna(values[100:200]))
+        assert plain(lazy[column].iloc[::-1].reset_index(drop=True)) == plain(values[::-1])
+        with pytest.raises(IndexError):
+            deferred[[len(values)]]
@@ -0,0 +1,34 @@
+import numpy as np
+
+from Utils.price_groups import PriceGroups, equivalence_key
+
+
+def groups_of(listings):
+    names, stores, prices = zip(*listings)
+    return PriceGroups(list(names), list(stores), np.array(prices, dtype=np.float64))
+
+
+def test_capacity_variants_are_different_products():
+    assert equivalence_key('Xiaomi Pad 6') != equivalence_key('Xiaomi Pad 6 8GB 256GB')
+    assert equivalence_key('Xiaomi Pad 6 8GB 128GB') != equivalence_key('Xiaomi Pad 6 8GB 256GB')
+    assert equivalence_key('Xiaomi Pad 6 (8GB RAM, 256GB Storage) - Official Warranty') == \
+        equivalence_key('xiaomi pad 6 8gb 256gb')
+
+    groups = groups_of([('Xiaomi Pad 6', 'PriceOye', 60000), ('Xiaomi Pad 6 8GB 256GB', 'Shophive', 90000),
+                        ('Xiaomi Pad 6 8GB RAM 256GB', 'PriceOye', 85000)])
+    assert groups.group_of[0] != groups.group_of[1] == groups.group_of[2]
+    assert groups.savings_order.tolist() == [groups.group_of[1]]
+    assert groups.spread[groups.group_of[1]] == 5000
+
+
+def test_names_without_key_tokens_are_not_grouped():
+    groups = groups_of([('Official Warranty', 'PriceOye', 100), ('!!!', 'Shophive', 5000), (None, 'Shophive', 900),
+                        ('Dual SIM edition', 'PriceOye', 70), ('Nokia 105', 'PriceOye', 4000),
+                        ('Nokia 105', 'Shophive', 4500)])
+    assert len(set(groups.group_of[:3].tolist())) == 3
+    assert len(groups) == 5
+    for position in range(4):
+        assert groups.group_members(groups.group_of[position]).tolist() == [position]
+    # 'None' is a token of its own, the other three names reduce to nothing
+    assert groups.keys[groups.group_of[[0, 1, 3]]].tolist() == ['', '', '']
+    assert groups.savings_order.tolist() == [groups.group_of[4]]
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from Controllers.GetProductsController import get_search_products
+from Utils.price_index import PriceIndex
+
+RANGES = [(None, None), (0, np.inf), (0, None), (None, 20000), (5000, 15000), (13360, 13360), (-10, 0),
+          (20000, 100), (1e9, None)]
+
+
+def expected_ids(products, min_price, max_price, category, product_name, is_compare):
+    # The filtering and stable price sort get_search_products did with pandas
+    selected = products
+    if min_price is not None:
+        selected = selected[selected['product_price'] >= min_price]
+    if max_price is not None:
+        selected = selected[selected['product_price'] <= max_price]
+    if category:
+        selected = selected[selected['product_category'].str.contains(category, case=False)]
+    if product_name:
+        selected = selected[selected['product_name'].str.contains(product_name, case=False)]
+    if min_price is not None or max_price is not None:
+        selected = selected.sort_values('product_price', kind='stable')
+    if is_compare:
+        selected = selected[selected['product_price'] > 0]
+    return selected['product_id'].tolist()
+
+
+@pytest.mark.parametrize('min_price, max_price', RANGES)
+@pytest.mark.parametrize('category, product_name', [(None, None), ('smart', None), (None, 'samsung'),
+                                                    ('phones', 'pro')])
+@pytest.mark.parametrize('is_compare', [None, True])
+def test_price_searches_match_pandas_filters(products, catalog, min_price, max_price, category, product_name,
+                                             is_compare):
+    expected = expected_ids(products, min_price, max_price, category, product_name, is_compare)
+    for page in (1, 3):
+        result = get_search_products(catalog, min_price=min_price, max_price=max_price, category=category,
+                                     product_name=product_name, page=page, per_page=10, isCompare=is_compare)
+        assert result['success'], result.get('error')
+        assert [record['product_id'] for record in result['Data']] == expected[(page - 1) * 10:page * 10]
+        assert result['total_pages'] == (len(expected) - 1) // 10 + 1
+
+
+def test_select_matches_a_mask_over_the_sorted_window(catalog):
+    prices = catalog.prices
+    index = PriceIndex(prices)
+    rng = np.random.default_rng(0)
+    for size in (0, 5, 100, 1000):
+        positions = np.sort(rng.choice(len(prices), size, replace=False))
+        for min_price, max_price, positive in ((None, None, False), (1000, 30000, False), (None, 5000, True)):
+            start, end = index.bounds(min_price, max_price, positive)
+            inside = np.ones(len(prices), dtype=bool)
+            if min_price is not None:
+                inside &= prices >= min_price
+            if max_price is not None:
+                inside &= prices <= max_price
+            if positive:
+                inside &= prices > 0
+            expected = positions[inside[positions]]
+            expected = expected[np.argsort(prices[expected], kind='stable')]
+            assert index.select(start, end, positions).tolist() == expected.tolist()
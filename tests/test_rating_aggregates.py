@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from Benchmarks.synthetic_catalog import generate_products
+from Utils.catalog import CatalogSnapshot
+from Utils.rating_aggregates import RatingAggregates
+
+
+def full_sort(aggregates, positions):
+    # Reference order: every position re-sorted by its current score, ties in catalog order
+    positions = np.asarray(positions)
+    return positions[np.lexsort((positions, -aggregates.scores(positions)))]
+
+
+def assert_matches_full_sort(aggregates, rng):
+    everything = np.arange(len(aggregates.catalog))
+    assert aggregates.top().tolist() == full_sort(aggregates, everything).tolist()
+    assert aggregates.top(count=25).tolist() == full_sort(aggregates, everything)[:25].tolist()
+    for size in (1, 40, 600):
+        positions = np.sort(rng.choice(everything, size, replace=False))
+        expected = full_sort(aggregates, positions)
+        assert aggregates.top(positions).tolist() == expected.tolist()
+        assert aggregates.top(positions, count=10).tolist() == expected[:10].tolist()
+
+
+@pytest.mark.parametrize('score', ['weighted', 'bayesian'])
+def test_live_order_matches_a_full_re_sort(score):
+    catalog = CatalogSnapshot(generate_products(3000, seed=1))
+    product_ids = catalog.product_ids.tolist()
+    summary = [(product_ids[0], 2, 9), (product_ids[10], 1, 5)]
+    aggregates = RatingAggregates(catalog, lambda: (summary, 2), lambda after_id: [], score=score)
+    rng = np.random.default_rng(0)
+    assert_matches_full_sort(aggregates, rng)
+
+    compacted = False
+    for _ in range(30):
+        # Batches repeat products so rows already in the overlay move again
+        batch = rng.choice(product_ids[:1500], 60).tolist() + [product_ids[0]] * 3
+        aggregates.apply((product_id, int(rng.integers(1, 6))) for product_id in batch)
+        compacted = compacted or not aggregates._overlay
+        assert_matches_full_sort(aggregates, rng)
+    assert compacted
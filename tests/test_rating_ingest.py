@@ -0,0 +1,94 @@
+import pytest
+
+from Utils.rating_ingest import RatingIngestQueue
+
+
+class InvalidRow(Exception):
+    pass
+
+
+class Locked(Exception):
+    pass
+
+
+class Database:
+    # Stand-in for write_ratings: rows with a 'bad' rating fail as data errors, and the next `locked` writes fail
+    # as if another worker held the database
+    def __init__(self, locked=0):
+        self.rows = []
+        self.locked = locked
+
+    def write(self, batch):
+        if self.locked:
+            self.locked -= 1
+            raise Locked()
+        if any(rating['user_rating'] == 'bad' for rating in batch):
+            raise InvalidRow()
+        self.rows += batch
+
+
+def ratings(*values):
+    return [{'product_id': str(i), 'user_rating': value} for i, value in enumerate(values)]
+
+
+def make_queue(database):
+    # Ratings are added to _pending directly and flushed here, so no writer thread is started
+    return RatingIngestQueue(database.write, batch_size=10, data_errors=(InvalidRow,))
+
+
+def test_invalid_rows_are_dropped_and_the_rest_written():
+    database = Database()
+    queue = make_queue(database)
+    seen = []
+    queue.listeners.append(seen.extend)
+    queue._pending += ratings(1, 'bad', 3)
+    queue.flush()
+    assert [rating['user_rating'] for rating in database.rows] == [1, 3]
+    assert seen == database.rows
+    assert (queue.written, queue.dropped, queue.retried, queue.pending()) == (2, 1, 0, 0)
+
+
+def test_a_locked_database_requeues_the_batch_with_backoff():
+    database = Database(locked=2)
+    queue = make_queue(database)
+    queue._pending += ratings(1, 2, 3)
+
+    queue.flush()
+    assert (queue.pending(), queue.retried, queue.failures) == (3, 3, 1)
+    queue.flush()
+    assert queue.failures == 2
+    assert queue.retry_delay() == pytest.approx(2 * queue.flush_interval * 2)
+
+    queue.flush()
+    assert [rating['user_rating'] for rating in database.rows] == [1, 2, 3]
+    assert (queue.written, queue.dropped, queue.pending(), queue.failures, queue.retry_delay()) == (3, 0, 0, 0, 0)
+
+
+def test_a_lock_while_writing_rows_one_at_a_time_keeps_the_rest_queued():
+    database = Database()
+    queue = make_queue(database)
+    queue._pending += ratings(1, 'bad', 3, 4)
+    calls = []
+
+    def lock_on_the_second_row(batch):
+        # The batch fails on its invalid row, the first row is written and the database locks on the second
+        calls.append(batch)
+        if len(calls) == 3:
+            raise Locked()
+        database.write(batch)
+
+    queue._write = lock_on_the_second_row
+    queue.flush()
+    assert [rating['user_rating'] for rating in database.rows] == [1]
+    assert queue.dropped == 0
+    assert [rating['user_rating'] for rating in queue._pending] == ['bad', 3, 4]
+
+    queue.flush()
+    assert [rating['user_rating'] for rating in database.rows] == [1, 3, 4]
+    assert (queue.written, queue.dropped, queue.pending()) == (3, 1, 0)
+
+
+def test_backoff_is_capped():
+    queue = make_queue(Database())
+    queue.failures = 20
+    assert queue.retry_delay() == queue.max_backoff
@@ -0,0 +1,45 @@
+import sqlite3
+
+from sqlalchemy import event
+
+
+def committed_ratings(path, last_rating_id):
+    with sqlite3.connect(path) as connection:
+        return connection.execute('SELECT count(*), coalesce(sum(user_rating), 0) FROM rating WHERE id <= ?',
+                                  (last_rating_id,)).fetchone()
+
+
+def write_rating(path, product_id, user_rating):
+    # Another worker's batch: the rating and its summary row in one commit
+    with sqlite3.connect(path) as connection:
+        connection.execute("INSERT INTO rating (user_id, product_id, user_rating, timestamp) "
+                           "VALUES ('other', ?, ?, '2024-01-01 00:00:00')", (product_id, user_rating))
+        connection.execute('INSERT INTO rating_summary (product_id, rating_count, rating_sum) VALUES (?, 1, ?) '
+                           'ON CONFLICT (product_id) DO UPDATE SET rating_count = rating_count + 1, '
+                           'rating_sum = rating_sum + excluded.rating_sum', (product_id, user_rating))
+
+
+def test_summary_and_last_rating_id_are_read_from_one_snapshot(app):
+    with app.app.app_context():
+        engine = app.db.engine
+    path = engine.url.database
+    written = []
+
+    def commit_between_reads(connection, cursor, statement, parameters, context, executemany):
+        if 'max(rating.id)' in statement and not written:
+            write_rating(path, '7', 4)
+            written.append(True)
+
+    event.listen(engine, 'before_cursor_execute', commit_between_reads)
+    try:
+        rows, last_rating_id = app.load_rating_summary()
+    finally:
+        event.remove(engine, 'before_cursor_execute', commit_between_reads)
+
+    assert written
+    counts = sum(count for _, count, _ in rows), sum(total for _, _, total in rows)
+    assert counts == committed_ratings(path, last_rating_id)
+    # The rating committed in between is picked up by the next read
+    rows, last_rating_id = app.load_rating_summary()
+    assert (sum(count for _, count, _ in rows), sum(total for _, _, total in rows)) == \
+        committed_ratings(path, last_rating_id)
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from Utils.search_index import ProductSearchIndex, match_positions
+
+NAME_QUERIES = ['samsung', 'SAMSUNG', 'Pro1', 'watch 8gb', 'a', 'ai', ' ', 'smart watch', 'no such product',
+                'çay', 'ÇAY', 'İnox', 'inox', 'strasse', 'straße', 'kelvin', 'Kelvin', 'k',
+                'pro.', 'note[0-9]+', '^apple', 'black$', 'x|max', '(?:lite)']
+CATEGORY_QUERIES = ['smart', 'Smart-Watches', 'samsung', ', ', 'çaydanlık', 'audio', 'phones$', 'Tab.ets', 'zzz']
+STORE_QUERIES = ['priceoye', 'SHOP', 'o', 'e$', 'nope']
+
+
+@pytest.fixture(scope='module')
+def search_index(products):
+    return ProductSearchIndex(products)
+
+
+@pytest.mark.parametrize('column, queries', [('product_name', NAME_QUERIES), ('product_category', CATEGORY_QUERIES),
+                                             ('product_store', STORE_QUERIES)])
+def test_index_matches_str_contains(products, search_index, column, queries):
+    for query in queries:
+        expected = np.flatnonzero(products[column].str.contains(query, case=False).to_numpy(dtype=bool))
+        assert match_positions(products, column, query, search_index).tolist() == expected.tolist(), query
+        assert match_positions(products, column, query).tolist() == expected.tolist(), query
+
+
+def test_every_name_finds_itself(products, search_index):
+    for position, name in enumerate(products['product_name'].tolist()[:300]):
+        assert position in match_positions(products, 'product_name', name.replace('+', '\\+'), search_index)
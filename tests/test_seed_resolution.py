@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from Controllers.GetProductsController import compare_prices
+from Utils.catalog import CatalogSnapshot
+
+
+def expected_position(products, query):
+    # Exact name (case and whitespace folded), else product id, else the first substring match
+    names = products['product_name'].str.split().str.join(' ').str.casefold()
+    for matches in (names == ' '.join(str(query).split()).casefold(),
+                    products['product_id'].astype(str) == str(query).strip(),
+                    products['product_name'].str.contains(query, case=False)):
+        positions = np.flatnonzero(matches.to_numpy(dtype=bool))
+        if len(positions):
+            return int(positions[0])
+    return None
+
+
+@pytest.fixture(scope='module')
+def duplicated(products):
+    # Product ids shared by several rows, the case the id table does not cover
+    return CatalogSnapshot(products.assign(product_id=products['product_id'] % 500))
+
+
+def queries(products):
+    names = products['product_name'].tolist()
+    spaced = ['  ' + name.replace(' ', '   ') + ' ' for name in names[60:70]]
+    return (names[:50] + [name.upper() for name in names[50:60]] + spaced
+            + [names[4], 'Çay makinesi İNOX 2l', 'straße lautsprecher max'] + ['1', '42', ' 1200 ', '1201', '0']
+            + ['samsung', 'pro1', 'watch 8gb', 'no such product'])
+
+
+def test_seeds_resolve_like_the_pandas_lookup(products, catalog, duplicated):
+    for snapshot in (catalog, duplicated):
+        for query in queries(snapshot.products):
+            assert snapshot.resolve_position(query) == expected_position(snapshot.products, query), query
+
+
+def test_id_positions_match_isin(catalog, duplicated):
+    for snapshot in (catalog, duplicated):
+        product_ids = snapshot.products['product_id'].astype(str)
+        for keys in (['1', '2', '3'], ['10', ' 499 ', '5000', 'x'], [], [str(i) for i in range(0, 1300, 7)]):
+            expected = np.flatnonzero(product_ids.isin([key.strip() for key in keys]).to_numpy())
+            assert snapshot.id_positions(keys).tolist() == expected.tolist(), keys
+
+
+@pytest.mark.parametrize('product_id, compare_product_ids', [(1, [2, 3, 4]), ('17', ['1', '900', '17']),
+                                                             (15, [10, 11, 12, 13])])
+def test_compare_prices_matches_the_pandas_comparison(products, catalog, product_id, compare_product_ids):
+    base = products[products['product_id'] == int(product_id)].iloc[0]
+    compared = products[products['product_id'].isin([int(i) for i in compare_product_ids])]
+    expected = compared.assign(difference=base['product_price'] - compared['product_price'])
+    expected = expected.sort_values('difference', kind='stable')
+
+    result = compare_prices(catalog, product_id, compare_product_ids)
+    assert result['success'], result.get('error')
+    assert [record['product_id'] for record in result['Data']] == expected['product_id'].tolist()
+    np.testing.assert_array_equal([record['price_difference'] for record in result['Data']], expected['difference'])
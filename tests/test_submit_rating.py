@@ -0,0 +1,28 @@
+import pytest
+
+
+@pytest.mark.parametrize('user_rating', [500, 0, 6, -3, True, 4.9, 4.0, '4', None, [4]])
+def test_ratings_outside_whole_stars_are_refused(app, client, monkeypatch, user_rating):
+    queued = []
+    monkeypatch.setattr(app.rating_queue, 'put', queued.append)
+    response = client.post('/submit_rating', json={'user_id': 'u1', 'product_id': '1', 'user_rating': user_rating})
+    assert response.status_code == 400
+    assert not queued
+
+
+def test_batches_with_an_invalid_rating_are_refused(app, client, monkeypatch):
+    queued = []
+    monkeypatch.setattr(app.rating_queue, 'put_many', queued.extend)
+    response = client.post('/submit_ratings', json=[{'user_id': 'u1', 'product_id': '1', 'user_rating': 5},
+                                                    {'user_id': 'u1', 'product_id': '2', 'user_rating': 500}])
+    assert response.status_code == 400
+    assert not queued
+
+
+@pytest.mark.parametrize('user_rating', [1, 3, 5])
+def test_whole_stars_are_accepted(app, client, monkeypatch, user_rating):
+    queued = []
+    monkeypatch.setattr(app.rating_queue, 'put', queued.append)
+    response = client.post('/submit_rating', json={'user_id': 'u1', 'product_id': '1', 'user_rating': user_rating})
+    assert response.status_code == 202
+    assert [rating['user_rating'] for rating in queued] == [user_rating]
@@ -0,0 +1,4 @@
+from main import app
+
+# Entry point for WSGI servers: gunicorn -c gunicorn.conf.py wsgi:app
+application = app